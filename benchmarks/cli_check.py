@@ -0,0 +1,123 @@
+""" Checks the tta-analysis aggregate and export commands on a folder with a
+log that does not parse.
+
+Writes a folder of small game logs and a corrupt one, then runs aggregate
+and export twice, through the default record cache in $XDG_CACHE_HOME.
+Checks that the corrupt log is left out, that the outputs match a Series of
+the good logs, that the second run writes the same outputs from the cache
+without adding records to it, and that the command succeeds. Exits with a
+non-zero status on any failure.
+
+Usage:
+    python benchmarks/cli_check.py --games 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+from synthetic_logs import write_logs
+
+from tta_analysis.cli import main as cli_main
+from tta_analysis.series import Series
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    """ Prints and records a failure if the condition does not hold.
+    """
+    if not condition:
+        print(f"FAIL: {message}")
+        failures.append(message)
+
+    return None
+
+
+def run(base_dir: str, out_dir: str) -> dict:
+    """ Runs aggregate and both exports. Returns each output by name.
+    """
+    commands = dict(
+        card_selection=["aggregate"],
+        state=["export", "--frame", "state", "--chunk-size", "2"],
+        actions=["export", "--frame", "actions", "--chunk-size", "2"]
+    )
+    outputs = {}
+
+    for name, command in commands.items():
+        output = os.path.join(out_dir, f"{name}.csv")
+        status = cli_main(
+            [*command, base_dir, "--workers", "1", "--output", output]
+        )
+
+        check(status == 0, f"{' '.join(command)} exited with {status}")
+        outputs[name] = pd.read_csv(output)
+
+    return outputs
+
+
+def count_files(directory: str) -> int:
+    """ Returns the number of files under a directory.
+    """
+    return sum(len(files) for _, _, files in os.walk(directory))
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        out_dir = os.path.join(temp_dir, "out")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(temp_dir, "cache")
+        os.makedirs(out_dir)
+
+        game_files = write_logs(base_dir, args.games)
+
+        with open(os.path.join(base_dir, "bad.yaml"), "w") as f:
+            f.write("round_1:\n    yellow: [unclosed\n")
+
+        first = run(base_dir, out_dir)
+        cached = count_files(os.environ["XDG_CACHE_HOME"])
+
+        print(f"records cached in $XDG_CACHE_HOME: {cached}")
+        check(cached > 0, "nothing was cached in $XDG_CACHE_HOME")
+
+        series = Series(game_files=tuple(game_files), base_dir=base_dir)
+        expected = dict(
+            card_selection=len(series.card_selection_df),
+            state=len(series.series_state_df),
+            actions=len(series.actions_df)
+        )
+        rows = {name: len(output) for name, output in first.items()}
+
+        print(f"rows written: {rows}, expected {expected}")
+        check(rows == expected, "the outputs do not match the good logs")
+        check(
+            set(first["actions"].game) == {
+                os.path.splitext(game_file)[0] for game_file in game_files
+            },
+            "the exported actions are not those of the good logs"
+        )
+
+        second = run(base_dir, out_dir)
+
+        check(
+            count_files(os.environ["XDG_CACHE_HOME"]) == cached,
+            "the second run added records to the cache"
+        )
+        check(
+            all(first[name].equals(second[name]) for name in first),
+            "the second run wrote other outputs"
+        )
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
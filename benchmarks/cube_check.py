@@ -0,0 +1,127 @@
+""" Checks the selection cube's roll-ups and slices against grouping the
+actions directly.
+
+Writes a folder of small game logs and compares, for every player, roll-ups
+of Series.selection_cube by several groupings, a slice by age and the cube's
+card_selection_df with the same tables grouped from actions_df. Also checks
+that merging the cubes of two halves of the games and a to_dict round trip
+keep the cells. Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/cube_check.py --games 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+from synthetic_logs import write_logs
+
+from tta_analysis.aggregates import assign_card_dimensions
+from tta_analysis.cube import SelectionCube
+from tta_analysis.series import ALL_PLAYERS, Series
+
+failures = []
+
+
+def check_frames(
+    name: str,
+    result: pd.DataFrame,
+    expected: pd.DataFrame
+) -> None:
+    """ Records a failure if two frames differ, ignoring row order and
+    dtypes.
+    """
+    columns = list(expected.columns)
+
+    try:
+        pd.testing.assert_frame_equal(
+            result[columns].sort_values(columns).reset_index(drop=True),
+            expected.sort_values(columns).reset_index(drop=True),
+            check_dtype=False
+        )
+
+    except AssertionError as error:
+        print(f"FAIL: {name}\n{error}")
+        failures.append(name)
+
+    return None
+
+
+def group_selections(selects: pd.DataFrame, by: list) -> pd.DataFrame:
+    """ Returns the selection count and CA sum of the selections by the
+    columns.
+    """
+    return (
+        selects
+        .groupby(by, as_index=False)
+        .agg(count=("ca", "size"), ca_sum=("ca", "sum"))
+    )
+
+
+def main() -> int:
+    """ Runs the checks and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        write_logs(base_dir, args.games)
+
+        series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+        actions_df = series.actions_df
+        cube = series.selection_cube
+
+        selects = (
+            actions_df[actions_df.action == "select"]
+            .assign(ca=lambda df: df.ca.apply(int))
+            .merge(
+                assign_card_dimensions(
+                    pd.DataFrame(dict(card=actions_df.card.unique()))
+                ).rename(columns=dict(age="card_age")),
+                on="card"
+            )
+        )
+
+        for by in (["card"], ["age", "player"], ["round_number"], ["color"]):
+            check_frames(
+                f"roll_up by {', '.join(by)}",
+                cube.roll_up(*by),
+                group_selections(selects, by)
+            )
+
+        check_frames(
+            "slice by age, rolled up by card",
+            cube.slice(age=1).roll_up("card"),
+            group_selections(selects[selects.age == 1], ["card"])
+        )
+        check_frames(
+            "card_selection_df",
+            cube.card_selection_df(),
+            series.card_selection_df
+        )
+
+        games = sorted(set(actions_df.game))
+        first = actions_df.game.isin(games[:len(games) // 2])
+        merged = SelectionCube.from_actions(actions_df[first]).merge(
+            SelectionCube.from_actions(actions_df[~first])
+        )
+
+        check_frames("merged halves", merged.cells, cube.cells)
+        check_frames(
+            "to_dict round trip",
+            SelectionCube.from_dict(cube.to_dict()).cells,
+            cube.cells
+        )
+
+        print(f"cells: {len(cube.cells)}, failed checks: {len(failures)}")
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+""" Checks that Series game filters match filtering fully parsed games, and
+that rejected games are never parsed in full.
+
+Writes a folder of small game logs of different lengths, some without an
+age change, and compares the files matched by several GameFilters with the
+files whose parsed games match the same predicates, for one player and for
+every player. Also counts the logs read in full while analyzing the
+filtered series, which must be the matching logs only; the record stage
+streams rounds instead. Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/filter_check.py --games 12
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import attr
+from synthetic_logs import game_log
+
+import tta_analysis.records
+from tta_analysis.filters import GameFilter
+from tta_analysis.game import Game
+from tta_analysis.series import ALL_PLAYERS, Series
+
+reads = [0]
+failures = []
+
+filters = (
+    GameFilter(min_rounds=8),
+    GameFilter(max_rounds=9, min_age=1),
+    GameFilter(max_age=0),
+    GameFilter(pattern="game_00*.yaml", max_size=10 ** 6),
+    GameFilter(selected=("Monarchy",)),
+    GameFilter(min_rounds=7, selected=("Bronze", "Iron"))
+)
+
+
+def counting_read(path: str, read_record=tta_analysis.records.read_record):
+    """ Counts a full read of a game log and reads its record.
+    """
+    reads[0] += 1
+
+    return read_record(path)
+
+
+def parsed_match(game_filter: GameFilter, game: Game, players: tuple) -> bool:
+    """ Returns whether a fully parsed game matches the filter; the cards
+    must be selected by one of the players.
+    """
+    # age_changes starts with the initial age, age 0.
+    ages = len(game.age_changes) - 1
+    selected = {
+        action.card
+        for color, view in game.for_players(players=players).items()
+        for turn in view.turns
+        if turn.player_turn
+        for action in turn.actions
+        if action.action == "select"
+    }
+
+    return (
+        game_filter.match_metadata(game.game_file, game.base_dir)
+        and (
+            game_filter.min_rounds is None
+            or game.game_length >= game_filter.min_rounds
+        )
+        and (
+            game_filter.max_rounds is None
+            or game.game_length <= game_filter.max_rounds
+        )
+        and (game_filter.min_age is None or ages >= game_filter.min_age)
+        and (game_filter.max_age is None or ages <= game_filter.max_age)
+        and set(game_filter.selected) <= selected
+    )
+
+
+def main() -> int:
+    """ Runs the checks and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        os.makedirs(base_dir)
+
+        # Games of 6 to 10 rounds; every third game stays in age I.
+        for i in range(args.games):
+            text = game_log(n_rounds=6 + i % 5, seed=i)
+
+            with open(os.path.join(base_dir, f"game_{i:03d}.yaml"), "w") as f:
+                f.write(text if i % 3 else text.replace("    age:\n", ""))
+
+        tta_analysis.records.read_record = counting_read
+
+        for player in ("yellow", ALL_PLAYERS):
+            for game_filter in filters:
+                reads[0] = 0
+                series = Series.from_folder(
+                    base_dir,
+                    player=player,
+                    game_filter=game_filter
+                )
+                series.actions_df
+                read = reads[0]
+                matched = series.filtered_game_files
+
+                expected = tuple(
+                    game_file
+                    for game_file in series.game_files
+                    if parsed_match(
+                        game_filter,
+                        Game(game_file, base_dir),
+                        ("yellow",) if player == "yellow" else None
+                    )
+                )
+
+                predicates = {
+                    name: value
+                    for name, value in attr.asdict(
+                        game_filter,
+                        retain_collection_types=True
+                    ).items()
+                    if value not in (None, ())
+                }
+
+                print(
+                    f"{player}, {predicates}: {len(matched)} matched, "
+                    f"{read} read in full"
+                )
+
+                if matched != expected:
+                    print(f"FAIL: expected {expected}")
+                    failures.append(game_filter)
+
+                if read != len(matched):
+                    print(f"FAIL: expected {len(matched)} full reads")
+                    failures.append(game_filter)
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+""" Benchmarks the time taken to import tta_analysis and guards against heavy
+dependencies (pandas, plotnine, yaml) being imported eagerly.
+
+Each measurement runs in a fresh interpreter so that previously imported
+modules do not hide the cost. Exits with a non-zero status if any heavy
+dependency is imported or the median import time exceeds the budget.
+
+Usage:
+    python benchmarks/import_time.py --repeat 5 --budget 0.25
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+heavy_modules = ("matplotlib", "pandas", "plotnine", "scipy", "yaml")
+
+measure_script = f"""
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import tta_analysis
+elapsed = time.perf_counter() - start
+
+print(json.dumps(dict(
+    elapsed=elapsed,
+    loaded=[m for m in {heavy_modules!r} if m in sys.modules]
+)))
+"""
+
+
+def measure_import() -> dict:
+    """ Imports tta_analysis in a fresh interpreter. Returns the import time
+    in seconds and the heavy dependencies that were loaded.
+    """
+    output = subprocess.run(
+        (sys.executable, "-c", measure_script),
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True
+    ).stdout
+
+    return json.loads(output)
+
+
+def main() -> int:
+    """ Runs the benchmark and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0.25,
+        help="Maximum median import time in seconds."
+    )
+    args = parser.parse_args()
+
+    results = tuple(measure_import() for _ in range(args.repeat))
+
+    median = statistics.median(result["elapsed"] for result in results)
+    loaded = sorted({m for result in results for m in result["loaded"]})
+
+    print(f"import tta_analysis: median {median * 1000:.1f} ms "
+          f"over {args.repeat} runs (budget {args.budget * 1000:.0f} ms)")
+
+    if loaded:
+        print(f"FAIL: imported eagerly: {', '.join(loaded)}")
+
+    if median > args.budget:
+        print("FAIL: import time exceeds the budget")
+
+    return int(bool(loaded) or median > args.budget)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
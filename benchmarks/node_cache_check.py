@@ -0,0 +1,198 @@
+""" Checks the node cache and its invalidation paths.
+
+Writes a folder of small game logs and checks that:
+
+- without a memory budget, only the caches of the max_instances most
+  recently used games are kept, and evicted games recompute equal frames;
+- under a memory budget, spilled games reload frames equal to those of an
+  unbudgeted series, and a missing spill_dir is created;
+- the temporary spill directory used when spill_dir is not set is removed
+  with the series;
+- changing the player drops the frames but keeps the parsed records, and
+  leaves the games held by callers unchanged.
+
+Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/node_cache_check.py --games 12
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+
+from synthetic_logs import write_logs
+
+import tta_analysis.records
+from tta_analysis import cache
+from tta_analysis.cache import node_cache
+from tta_analysis.game import Game
+from tta_analysis.series import Series
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    """ Prints and records a failure if the condition does not hold.
+    """
+    if not condition:
+        print(f"FAIL: {message}")
+        failures.append(message)
+
+    return None
+
+
+def count_parses() -> list:
+    """ Counts the game logs parsed from now on. Returns a list holding the
+    count.
+    """
+    parse_record = tta_analysis.records.parse_record
+    count = [0]
+
+    def counting_parse(text: str):
+        count[0] += 1
+
+        return parse_record(text)
+
+    tta_analysis.records.parse_record = counting_parse
+
+    return count
+
+
+def check_bounded_cache(base_dir: str, game_files: list) -> None:
+    """ Checks that only the max_instances most recently used games keep
+    their caches without a memory budget.
+    """
+    max_instances = cache.max_instances
+    cache.max_instances = 4
+
+    try:
+        games = [Game(game_file, base_dir) for game_file in game_files]
+        frames = [game.state_df for game in games]
+        kept = sum(bool(node_cache(game)) for game in games)
+
+        print(f"games with cached nodes: {kept} of {len(games)}")
+        check(kept <= 4, "more than max_instances games keep their caches")
+        check(
+            not node_cache(games[0]),
+            "the least recently used game kept its cache"
+        )
+        check(
+            games[0].state_df.equals(frames[0]),
+            "an evicted game recomputed a different state_df"
+        )
+
+    finally:
+        cache.max_instances = max_instances
+
+    return None
+
+
+def check_spill(base_dir: str, temp_dir: str) -> None:
+    """ Checks that spilled games reload equal frames and that spill_dir is
+    created if missing.
+    """
+    expected = Series.from_folder(base_dir).series_state_df
+
+    spill_dir = os.path.join(temp_dir, "missing", "spill")
+    series = Series.from_folder(base_dir, max_memory=1, spill_dir=spill_dir)
+    state_df = series.series_state_df
+    spilled = len(os.listdir(spill_dir)) if os.path.isdir(spill_dir) else 0
+
+    print(f"games spilled to a missing spill_dir: {spilled}")
+    check(spilled > 0, "no game was spilled to the missing spill_dir")
+    check(
+        state_df.reset_index(drop=True).equals(
+            expected.reset_index(drop=True)
+        ),
+        "the budgeted series_state_df differs from the unbudgeted one"
+    )
+
+    game = next(iter(series.games.values()))
+    check(
+        game.state_df.equals(
+            Game(game.game_file, base_dir).state_df
+        ),
+        "a spilled game reloaded a different state_df"
+    )
+
+    return None
+
+
+def check_temporary_spill_dir(base_dir: str) -> None:
+    """ Checks that the temporary spill directory is removed with the
+    series.
+    """
+    series = Series.from_folder(base_dir, max_memory=1)
+    series.series_state_df
+    spill_dir = series.memory_budget.spill_dir
+
+    check(
+        spill_dir is not None and os.path.isdir(spill_dir),
+        "no temporary spill directory was created"
+    )
+
+    del series
+    gc.collect()
+
+    removed = not os.path.exists(spill_dir)
+
+    print(f"temporary spill directory removed: {removed}")
+    check(removed, "the temporary spill directory was left behind")
+
+    return None
+
+
+def check_invalidation(base_dir: str) -> None:
+    """ Checks that changing the player keeps the parsed records and leaves
+    the games held by callers unchanged.
+    """
+    series = Series.from_folder(base_dir)
+    series.actions_df
+    held = dict(series.games)
+
+    count = count_parses()
+    series.player = "red"
+    players = set(series.actions_df.player)
+
+    print(f"logs parsed after changing the player: {count[0]}")
+    check(count[0] == 0, "changing the player parsed the logs again")
+    check(players == {"red"}, "actions_df was not rebuilt for the player")
+    check(
+        all(game.player == "yellow" for game in held.values()),
+        "games held by callers were changed"
+    )
+    check(
+        all(
+            "record_json" in node_cache(game)
+            for game in series.games.values()
+        ),
+        "reused games dropped their parsed records"
+    )
+
+    return None
+
+
+def main() -> int:
+    """ Runs the checks and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        game_files = write_logs(base_dir, args.games)
+
+        check_bounded_cache(base_dir, game_files)
+        check_spill(base_dir, temp_dir)
+        check_temporary_spill_dir(base_dir)
+        check_invalidation(base_dir)
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
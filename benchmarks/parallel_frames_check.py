@@ -0,0 +1,91 @@
+""" Checks that frames built in worker processes match those built in this
+process.
+
+Writes a folder of small game logs and builds series_state_df and
+actions_df with and without workers, for one player and for every player,
+then compares them ignoring row order and dtypes. Exits with a non-zero
+status on any failure.
+
+Usage:
+    python benchmarks/parallel_frames_check.py --games 9 --workers 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+from synthetic_logs import write_logs
+
+from tta_analysis.series import ALL_PLAYERS, Series
+
+
+def same_frames(parallel: pd.DataFrame, serial: pd.DataFrame) -> bool:
+    """ Returns whether two frames hold the same rows, ignoring row order
+    and dtypes.
+    """
+    columns = sorted(serial.columns)
+
+    if sorted(parallel.columns) != columns:
+        print(f"columns {sorted(parallel.columns)}, expected {columns}")
+
+        return False
+
+    try:
+        pd.testing.assert_frame_equal(
+            parallel[columns].sort_values(columns).reset_index(drop=True),
+            serial[columns].sort_values(columns).reset_index(drop=True),
+            check_dtype=False
+        )
+
+    except AssertionError as error:
+        print(error)
+
+        return False
+
+    return True
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=9)
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+
+    failed = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        write_logs(base_dir, args.games)
+
+        for player in ("yellow", ALL_PLAYERS):
+            serial = Series.from_folder(base_dir, player=player)
+            parallel = Series.from_folder(
+                base_dir,
+                player=player,
+                workers=args.workers
+            )
+
+            for frame in ("series_state_df", "actions_df"):
+                same = same_frames(
+                    getattr(parallel, frame),
+                    getattr(serial, frame)
+                )
+
+                print(
+                    f"{player} {frame}: {len(getattr(parallel, frame))} "
+                    f"rows, {'same' if same else 'DIFFERENT'}"
+                )
+
+                if not same:
+                    print(f"FAIL: {player} {frame} differs")
+                    failed = True
+
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
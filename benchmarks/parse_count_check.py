@@ -0,0 +1,125 @@
+""" Checks that each game log is parsed at most once per analysis.
+
+Writes a folder of small game logs and counts the calls to
+tta_analysis.records.parse_record in this process while:
+
+- viewing a game from every player with Game.for_players;
+- building actions_df and series_state_df of every player;
+- exporting the state tensor of every player;
+- building the frames in worker processes, which parse the logs instead;
+- updating a similarity index, then updating it again unchanged.
+
+Exits with a non-zero status if a log is parsed more than once, or at all
+where it should not be.
+
+Usage:
+    python benchmarks/parse_count_check.py --games 9 --workers 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from synthetic_logs import write_logs
+
+import tta_analysis.records
+from tta_analysis.game import Game
+from tta_analysis.series import ALL_PLAYERS, Series
+from tta_analysis.similarity import SimilarityIndex
+
+parses = [0]
+failures = []
+
+
+def counting_parse(text: str, parse_record=tta_analysis.records.parse_record):
+    """ Counts a parse and parses the record.
+    """
+    parses[0] += 1
+
+    return parse_record(text)
+
+
+def expect(name: str, n_parses: int, run) -> None:
+    """ Runs a step and records a failure if it did not parse the expected
+    number of logs.
+
+    Args:
+        name: Description of the step.
+        n_parses: Expected number of parses.
+        run: Function running the step.
+    """
+    parses[0] = 0
+    run()
+
+    print(f"{name}: {parses[0]} parses, expected {n_parses}")
+
+    if parses[0] != n_parses:
+        print(f"FAIL: {name}")
+        failures.append(name)
+
+    return None
+
+
+def main() -> int:
+    """ Runs the checks and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=9)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    tta_analysis.records.parse_record = counting_parse
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        write_logs(base_dir, args.games)
+
+        def view_game() -> None:
+            for view in Game("game_000.yaml", base_dir).for_players().values():
+                view.state_df
+
+        def build_frames() -> None:
+            series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+            series.actions_df
+            series.series_state_df
+
+        def export_tensor() -> None:
+            Series.from_folder(base_dir, player=ALL_PLAYERS).to_tensor(
+                os.path.join(temp_dir, "states.npy")
+            )
+
+        def build_frames_in_workers() -> None:
+            series = Series.from_folder(
+                base_dir,
+                player=ALL_PLAYERS,
+                workers=args.workers
+            )
+            series.actions_df
+            series.series_state_df
+
+        index = SimilarityIndex()
+        series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+
+        expect("Game.for_players", 1, view_game)
+        expect("actions_df and series_state_df", args.games, build_frames)
+        expect("to_tensor", args.games, export_tensor)
+        expect("frames built in workers", 0, build_frames_in_workers)
+        expect(
+            "SimilarityIndex.update",
+            args.games,
+            lambda: index.update(series)
+        )
+        expect(
+            "unchanged SimilarityIndex.update",
+            0,
+            lambda: index.update(
+                Series.from_folder(base_dir, player=ALL_PLAYERS)
+            )
+        )
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+""" Checks that Game.render_plot renders every state plot through the render
+cache, reuses the cached file while the game is unchanged and renders again
+once the log changes.
+
+Writes a small game log, renders the income, strength and population plots
+twice and compares the files in the render cache. Exits with a non-zero
+status on any failure.
+
+Usage:
+    python benchmarks/render_cache_check.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from synthetic_logs import game_log, write_logs
+
+from tta_analysis.game import Game, plot_columns
+
+
+def render_all(base_dir: str, cache_dir: str, out_dir: str) -> dict:
+    """ Renders every plot of the game and copies it to out_dir. Returns the
+    modification time of each cached plot by plot name.
+    """
+    game = Game("game_000.yaml", base_dir, render_cache_dir=cache_dir)
+    mtimes = {}
+
+    for plot_name in plot_columns:
+        game.render_plot(
+            plot_name,
+            filename=os.path.join(out_dir, f"{plot_name}.png")
+        )
+        mtimes[plot_name] = os.path.getmtime(game.render_plot(plot_name))
+
+    return mtimes
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    failed = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        cache_dir = os.path.join(temp_dir, "cache")
+        out_dir = os.path.join(temp_dir, "out")
+        write_logs(base_dir, 1)
+
+        start = time.perf_counter()
+        first = render_all(base_dir, cache_dir, out_dir)
+        rendered = time.perf_counter() - start
+
+        start = time.perf_counter()
+        second = render_all(base_dir, cache_dir, out_dir)
+        reused = time.perf_counter() - start
+
+        print(
+            f"rendered {len(first)} plots in {rendered:.2f} s, "
+            f"reused them in {reused:.2f} s"
+        )
+
+        if first != second:
+            print("FAIL: unchanged plots were rendered again")
+            failed = True
+
+        missing = [
+            plot_name
+            for plot_name in plot_columns
+            if not os.path.exists(os.path.join(out_dir, f"{plot_name}.png"))
+        ]
+
+        if missing:
+            print(f"FAIL: not copied to the file name: {', '.join(missing)}")
+            failed = True
+
+        with open(os.path.join(base_dir, "game_000.yaml"), "w") as f:
+            f.write(game_log(seed=1))
+
+        render_all(base_dir, cache_dir, out_dir)
+        cached = len(os.listdir(cache_dir))
+
+        print(f"cached plots after the log changed: {cached}")
+
+        if cached != 2 * len(plot_columns):
+            print(f"FAIL: expected {2 * len(plot_columns)} cached plots")
+            failed = True
+
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+""" Checks that render_reports renders only the games whose reports are out of
+date.
+
+Writes a folder of small game logs and a corrupt one and renders the
+reports of every player in a process pool three times: from scratch, again
+unchanged, and after editing one log in place and deleting another game's
+plot. Checks the number of games rendered and skipped each time and that
+the corrupt log is reported without failing the others. Exits with a
+non-zero status on any failure.
+
+Usage:
+    python benchmarks/render_reports_check.py --games 4 --workers 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from synthetic_logs import game_log, write_logs
+
+from tta_analysis.series import ALL_PLAYERS, Series
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    """ Prints and records a failure if the condition does not hold.
+    """
+    if not condition:
+        print(f"FAIL: {message}")
+        failures.append(message)
+
+    return None
+
+
+def render(series: Series, out_dir: str, workers: int, expected: int) -> None:
+    """ Renders the reports and checks the number of games rendered.
+
+    Args:
+        series: Series of the game logs, with the corrupt one.
+        out_dir: Folder the reports are written to.
+        workers: Number of processes.
+        expected: Number of games expected to be rendered.
+    """
+    result = series.render_reports(out_dir, workers=workers)
+    n_games = len(series.filtered_game_files) - 1
+
+    print(f"rendered {result.rendered}, skipped {result.skipped}")
+    check(
+        result.rendered == expected,
+        f"rendered {result.rendered} games, expected {expected}"
+    )
+    check(
+        result.skipped == n_games - expected,
+        f"skipped {result.skipped} games, expected {n_games - expected}"
+    )
+    check(list(result.errors) == ["bad"], "the corrupt log was not reported")
+    check(
+        os.path.exists(os.path.join(out_dir, "index.html")),
+        "index.html was not written"
+    )
+
+    return None
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        out_dir = os.path.join(temp_dir, "reports")
+        game_files = write_logs(base_dir, args.games)
+
+        with open(os.path.join(base_dir, "bad.yaml"), "w") as f:
+            f.write("round_1:\n    yellow: [unclosed\n")
+
+        series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+
+        render(series, out_dir, args.workers, args.games)
+        render(series, out_dir, args.workers, 0)
+
+        # Edit a log in place; its size and modification time change.
+        path = os.path.join(base_dir, game_files[0])
+        mtime = os.path.getmtime(path)
+
+        with open(path, "w") as f:
+            f.write(game_log(n_rounds=10, seed=100))
+        os.utime(path, (mtime + 10, mtime + 10))
+
+        game_dir = os.path.join(out_dir, os.path.splitext(game_files[1])[0])
+        os.remove(
+            os.path.join(
+                game_dir,
+                next(
+                    plot
+                    for plot in sorted(os.listdir(game_dir))
+                    if plot.endswith(".png")
+                )
+            )
+        )
+
+        render(series, out_dir, args.workers, 2)
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
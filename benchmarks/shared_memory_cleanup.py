@@ -0,0 +1,115 @@
+""" Checks that building frames in worker processes leaves no shared-memory
+blocks behind, both when every log parses and when one log is corrupt.
+
+Writes a folder of small game logs, runs tta_analysis.parallel.load_frames
+over it with one game per chunk, and compares the blocks in /dev/shm before
+and after. Exits with a non-zero status if any block is left behind or the
+corrupt log does not raise.
+
+Usage:
+    python benchmarks/shared_memory_cleanup.py --games 16 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from tta_analysis.parallel import load_frames
+
+shm_dir = "/dev/shm"
+
+game_log = """round_1:
+    yellow:
+        select: [1, Bronze]
+        income: [1, 2, 3, 4]
+        resources: [1, 1, 1, 1]
+        population: [4, 2, 1]
+        strength: 2
+        draw: 1
+    red:
+        select: [2, Iron]
+        income: [1, 2, 3, 4]
+        resources: [1, 1, 1, 1]
+        population: [4, 2, 1]
+        strength: 2
+        draw: 1
+"""
+
+corrupt_log = "round_1:\n    yellow: [unclosed\n"
+
+
+def blocks() -> set:
+    """ Returns the names of the shared-memory blocks created by Python.
+    """
+    return {name for name in os.listdir(shm_dir) if name.startswith("psm_")}
+
+
+def run(base_dir: str, game_files: list, workers: int) -> bool:
+    """ Loads the frames of the games. Returns whether loading raised.
+    """
+    try:
+        load_frames(
+            game_files,
+            base_dir=base_dir,
+            workers=workers,
+            chunk_size=1
+        )
+
+    except Exception:
+        return True
+
+    return False
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if not os.path.isdir(shm_dir):
+        print(f"SKIP: {shm_dir} does not exist")
+        return 0
+
+    failed = False
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        game_files = [f"game_{i:03d}.yaml" for i in range(args.games)]
+
+        for i, game_file in enumerate(game_files):
+            with open(os.path.join(base_dir, game_file), "w") as f:
+                f.write(corrupt_log if i == args.games // 2 else game_log)
+
+        valid_files = [
+            game_file
+            for i, game_file in enumerate(game_files)
+            if i != args.games // 2
+        ]
+
+        for label, files, should_raise in (
+            ("valid logs", valid_files, False),
+            ("one corrupt log", game_files, True)
+        ):
+            before = blocks()
+            raised = run(base_dir, files, args.workers)
+            leaked = blocks() - before
+
+            print(f"{label}: raised={raised}, leaked blocks={len(leaked)}")
+
+            if raised != should_raise:
+                expected = "raise" if should_raise else "not raise"
+                print(f"FAIL: {label} should {expected}")
+                failed = True
+
+            if leaked:
+                print(f"FAIL: leaked {', '.join(sorted(leaked))}")
+                failed = True
+
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
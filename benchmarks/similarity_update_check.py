@@ -0,0 +1,89 @@
+""" Checks that incremental similarity index updates match a fresh index.
+
+Writes a folder of small game logs, indexes it, saves and reloads the index,
+then edits one log in place and removes another. Checks that updating the
+reloaded index re-indexes only the views of the edited game and that every
+query then returns the same games and scores as an index built from
+scratch. Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/similarity_update_check.py --games 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from synthetic_logs import game_log, write_logs
+
+from tta_analysis.series import ALL_PLAYERS, Series
+from tta_analysis.similarity import SimilarityIndex
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=10)
+    args = parser.parse_args()
+
+    failed = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        game_files = write_logs(base_dir, args.games)
+        index_path = os.path.join(temp_dir, "index.npz")
+
+        index = SimilarityIndex()
+        index.update(Series.from_folder(base_dir, player=ALL_PLAYERS))
+        index.save(index_path)
+
+        # Edit a log in place; its size and modification time change.
+        path = os.path.join(base_dir, game_files[0])
+        mtime = os.path.getmtime(path)
+
+        with open(path, "w") as f:
+            f.write(game_log(n_rounds=10, seed=100))
+        os.utime(path, (mtime + 10, mtime + 10))
+
+        os.remove(os.path.join(base_dir, game_files[-1]))
+
+        series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+        updated = SimilarityIndex.load(index_path)
+        changed = updated.update(series)
+
+        fresh = SimilarityIndex()
+        fresh.update(series)
+
+        edited = os.path.splitext(game_files[0])[0]
+        views = sum(key[0] == edited for key in fresh.keys)
+
+        print(f"views re-indexed after editing one log: {changed}")
+
+        if changed != views:
+            print(f"FAIL: expected only the {views} edited views to change")
+            failed = True
+
+        if sorted(updated.keys) != sorted(fresh.keys):
+            print("FAIL: the updated index holds other games")
+            failed = True
+
+        else:
+            differing = [
+                key
+                for key in fresh.keys
+                if not updated.query(key=key).equals(fresh.query(key=key))
+            ]
+
+            print(f"keys queried: {len(fresh.keys)}, differing: {differing}")
+
+            if differing:
+                print("FAIL: the updated index answers queries differently")
+                failed = True
+
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
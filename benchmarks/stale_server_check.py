@@ -0,0 +1,137 @@
+""" Checks that the analysis server never serves stale tables.
+
+Starts an AnalysisServer on a folder holding only a log that does not
+parse, then adds logs, adds one more and edits one in place, rebuilding
+after each change. Checks that the bad log is left out and listed in the
+index, that every ETag changes with the corpus and that each table matches
+a Series of the good logs as they are on disk, with the record cache in use.
+Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/stale_server_check.py --games 6
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from synthetic_logs import game_log, write_logs
+
+from tta_analysis.server import AnalysisServer, tables
+from tta_analysis.series import Series
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    """ Prints and records a failure if the condition does not hold.
+    """
+    if not condition:
+        print(f"FAIL: {message}")
+        failures.append(message)
+
+    return None
+
+
+def check_tables(server: AnalysisServer, good_files: list) -> dict:
+    """ Checks the index and tables served against a Series of the good
+    logs. Returns the ETag of the index and of each table.
+    """
+    status, index_etag, body = server.response("")
+    index = json.loads(body)
+
+    check(status == 200, f"the index returned {status}")
+    check(
+        index.get("games") == len(good_files),
+        f"the index counts {index.get('games')} games, "
+        f"expected {len(good_files)}"
+    )
+    check(
+        list(index.get("failed", {})) == ["bad.yaml"],
+        "the bad log is not listed in the index"
+    )
+
+    expected = Series(
+        game_files=tuple(good_files),
+        base_dir=server.base_dir,
+        player=server.player
+    ).evaluate(*tables)
+    etags = {"": index_etag}
+
+    for name in tables:
+        status, etags[name], body = server.response(name)
+
+        check(
+            json.loads(body)
+            == json.loads(expected[name].to_json(orient="records")),
+            f"{name} is stale"
+        )
+
+    return etags
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        os.makedirs(base_dir)
+
+        with open(os.path.join(base_dir, "bad.yaml"), "w") as f:
+            f.write("round_1:\n    yellow: [unclosed\n")
+
+        server = AnalysisServer(
+            base_dir,
+            record_cache_dir=os.path.join(temp_dir, "records")
+        )
+
+        server.refresh(force=True, wait=True)
+        status, _, body = server.response("")
+
+        print(f"only a bad log: {status} {json.loads(body).get('error')}")
+        check(status == 503, "tables were served without a good log")
+
+        good_files = write_logs(base_dir, args.games)
+        server.refresh(force=True, wait=True)
+        etags = check_tables(server, good_files)
+
+        print(f"{len(good_files)} logs added: {etags['']}")
+
+        good_files += write_logs(base_dir, args.games + 1)[args.games:]
+        server.refresh(force=True, wait=True)
+        added_etags = check_tables(server, good_files)
+
+        print(f"one more log added: {added_etags['']}")
+        check(
+            all(etags[name] != added_etags[name] for name in etags),
+            "an ETag did not change when a log was added"
+        )
+
+        # Edit a log in place; its size and modification time change.
+        path = os.path.join(base_dir, good_files[0])
+        mtime = os.path.getmtime(path)
+
+        with open(path, "w") as f:
+            f.write(game_log(n_rounds=10, seed=100))
+        os.utime(path, (mtime + 10, mtime + 10))
+
+        server.refresh(force=True, wait=True)
+        edited_etags = check_tables(server, good_files)
+
+        print(f"one log edited: {edited_etags['']}")
+        check(
+            all(added_etags[name] != edited_etags[name] for name in etags),
+            "an ETag did not change when a log was edited"
+        )
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+""" Checks that the map-reduce work queue never merges stale shard results.
+
+Writes a folder of small game logs, submits them to a WorkQueue, processes
+and collects the shards, then edits one log in place and submits the folder
+again. Checks that only the edited log's shard is processed again and that
+both collected aggregates match a single Series of the logs as they were at
+submission. Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/stale_shards_check.py --games 8 --shard-size 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+from synthetic_logs import game_log, write_logs
+
+from tta_analysis.aggregates import PartialAggregate
+from tta_analysis.mapreduce import WorkQueue
+from tta_analysis.series import Series
+
+
+def same_aggregate(
+    collected: PartialAggregate,
+    expected: PartialAggregate
+) -> bool:
+    """ Returns whether two aggregates have the same tables.
+    """
+    try:
+        for table in ("actions_grouped_df", "round_summary_df"):
+            pd.testing.assert_frame_equal(
+                getattr(collected, table)().reset_index(drop=True),
+                getattr(expected, table)().reset_index(drop=True),
+                check_dtype=False
+            )
+
+    except AssertionError as error:
+        print(error)
+
+        return False
+
+    return True
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--shard-size", type=int, default=2)
+    args = parser.parse_args()
+
+    failed = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        game_files = write_logs(base_dir, args.games)
+        queue = WorkQueue(os.path.join(temp_dir, "queue"))
+
+        n_shards = queue.submit(Series.from_folder(base_dir), args.shard_size)
+        processed = queue.work()
+
+        print(f"first submission: processed {processed} of {n_shards} shards")
+
+        if not same_aggregate(
+            queue.collect(),
+            Series.from_folder(base_dir).partial_aggregate
+        ):
+            print("FAIL: the collected aggregate differs from the series")
+            failed = True
+
+        # Edit a log in place; its size and modification time change.
+        path = os.path.join(base_dir, game_files[-1])
+        mtime = os.path.getmtime(path)
+
+        with open(path, "w") as f:
+            f.write(game_log(n_rounds=10, seed=args.games))
+        os.utime(path, (mtime + 10, mtime + 10))
+
+        queue.submit(Series.from_folder(base_dir), args.shard_size)
+        processed = queue.work()
+
+        print(f"after editing one log: processed {processed} shard")
+
+        if processed != 1:
+            print("FAIL: expected only the edited log's shard to run again")
+            failed = True
+
+        if not same_aggregate(
+            queue.collect(),
+            Series.from_folder(base_dir).partial_aggregate
+        ):
+            print("FAIL: a stale shard result was merged")
+            failed = True
+
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
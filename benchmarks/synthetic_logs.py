@@ -0,0 +1,86 @@
+""" Writes folders of small, valid game logs for the checks in benchmarks/.
+
+Each log has two players who select, build and log their state every round,
+with an age change halfway through. Logs are reproducible from their seed.
+
+Usage from a check in this folder:
+    from synthetic_logs import write_logs
+"""
+
+import os
+import random
+from typing import List
+
+players = ("yellow", "red")
+cards = (
+    "Bronze", "Iron", "Philosophy", "Alchemy", "Religion", "Theology",
+    "Drama", "Warriors", "Swordsmen", "Knights", "Monarchy", "Cartography"
+)
+
+
+def values(rng: random.Random, n: int) -> str:
+    """ Returns n random single-digit values, comma separated.
+    """
+    return ", ".join(str(rng.randint(0, 9)) for _ in range(n))
+
+
+def game_log(n_rounds: int = 8, seed: int = 0) -> str:
+    """ Returns the text of a game log.
+
+    Args:
+        n_rounds: Number of rounds in the game.
+        seed: Seed of the cards selected and the states logged.
+    """
+    rng = random.Random(seed)
+    lines = []
+
+    for round_number in range(1, n_rounds + 1):
+        lines.append(f"round_{round_number}:")
+
+        for i, player in enumerate(players):
+            if i == 1 and round_number == n_rounds // 2 + 1:
+                lines.append("    age:")
+
+            lines.append(f"    {player}:")
+            lines.append(
+                f"        select: [{rng.randint(1, 3)}, {rng.choice(cards)}]"
+            )
+
+            if rng.random() < 0.5:
+                lines.append("        build: Farm")
+
+            lines.append(f"        income: [{values(rng, 4)}]")
+            lines.append(f"        resources: [{values(rng, 4)}]")
+            lines.append(f"        population: [{values(rng, 3)}]")
+            lines.append(f"        strength: {rng.randint(1, 9)}")
+            lines.append(f"        draw: {rng.randint(0, 3)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_logs(
+    base_dir: str,
+    n_games: int,
+    n_rounds: int = 8,
+    seed: int = 0
+) -> List[str]:
+    """ Writes game logs to a folder. Returns their file names.
+
+    Args:
+        base_dir: Folder to write the logs to.
+        n_games: Number of logs.
+        n_rounds: Number of rounds in each game.
+        seed: Seed of the first log; each log gets the next seed.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    game_files = []
+
+    for i in range(n_games):
+        game_file = f"game_{i:03d}.yaml"
+
+        with open(os.path.join(base_dir, game_file), "w") as f:
+            f.write(game_log(n_rounds, seed + i))
+
+        game_files.append(game_file)
+
+    return game_files
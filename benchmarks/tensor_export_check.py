@@ -0,0 +1,99 @@
+""" Checks that the state tensor export matches the games' state tables and
+leaves no per-game frames cached on the series.
+
+Writes a folder of small game logs of different lengths, exports the state
+of every player with Series.to_tensor, then reloads the memory-mapped
+tensor. Checks that the tensor is padded to the longest game, that the mask
+marks exactly the logged rounds and that the values match each game's
+state_df. Exits with a non-zero status on any failure.
+
+Usage:
+    python benchmarks/tensor_export_check.py --games 6
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+from synthetic_logs import game_log
+
+from tta_analysis.cache import node_cache
+from tta_analysis.game import Game
+from tta_analysis.series import ALL_PLAYERS, Series
+from tta_analysis.tensor import load_tensor
+
+failures = []
+
+
+def check(condition: bool, message: str) -> None:
+    """ Prints and records a failure if the condition does not hold.
+    """
+    if not condition:
+        print(f"FAIL: {message}")
+        failures.append(message)
+
+    return None
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        os.makedirs(base_dir)
+
+        # Games of 6 to 6 + games - 1 rounds.
+        for i in range(args.games):
+            with open(os.path.join(base_dir, f"game_{i:03d}.yaml"), "w") as f:
+                f.write(game_log(n_rounds=6 + i, seed=i))
+
+        path = os.path.join(temp_dir, "states.npy")
+        series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+        series.to_tensor(path)
+
+        resident = [
+            key
+            for key, game in series.player_games.items()
+            if "state_df" in node_cache(game) or "turns" in node_cache(game)
+        ]
+        check(not resident, f"frames were left cached on {resident}")
+
+        tensor, mask, index = load_tensor(path)
+        features = index["features"]
+
+        print(
+            f"tensor of shape {tensor.shape} over {len(index['rounds'])} "
+            f"rounds and {len(features)} features"
+        )
+        check(
+            len(index["rounds"]) == 6 + args.games - 1,
+            "the tensor is not padded to the longest game"
+        )
+
+        for i, (name, color) in enumerate(index["games"]):
+            state_df = Game(f"{name}.yaml", base_dir, player=color).state_df
+            rounds = state_df.round_number.values - 1
+
+            check(
+                set(np.flatnonzero(mask[i])) == set(rounds),
+                f"the mask of {name} ({color}) is not its logged rounds"
+            )
+            check(
+                np.allclose(
+                    tensor[i, rounds],
+                    state_df[features].values.astype(float)
+                ),
+                f"the states of {name} ({color}) differ from its state_df"
+            )
+
+    return int(bool(failures))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
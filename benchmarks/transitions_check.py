@@ -0,0 +1,106 @@
+""" Checks the sparse card-transition counts against a plain Python count.
+
+Writes a folder of small game logs and counts the transitions between
+consecutive card selections of every player, by age of the later selection,
+with Series.transition_counts and with a loop over the actions of each game.
+Also checks that merging the counts of two halves of the games gives the
+counts of all of them. Exits with a non-zero status on any failure.
+
+Requires scipy.
+
+Usage:
+    python benchmarks/transitions_check.py --games 10
+"""
+
+import argparse
+import collections
+import os
+import sys
+import tempfile
+
+from synthetic_logs import write_logs
+
+from tta_analysis.series import ALL_PLAYERS, Series
+from tta_analysis.transitions import TransitionCounts
+
+
+def loop_counts(actions_df) -> collections.Counter:
+    """ Returns the count of each (age, player, card, next card) transition,
+    counted one game at a time.
+    """
+    counts = collections.Counter()
+    selects = actions_df[actions_df.action == "select"]
+
+    for (_, player), game_df in selects.groupby(["game", "player"]):
+        rows = tuple(game_df.itertuples())
+
+        for row, next_row in zip(rows, rows[1:]):
+            counts[(next_row.age, player, row.card, next_row.card)] += 1
+
+    return counts
+
+
+def sparse_counts(transition_counts: TransitionCounts) -> collections.Counter:
+    """ Returns the count of each (age, player, card, next card) transition
+    held in sparse matrices.
+    """
+    counts = collections.Counter()
+
+    for (age, player), matrix in transition_counts.transitions.items():
+        coo = matrix.tocoo()
+
+        for i, j, count in zip(coo.row, coo.col, coo.data):
+            key = (age, player, transition_counts.cards[i])
+            counts[key + (transition_counts.cards[j],)] += int(count)
+
+    return counts
+
+
+def main() -> int:
+    """ Runs the check and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--games", type=int, default=10)
+    args = parser.parse_args()
+
+    failed = False
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_dir = os.path.join(temp_dir, "games")
+        write_logs(base_dir, args.games)
+
+        series = Series.from_folder(base_dir, player=ALL_PLAYERS)
+        actions_df = series.actions_df
+        expected = loop_counts(actions_df)
+        counted = sparse_counts(series.transition_counts)
+
+        print(
+            f"transitions counted: {sum(counted.values())}, "
+            f"expected {sum(expected.values())}"
+        )
+
+        if counted != expected:
+            print("FAIL: the sparse counts differ from the loop")
+            failed = True
+
+        games = sorted(set(actions_df.game))
+        first = actions_df.game.isin(games[:len(games) // 2])
+        merged = TransitionCounts.from_actions(actions_df[first]).merge(
+            TransitionCounts.from_actions(actions_df[~first])
+        )
+
+        if sparse_counts(merged) != expected:
+            print("FAIL: the merged counts of two halves differ")
+            failed = True
+
+        if not merged.transition_df().equals(
+            series.transition_counts.transition_df()
+        ):
+            print("FAIL: the merged transition_df differs")
+            failed = True
+
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
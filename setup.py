@@ -51,10 +51,16 @@ with open(os.path.join(this_directory, "README.md"), encoding="utf-8") as f:
 install_requires = [
     "arcbound>=0.0.4",
     "attrs>=19.3.0",
+    "numpy>=1.17",
     "pandas>=0.24.1",
     "pyyaml==5.3.1"
 ]
 
+extras_require = {
+    "parquet": ["pyarrow"],
+    "sparse": ["scipy"]
+}
+
 setup(
     name="tta_analysis",
     version=get_version("tta_analysis", "release.py"),
@@ -64,9 +70,13 @@ setup(
     author=__author__,
     author_email=__email__,
     url=__url__,
-    python_requires=">=3.6",
+    python_requires=">=3.8",
     install_requires=install_requires,
+    extras_require=extras_require,
     packages=find_packages(),
+    entry_points={
+        "console_scripts": ["tta-analysis=tta_analysis.cli:main"]
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
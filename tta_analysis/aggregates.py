@@ -0,0 +1,235 @@
+""" Mergeable partial aggregates of games.
+
+A partial aggregate holds sums, counts, minima and maxima, so partials
+computed on separate shards of games can be serialized, merged in any order
+and finalized into the same tables a single series of all games produces.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import attr
+
+from .cards import camelcase_card_dict
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+state_columns = (
+    "food",
+    "rock",
+    "science",
+    "culture",
+    "strength",
+    "employed",
+    "idle",
+    "bank"
+)
+
+# Aggregation merging each column of the partial round summaries.
+round_merges = dict(
+    count="sum",
+    **{
+        f"{column}_{statistic}": merge
+        for column in state_columns
+        for statistic, merge in (
+            ("sum", "sum"),
+            ("min", "min"),
+            ("max", "max")
+        )
+    }
+)
+
+
+def assign_card_dimensions(df: pd.DataFrame) -> pd.DataFrame:
+    """ Adds the age, color and line of the card in each row; 0 for cards
+    that are not defined.
+
+    Args:
+        df: Dataframe with a card column of CamelCase card names.
+    """
+    return (
+        df
+        .assign(
+            age=lambda df: tuple(
+                card_obj.age if card_obj is not None else 0
+                for card in df.card
+                for card_obj in (camelcase_card_dict.get(card),)
+            )
+        )
+        .assign(
+            color=lambda df: tuple(
+                card_obj.color if card_obj is not None else 0
+                for card in df.card
+                for card_obj in (camelcase_card_dict.get(card),)
+            )
+        )
+        .assign(
+            line=lambda df: tuple(
+                card_obj.line if card_obj is not None else 0
+                for card in df.card
+                for card_obj in (camelcase_card_dict.get(card),)
+            )
+        )
+    )
+
+
+def frame_to_dict(df: pd.DataFrame) -> Dict:
+    """ Returns a JSON serializable dictionary of a dataframe.
+    """
+    return dict(
+        index=df.index.tolist(),
+        index_name=df.index.name,
+        columns=df.columns.tolist(),
+        data=df.values.tolist()
+    )
+
+
+def frame_from_dict(d: Dict) -> pd.DataFrame:
+    """ Returns the dataframe serialized by frame_to_dict.
+    """
+    return pd.DataFrame(
+        d["data"],
+        index=pd.Index(d["index"], name=d["index_name"]),
+        columns=d["columns"]
+    )
+
+
+@attr.s(auto_attribs=True)
+class PartialAggregate(object):
+    """ Mergeable partial aggregates of a shard of games.
+
+    Input parameters:
+        cards: Selection count and CA sum indexed by card.
+        rounds: Turn count and the sum, minimum and maximum of each state
+            column indexed by round number.
+
+    Methods:
+        from_frames: Creates the partial aggregate of actions and states.
+        empty: Partial aggregate of no games.
+        merge: Combines two partial aggregates.
+        actions_grouped_df: Selection count and mean CA by card.
+        round_summary_df: Count, mean, minimum and maximum of each state
+            column by round.
+    """
+    cards: pd.DataFrame
+    rounds: pd.DataFrame
+
+    @classmethod
+    def from_frames(
+        cls,
+        actions_df: pd.DataFrame,
+        state_df: pd.DataFrame
+    ) -> PartialAggregate:
+        """ Returns the partial aggregate of the actions and states of a set
+        of games.
+
+        Args:
+            actions_df: Actions, as in Series.actions_df.
+            state_df: States, as in Series.series_state_df.
+        """
+        selects = (
+            actions_df[actions_df.action == "select"] if len(actions_df) else
+            pd.DataFrame(dict(card=(), ca=()))
+        )
+
+        cards = (
+            selects
+            .assign(ca=lambda df: df.ca.apply(int))
+            .groupby("card")
+            .agg(count=("ca", "size"), ca_sum=("ca", "sum"))
+        )
+
+        state_df = (
+            state_df if len(state_df) else
+            pd.DataFrame(columns=("round_number",) + state_columns, dtype=int)
+        )
+
+        rounds = state_df.groupby("round_number").agg(
+            count=("round_number", "size"),
+            **{
+                f"{column}_{statistic}": (column, statistic)
+                for column in state_columns
+                for statistic in ("sum", "min", "max")
+            }
+        )
+
+        return cls(cards=cards, rounds=rounds)
+
+    @classmethod
+    def empty(cls) -> PartialAggregate:
+        """ Returns the partial aggregate of no games.
+        """
+        return cls.from_frames(pd.DataFrame(), pd.DataFrame())
+
+    def merge(self, other: PartialAggregate) -> PartialAggregate:
+        """ Returns the partial aggregate of the games in both partials.
+        """
+        return PartialAggregate(
+            cards=(
+                pd.concat((self.cards, other.cards))
+                .groupby(level=0)
+                .sum()
+            ),
+            rounds=(
+                pd.concat((self.rounds, other.rounds))
+                .groupby(level=0)
+                .agg(round_merges)
+            )
+        )
+
+    def to_dict(self) -> Dict:
+        """ Returns a JSON serializable dictionary of the partial aggregate.
+        """
+        return dict(
+            cards=frame_to_dict(self.cards),
+            rounds=frame_to_dict(self.rounds)
+        )
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> PartialAggregate:
+        """ Returns the partial aggregate serialized by to_dict.
+        """
+        return cls(
+            cards=frame_from_dict(d["cards"]),
+            rounds=frame_from_dict(d["rounds"])
+        )
+
+    def actions_grouped_df(self) -> pd.DataFrame:
+        """ Selection count and mean CA spent on each card, with the card's
+        age, color and line; as in Series.actions_grouped_df.
+        """
+        return assign_card_dimensions(
+            self.cards
+            .assign(ca=lambda df: df.ca_sum / df["count"])
+            [["count", "ca"]]
+            .rename_axis("card")
+            .reset_index()
+        )
+
+    def round_summary_df(self) -> pd.DataFrame:
+        """ Number of turns and the mean, minimum and maximum of each state
+        column by round.
+        """
+        rounds = self.rounds
+
+        return (
+            pd.DataFrame(
+                dict(
+                    count=rounds["count"],
+                    **{
+                        f"{column}_{statistic}": (
+                            rounds[f"{column}_sum"] / rounds["count"]
+                            if statistic == "mean" else
+                            rounds[f"{column}_{statistic}"]
+                        )
+                        for column in state_columns
+                        for statistic in ("mean", "min", "max")
+                    }
+                ),
+                index=rounds.index
+            )
+            .rename_axis("round_number")
+            .reset_index()
+        )
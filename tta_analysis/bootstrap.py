@@ -0,0 +1,221 @@
+""" Bootstrap confidence intervals for card-selection statistics.
+
+Games are resampled with replacement using index matrices; the replicates of
+every card are computed at once as products of resampling weights with
+game-by-card matrices.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+SelectionMatrices = Tuple["np.ndarray", ...]
+
+statistics = ("selection_rate", "ca", "first_round")
+
+
+def selection_matrices(
+    actions_df: pd.DataFrame,
+    units_df: pd.DataFrame = None
+) -> SelectionMatrices:
+    """ Returns the cards and game-by-card matrices of selection counts, CA
+    spent and round of first selection (NaN if never selected).
+
+    Each game viewed from each player is a row of the matrices, in the order
+    of units_df followed by any other games in the actions. Games in which
+    the player took no actions are only included through units_df.
+
+    Args:
+        actions_df: Actions, as in Series.actions_df.
+        units_df: Game and player of every game viewed from each player,
+            including games without actions; defaults to the games in the
+            actions.
+    """
+    unit_columns = [
+        column
+        for column in ("game", "player")
+        if column in actions_df.columns
+    ]
+    action_units = actions_df[unit_columns]
+    unit_index = pd.MultiIndex.from_frame(
+        action_units.drop_duplicates()
+        if units_df is None else
+        pd.concat((units_df[unit_columns], action_units)).drop_duplicates()
+    )
+    units = unit_index.get_indexer(pd.MultiIndex.from_frame(action_units))
+    n_units = len(unit_index)
+
+    is_select = (actions_df.action == "select").values
+    card_codes, cards = pd.factorize(actions_df.card[is_select], sort=True)
+
+    rows = (units[is_select], card_codes)
+    shape = (n_units, len(cards))
+
+    counts = np.zeros(shape)
+    np.add.at(counts, rows, 1)
+
+    ca_sums = np.zeros(shape)
+    np.add.at(ca_sums, rows, actions_df.ca[is_select].astype(int).values)
+
+    first_rounds = np.full(shape, np.inf)
+    np.minimum.at(
+        first_rounds,
+        rows,
+        actions_df.round_number[is_select].values
+    )
+    first_rounds[np.isinf(first_rounds)] = np.nan
+
+    return np.asarray(cards), counts, ca_sums, first_rounds
+
+
+def selection_stats(
+    weights: np.ndarray,
+    counts: np.ndarray,
+    ca_sums: np.ndarray,
+    first_rounds: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """ Returns the selection rate, mean CA and mean round of first selection
+    of each card for each row of game weights.
+
+    Args:
+        weights: Replicates by games matrix of times each game is drawn.
+        counts: Games by cards matrix of selection counts.
+        ca_sums: Games by cards matrix of CA spent on selections.
+        first_rounds: Games by cards matrix of rounds of first selection.
+    """
+    selected = ~np.isnan(first_rounds)
+
+    n_selected = weights @ selected
+    n_games = weights.sum(axis=1, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats = dict(
+            selection_rate=n_selected / n_games,
+            ca=(weights @ ca_sums) / (weights @ counts),
+            first_round=(
+                (weights @ np.where(selected, first_rounds, 0)) / n_selected
+            )
+        )
+
+    return stats
+
+
+def bootstrap_selection_stats(
+    counts: np.ndarray,
+    ca_sums: np.ndarray,
+    first_rounds: np.ndarray,
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    seed: int = None,
+    chunk_size: int = 256
+) -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """ Returns the estimate and percentile bootstrap interval of each
+    selection statistic for each card.
+
+    Replicates are computed chunk_size at a time: each chunk draws a
+    replicates by games index matrix, converts it to counts of times each game
+    is drawn and multiplies the counts with the game-by-card matrices.
+
+    Args:
+        counts: Games by cards matrix of selection counts.
+        ca_sums: Games by cards matrix of CA spent on selections.
+        first_rounds: Games by cards matrix of rounds of first selection.
+        n_boot: Number of bootstrap replicates.
+        confidence: Confidence level of the intervals.
+        seed: Seed of the random number generator.
+        chunk_size: Number of replicates held in memory at once.
+    """
+    rng = np.random.default_rng(seed)
+    n_games = counts.shape[0]
+
+    def replicate_chunk(n: int) -> Dict[str, np.ndarray]:
+        """ Returns the statistics of n bootstrap replicates.
+        """
+        index = rng.integers(0, n_games, size=(n, n_games))
+        offsets = np.arange(n)[:, None] * n_games
+
+        weights = np.bincount(
+            (index + offsets).ravel(),
+            minlength=n * n_games
+        ).reshape(n, n_games).astype(float)
+
+        return selection_stats(weights, counts, ca_sums, first_rounds)
+
+    chunks = tuple(
+        replicate_chunk(min(chunk_size, n_boot - start))
+        for start in range(0, n_boot, chunk_size)
+    )
+
+    estimates = selection_stats(
+        np.ones((1, n_games)),
+        counts,
+        ca_sums,
+        first_rounds
+    )
+
+    tail = 100 * (1 - confidence) / 2
+
+    intervals = {
+        stat: np.nanpercentile(
+            np.concatenate(tuple(chunk[stat] for chunk in chunks)),
+            (tail, 100 - tail),
+            axis=0
+        )
+        for stat in statistics
+    }
+
+    return {
+        stat: (estimates[stat][0], *intervals[stat])
+        for stat in statistics
+    }
+
+
+def bootstrap_selection_df(
+    actions_df: pd.DataFrame,
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    seed: int = None,
+    chunk_size: int = 256,
+    units_df: pd.DataFrame = None
+) -> pd.DataFrame:
+    """ Returns a dataframe of each selected card's selection rate, mean CA
+    and mean round of first selection with bootstrap confidence intervals.
+
+    Args:
+        actions_df: Actions, as in Series.actions_df.
+        n_boot: Number of bootstrap replicates.
+        confidence: Confidence level of the intervals.
+        seed: Seed of the random number generator.
+        chunk_size: Number of replicates held in memory at once.
+        units_df: Game and player of every game viewed from each player; see
+            selection_matrices.
+    """
+    cards, *matrices = selection_matrices(actions_df, units_df)
+
+    stats = bootstrap_selection_stats(
+        *matrices,
+        n_boot=n_boot,
+        confidence=confidence,
+        seed=seed,
+        chunk_size=chunk_size
+    )
+
+    return pd.DataFrame(
+        dict(
+            card=cards,
+            **{
+                f"{stat}{suffix}": values
+                for stat, (estimate, low, high) in stats.items()
+                for suffix, values in (
+                    ("", estimate),
+                    ("_low", low),
+                    ("_high", high)
+                )
+            }
+        )
+    )
@@ -0,0 +1,450 @@
+""" Caches the values of graph nodes on each instance, with an optional
+memory budget.
+
+Setting an attribute drops only the cached nodes downstream of it in the
+arcbound graph (invalidate), so upstream nodes such as parsed records are
+kept.
+
+Without a memory budget, the caches of the max_instances most recently used
+instances of each class are kept, as with functools.lru_cache(maxsize=128);
+the caches of older instances are dropped and their nodes are recomputed on
+the next access.
+
+Under a memory budget, the cached nodes of the least recently used instances
+are spilled to pickle files in a spill directory once the budget is exceeded,
+and are reloaded transparently the next time one of the instance's nodes is
+accessed. Memory is estimated by estimate_size, only under a budget.
+"""
+
+from __future__ import annotations
+
+import collections
+import functools
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import uuid
+import weakref
+from typing import Any, Callable, Dict, Iterable, Set
+
+import attr
+
+NodeCacheType = Dict[str, Any]
+
+# Nodes depending directly on each attribute or node, by class.
+dependents: Dict[type, Dict[str, Set[str]]] = {}
+
+# Instances of each class whose caches are kept without a memory budget.
+max_instances = 128
+
+# Instances with cached nodes and no memory budget by id, least recently used
+# first, by class.
+recent: Dict[type, collections.OrderedDict] = {}
+
+
+def estimate_size(value: Any) -> int:
+    """ Returns an estimate of the bytes held by a value, without copying it:
+    the deep memory usage of pandas objects, the buffer size of numpy arrays
+    and otherwise the sys.getsizeof of every object reachable through
+    containers and instance attributes, each counted once.
+
+    Args:
+        value: Value of a node.
+    """
+    size = 0
+    seen: Set[int] = set()
+    stack = [value]
+
+    while stack:
+        obj = stack.pop()
+
+        if id(obj) in seen:
+            continue
+
+        seen.add(id(obj))
+
+        if hasattr(obj, "memory_usage") and hasattr(obj, "index"):
+            usage = obj.memory_usage(deep=True)
+            size += int(usage.sum() if hasattr(usage, "sum") else usage)
+
+        elif isinstance(getattr(obj, "nbytes", None), int):
+            size += obj.nbytes
+
+        else:
+            size += sys.getsizeof(obj)
+
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+
+            elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+                stack.extend(vars(obj).values())
+
+    return size
+
+
+def track(instance: Any) -> None:
+    """ Marks an instance without a memory budget as the most recently used
+    of its class, dropping the caches of the least recently used instances
+    beyond max_instances.
+
+    Args:
+        instance: Instance with cached nodes.
+    """
+    entries = recent.setdefault(type(instance), collections.OrderedDict())
+    key = id(instance)
+
+    if key in entries:
+        entries.move_to_end(key)
+
+        return None
+
+    def forget(ref: weakref.ref) -> None:
+        """ Removes a garbage collected instance, unless its id was reused.
+        """
+        if entries.get(key) is ref:
+            del entries[key]
+
+        return None
+
+    entries[key] = weakref.ref(instance, forget)
+
+    while len(entries) > max_instances:
+        _, ref = entries.popitem(last=False)
+        evicted = ref()
+
+        if evicted is not None:
+            evicted.__dict__.get("_node_cache", {}).clear()
+
+    return None
+
+
+def memory_budget(instance: Any) -> MemoryBudget:
+    """ Returns the memory budget set as the instance's memory_budget
+    attribute; None if not set. Properties of the same name are ignored.
+
+    Args:
+        instance: Instance with cached nodes.
+    """
+    return vars(instance).get("memory_budget")
+
+
+def node_cache(instance: Any) -> NodeCacheType:
+    """ Returns the cached node values of an instance, reloading them first
+    if the instance's memory budget spilled them to disk.
+
+    Args:
+        instance: Instance with cached nodes.
+    """
+    cache = instance.__dict__.setdefault("_node_cache", {})
+    budget = memory_budget(instance)
+
+    if budget is not None:
+        budget.restore(instance)
+
+    return cache
+
+
+def set_cached(instance: Any, name: str, value: Any) -> None:
+    """ Sets the cached value of a node.
+
+    Args:
+        instance: Instance with cached nodes.
+        name: Name of the node.
+        value: Value of the node.
+    """
+    node_cache(instance)[name] = value
+
+    budget = memory_budget(instance)
+
+    if budget is not None:
+        budget.add(instance, name, value)
+
+    else:
+        track(instance)
+
+    return None
+
+
+def cached(function: Callable) -> Callable:
+    """ Caches the value of a property on the instance, so that the value is
+    released with the instance. Decorate the property's function below
+    property and above the arcbound decorator.
+    """
+    @functools.wraps(function)
+    def wrapper(self):
+        name = function.__name__
+        cache = node_cache(self)
+        budget = memory_budget(self)
+
+        if name in cache:
+            if budget is not None:
+                budget.touch(self)
+
+            else:
+                track(self)
+
+            return cache[name]
+
+        value = function(self)
+        set_cached(self, name, value)
+
+        return value
+
+    wrapper.cached = True
+
+    return wrapper
+
+
+def downstream_nodes(instance: Any, name: str) -> Set[str]:
+    """ Returns the nodes depending, directly or indirectly, on an attribute
+    or node of an instance of a class decorated with arcbound.graph.
+
+    Args:
+        instance: Instance with cached nodes.
+        name: Name of the attribute or node.
+    """
+    cls = type(instance)
+
+    if cls not in dependents:
+        graph_dependents = collections.defaultdict(set)
+
+        for node, arcs in instance.arcbound_graph.edges.items():
+            for arc in arcs:
+                graph_dependents[arc].add(node)
+
+        dependents[cls] = dict(graph_dependents)
+
+    found: Set[str] = set()
+    stack = [name]
+
+    while stack:
+        for node in dependents[cls].get(stack.pop(), ()):
+            if node not in found:
+                found.add(node)
+                stack.append(node)
+
+    return found
+
+
+def invalidate(instance: Any, name: str) -> NodeCacheType:
+    """ Drops the cached nodes downstream of an attribute or node. Returns
+    the dropped values by node name.
+
+    Args:
+        instance: Instance with cached nodes.
+        name: Name of the attribute or node that changed.
+    """
+    if "_node_cache" not in vars(instance):
+        return {}
+
+    cache = node_cache(instance)
+
+    dropped = {
+        node: cache.pop(node)
+        for node in downstream_nodes(instance, name)
+        if node in cache
+    }
+
+    budget = memory_budget(instance)
+
+    if budget is not None:
+        budget.remove(instance, dropped)
+
+    return dropped
+
+
+def evolve(instance: Any, **changes: Any) -> Any:
+    """ Returns a copy of an attrs instance with changed attributes, sharing
+    the cached nodes that do not depend on them. The instance is not
+    modified.
+
+    Args:
+        instance: Instance with cached nodes.
+        changes: New values of attributes.
+    """
+    copy = attr.evolve(instance, **changes)
+    stale = set().union(
+        *(downstream_nodes(instance, name) for name in changes)
+    )
+
+    for name, value in node_cache(instance).items():
+        if name not in stale:
+            set_cached(copy, name, value)
+
+    return copy
+
+
+@attr.s(auto_attribs=True, eq=False)
+class MemoryBudget(object):
+    """ Limits the memory held by the node caches of a set of instances,
+    spilling the least recently used instances' caches to disk.
+
+    Input parameters:
+        max_memory: Bytes of cached nodes to keep in memory.
+        spill_dir: Directory spilled caches are written to, created if
+            missing; defaults to a new temporary directory, which is removed
+            with the budget or at exit.
+
+    Methods:
+        add: Records a newly cached node.
+        remove: Forgets dropped nodes.
+        touch: Marks an instance as recently used.
+        restore: Reloads an instance's spilled cache.
+        spill: Writes an instance's cache to disk and releases it.
+    """
+    max_memory: int
+    spill_dir: str = None
+    resident: collections.OrderedDict = attr.ib(
+        factory=collections.OrderedDict,
+        init=False,
+        repr=False
+    )
+    memory: int = attr.ib(default=0, init=False)
+
+    def key(self, instance: Any) -> str:
+        """ Returns the key identifying an instance's spill file. Spilled
+        caches are removed when the instance is garbage collected.
+        """
+        if "_spill_key" not in instance.__dict__:
+            key = instance.__dict__["_spill_key"] = uuid.uuid4().hex
+            weakref.finalize(instance, self.discard, key)
+
+        return instance.__dict__["_spill_key"]
+
+    def path(self, key: str) -> str:
+        """ Returns the path of an instance's spill file.
+        """
+        return os.path.join(self.spill_dir, f"{key}.pickle")
+
+    def create_spill_dir(self) -> None:
+        """ Creates the spill directory, or a temporary one that is removed
+        with the budget or at exit if spill_dir is not set.
+        """
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="tta_spill_")
+            weakref.finalize(
+                self,
+                shutil.rmtree,
+                self.spill_dir,
+                ignore_errors=True
+            )
+
+        else:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+        return None
+
+    def add(self, instance: Any, name: str, value: Any) -> None:
+        """ Records the size of a newly cached node and spills other
+        instances if the budget is exceeded.
+        """
+        key = self.key(instance)
+        size = estimate_size(value)
+
+        _, sizes = self.resident.setdefault(key, (weakref.ref(instance), {}))
+        self.memory += size - sizes.get(name, 0)
+        sizes[name] = size
+
+        self.touch(instance)
+        self.enforce()
+
+        return None
+
+    def remove(self, instance: Any, names: Iterable[str]) -> None:
+        """ Forgets the sizes of nodes dropped from an instance's cache.
+        """
+        key = self.key(instance)
+
+        if key in self.resident:
+            _, sizes = self.resident[key]
+            self.memory -= sum(sizes.pop(name, 0) for name in names)
+
+        return None
+
+    def touch(self, instance: Any) -> None:
+        """ Marks an instance as the most recently used.
+        """
+        key = self.key(instance)
+
+        if key in self.resident:
+            self.resident.move_to_end(key)
+
+        return None
+
+    def restore(self, instance: Any) -> None:
+        """ Reloads an instance's cache if it was spilled.
+        """
+        key = self.key(instance)
+
+        if (
+            key in self.resident
+            or self.spill_dir is None
+            or not os.path.exists(self.path(key))
+        ):
+            return None
+
+        with open(self.path(key), "rb") as f:
+            spilled = pickle.load(f)
+        os.remove(self.path(key))
+
+        instance.__dict__["_node_cache"].update(spilled["nodes"])
+        self.resident[key] = (weakref.ref(instance), spilled["sizes"])
+        self.memory += sum(spilled["sizes"].values())
+
+        self.enforce()
+
+        return None
+
+    def spill(self, key: str) -> None:
+        """ Writes an instance's cache to its spill file and releases it.
+        """
+        ref, sizes = self.resident.pop(key)
+        self.memory -= sum(sizes.values())
+        instance = ref()
+
+        if instance is None:
+            return None
+
+        cache = instance.__dict__["_node_cache"]
+        self.create_spill_dir()
+        path = self.path(key)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(
+                dict(nodes=cache, sizes=sizes),
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(temp_path, path)
+
+        cache.clear()
+
+        return None
+
+    def enforce(self) -> None:
+        """ Spills the least recently used instances until the cached nodes
+        fit in the budget. The most recently used instance is never spilled.
+        """
+        while self.memory > self.max_memory and len(self.resident) > 1:
+            self.spill(next(iter(self.resident)))
+
+        return None
+
+    def discard(self, key: str) -> None:
+        """ Forgets a garbage collected instance and removes its spill file.
+        """
+        if key in self.resident:
+            _, sizes = self.resident.pop(key)
+            self.memory -= sum(sizes.values())
+
+        if self.spill_dir is not None and os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+        return None
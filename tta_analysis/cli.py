@@ -0,0 +1,459 @@
+""" Command-line entry point for batch processing folders of game logs.
+
+Game logs are parsed in a process pool into the record cache, after which
+frames are built from the cached records and streamed to CSV or Parquet.
+Unless --cache-dir is given, the record cache is kept in the user's cache
+directory ($XDG_CACHE_HOME/tta_analysis, by default ~/.cache/tta_analysis),
+shared by every folder; records are keyed by the logs' contents. Logs that
+fail to parse are reported and left out of aggregate and export.
+
+Usage:
+    tta-analysis ingest DIR
+    tta-analysis validate DIR
+    tta-analysis aggregate DIR --output card_selection.csv
+    tta-analysis export DIR --frame state --output state.parquet
+    tta-analysis serve DIR --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import Iterable, Sequence, Tuple
+
+import attr
+
+from .lazy import lazy_import
+from .records import IngestResult, ingest_records
+from .series import Series
+from .server import AnalysisServer
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+
+###############################################################################
+# Helpers shared by the subcommands.
+###############################################################################
+
+def report(label: str, count: int, size: int, seconds: float) -> None:
+    """ Prints the throughput of a step to stderr.
+
+    Args:
+        label: Description of the step.
+        count: Number of games processed.
+        size: Number of bytes of game logs processed.
+        seconds: Time taken by the step.
+    """
+    seconds = max(seconds, 1e-9)
+
+    print(
+        f"{label}: {count} games in {seconds:.2f} s "
+        f"({count / seconds:.1f} games/s, {size / seconds / 1e6:.2f} MB/s)",
+        file=sys.stderr
+    )
+
+    return None
+
+
+def create_series(args: argparse.Namespace) -> Series:
+    """ Returns a series of all games in the folder, using the record cache.
+    """
+    return Series.from_folder(
+        args.base_dir,
+        player=args.player,
+        record_cache_dir=args.cache_dir,
+        deduplicate=args.deduplicate
+    )
+
+
+def ingest_series(
+    series: Series,
+    args: argparse.Namespace
+) -> Tuple[IngestResult, ...]:
+    """ Parses the series' game logs into the record cache in parallel and
+    reports the throughput and the duplicates collapsed. Returns the result
+    for each game log parsed.
+    """
+    start = time.perf_counter()
+
+    for duplicate, game_file in series.duplicate_files.items():
+        print(f"{duplicate}: duplicate of {game_file}", file=sys.stderr)
+
+    results = tuple(
+        ingest_records(
+            (
+                os.path.join(series.base_dir, game_file)
+                for game_file in series.filtered_game_files
+            ),
+            cache_dir=series.record_cache_dir,
+            workers=args.workers
+        )
+    )
+
+    report(
+        "ingest",
+        len(results),
+        sum(result.size for result in results),
+        time.perf_counter() - start
+    )
+
+    return results
+
+
+def default_cache_dir() -> str:
+    """ Returns the record cache directory in the user's cache directory.
+    """
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "tta_analysis"
+    )
+
+
+def parsed_series(
+    series: Series,
+    results: Sequence[IngestResult]
+) -> Series:
+    """ Reports the game logs that failed to parse and returns the series
+    without them.
+
+    Args:
+        series: Series of all games.
+        results: Ingest result of each game log, as from ingest_series.
+    """
+    failed = {
+        os.path.relpath(result.path, series.base_dir)
+        for result in results
+        if result.error is not None
+    }
+
+    for result in results:
+        if result.error is not None:
+            print(f"{result.path}: left out, {result.error}", file=sys.stderr)
+
+    if not failed:
+        return series
+
+    return attr.evolve(
+        series,
+        game_files=tuple(
+            game_file
+            for game_file in series.game_files
+            if os.path.normpath(game_file) not in failed
+        )
+    )
+
+
+def chunk(items: Sequence, size: int) -> Iterable[Sequence]:
+    """ Splits items into consecutive chunks of at most size items.
+    """
+    return (items[i:i + size] for i in range(0, len(items), size))
+
+
+def write_frames(frames: Iterable[pd.DataFrame], output: str) -> int:
+    """ Streams frames to a CSV or Parquet file, chosen by the output's
+    extension, without holding more than one frame in memory. Returns the
+    number of rows written.
+
+    Args:
+        frames: Frames with identical columns.
+        output: Path of the CSV or Parquet file; missing parent folders
+            are created.
+    """
+    parquet = os.path.splitext(output)[1] in (".parquet", ".pq")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    writer = None
+    rows = 0
+
+    try:
+        for frame in frames:
+            if parquet:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+
+                writer.write_table(table.cast(writer.schema))
+
+            else:
+                frame.to_csv(
+                    output,
+                    mode="w" if rows == 0 else "a",
+                    header=rows == 0,
+                    index=False
+                )
+
+            rows += len(frame)
+
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows
+
+
+###############################################################################
+# Subcommands.
+###############################################################################
+
+def ingest(args: argparse.Namespace) -> int:
+    """ Parses every game log in the folder into the record cache.
+    """
+    results = ingest_series(create_series(args), args)
+
+    for result in results:
+        if result.error is not None:
+            print(f"{result.path}: {result.error}", file=sys.stderr)
+
+    return int(any(result.error is not None for result in results))
+
+
+def validate(args: argparse.Namespace) -> int:
+    """ Checks that every game log can be parsed and turned into game state.
+    """
+    series = create_series(args)
+    results = ingest_series(series, args)
+
+    start = time.perf_counter()
+
+    errors = {
+        result.path: result.error
+        for result in results
+        if result.error is not None
+    }
+
+    for game in series.games.values():
+        path = os.path.join(game.base_dir, game.game_file)
+
+        if path in errors:
+            continue
+
+        try:
+            game.state_df
+
+        except Exception as e:
+            errors[path] = f"{type(e).__name__}: {e}"
+
+    report(
+        "validate",
+        len(results),
+        sum(result.size for result in results),
+        time.perf_counter() - start
+    )
+
+    for path, error in errors.items():
+        print(f"{path}: {error}", file=sys.stderr)
+
+    print(f"{len(results) - len(errors)} of {len(results)} games are valid.")
+
+    return int(bool(errors))
+
+
+def aggregate(args: argparse.Namespace) -> int:
+    """ Writes an aggregate table over all games in the folder that parse.
+    """
+    series = create_series(args)
+    results = ingest_series(series, args)
+    series = parsed_series(series, results)
+
+    start = time.perf_counter()
+
+    rows = write_frames((getattr(series, args.table),), args.output)
+
+    report(
+        "aggregate",
+        len(results),
+        sum(result.size for result in results),
+        time.perf_counter() - start
+    )
+    print(f"Wrote {rows} rows to {args.output}.")
+
+    return 0
+
+
+def export(args: argparse.Namespace) -> int:
+    """ Streams the state or actions of all games in the folder that parse
+    to a file, building the frames a chunk of games at a time.
+    """
+    series = create_series(args)
+    results = ingest_series(series, args)
+    series = parsed_series(series, results)
+
+    start = time.perf_counter()
+
+    def frames() -> Iterable[pd.DataFrame]:
+        """ Yields the requested frame for each chunk of games. Game ids are
+        offset so that they match a single series over all games.
+        """
+        for i, game_files in enumerate(
+            chunk(series.filtered_game_files, args.chunk_size)
+        ):
+            chunk_series = Series(
+                game_files=tuple(game_files),
+                base_dir=series.base_dir,
+                player=series.player,
+                record_cache_dir=series.record_cache_dir
+            )
+
+            if args.frame == "state":
+                frame = chunk_series.series_state_df.assign(
+                    game_id=lambda df: df.game_id + i * args.chunk_size
+                )
+
+            else:
+                frame = chunk_series.actions_df
+
+            if len(frame):
+                yield frame
+
+    rows = write_frames(frames(), args.output)
+
+    report(
+        "export",
+        len(results),
+        sum(result.size for result in results),
+        time.perf_counter() - start
+    )
+    print(f"Wrote {rows} rows to {args.output}.")
+
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    """ Serves the aggregate tables of the folder over HTTP, recomputing
+    them when the game logs change.
+    """
+    AnalysisServer(
+        base_dir=args.base_dir,
+        player=args.player,
+        record_cache_dir=args.cache_dir,
+        workers=args.workers,
+        deduplicate=args.deduplicate,
+        interval=args.interval
+    ).serve(args.host, args.port)
+
+    return 0
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """ Returns the parser for the command-line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="tta-analysis",
+        description="Batch processing of Through the Ages game logs."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("base_dir", help="Folder containing .yaml game logs.")
+    common.add_argument("--player", default="yellow", help="Player color.")
+    common.add_argument(
+        "--cache-dir",
+        help=(
+            "Record cache directory; defaults to tta_analysis in the user's "
+            "cache directory ($XDG_CACHE_HOME or ~/.cache)."
+        )
+    )
+    common.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of parsing processes; defaults to the number of CPUs."
+    )
+    common.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help=(
+            "Collapse game logs with the same contents, ignoring line "
+            "endings, tabs in indentation and trailing whitespace."
+        )
+    )
+
+    subparsers.add_parser(
+        "ingest",
+        parents=(common,),
+        help="Parse game logs into the record cache."
+    ).set_defaults(run=ingest)
+
+    subparsers.add_parser(
+        "validate",
+        parents=(common,),
+        help="Check that every game log can be parsed."
+    ).set_defaults(run=validate)
+
+    aggregate_parser = subparsers.add_parser(
+        "aggregate",
+        parents=(common,),
+        help="Write an aggregate table over all games."
+    )
+    aggregate_parser.add_argument(
+        "--table",
+        choices=("card_selection_df", "actions_grouped_df"),
+        default="card_selection_df"
+    )
+    aggregate_parser.add_argument(
+        "--output",
+        required=True,
+        help="Output .csv or .parquet file."
+    )
+    aggregate_parser.set_defaults(run=aggregate)
+
+    export_parser = subparsers.add_parser(
+        "export",
+        parents=(common,),
+        help="Stream per-game frames to a file."
+    )
+    export_parser.add_argument(
+        "--frame",
+        choices=("state", "actions"),
+        default="state"
+    )
+    export_parser.add_argument(
+        "--output",
+        required=True,
+        help="Output .csv or .parquet file."
+    )
+    export_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100,
+        help="Number of games held in memory at once."
+    )
+    export_parser.set_defaults(run=export)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        parents=(common,),
+        help="Serve aggregate tables as JSON over HTTP."
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks of the game logs for changes."
+    )
+    serve_parser.set_defaults(run=serve)
+
+    return parser
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """ Runs the command-line interface. Returns the exit status.
+    """
+    args = create_parser().parse_args(argv)
+
+    if args.cache_dir is None:
+        args.cache_dir = default_cache_dir()
+
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
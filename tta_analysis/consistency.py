@@ -0,0 +1,148 @@
+""" Cross-checks the logged income and strength of each turn against the
+values expected from the cards in the player's tableau.
+
+The expected values of every turn of every game are computed at once as the
+product of a turns-by-cards tableau matrix with the cards-by-attributes matrix
+defined by tta_analysis.cards.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+from .cards import camelcase_card_dict, Card
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+income_attributes = ("food", "rock", "science", "culture")
+attributes = income_attributes + ("happiness", "strength")
+
+# Attributes logged in each turn and therefore checked.
+checked_attributes = income_attributes + ("strength",)
+
+
+def card_attributes(card: Card) -> Tuple[int, ...]:
+    """ Returns the income, happiness and strength a card provides, in the
+    order of attributes.
+    """
+    return (
+        tuple(card.income.get(resource, 0) for resource in income_attributes)
+        + (card.happiness, card.strength)
+    )
+
+
+def card_attribute_matrix(
+    cards: Dict[str, Card] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Returns the card names and the cards by attributes matrix of the
+    income, happiness and strength each card provides.
+
+    Args:
+        cards: Mapping of cards to the names used in the logs; defaults to
+            every card, keyed by its CamelCase name.
+    """
+    cards = camelcase_card_dict if cards is None else cards
+
+    return (
+        np.array(tuple(cards)),
+        np.array(tuple(card_attributes(card) for card in cards.values()))
+    )
+
+
+def expected_state_df(
+    tableau_df: pd.DataFrame,
+    cards: Dict[str, Card] = None
+) -> pd.DataFrame:
+    """ Returns the income, happiness and strength expected from the cards in
+    the tableau at the end of each turn.
+
+    Args:
+        tableau_df: Tableaux with a row per card in play at the end of each
+            turn: the columns identifying the turn (e.g. game, player and
+            round_number), a card column with the card's name and a count
+            column with the number of workers or copies on the card.
+        cards: Mapping of cards to the names used in the logs; defaults to
+            every card, keyed by its CamelCase name.
+    """
+    card_names, attribute_matrix = card_attribute_matrix(cards)
+
+    key_columns = [
+        column
+        for column in tableau_df.columns
+        if column not in ("card", "count")
+    ]
+
+    unknown = set(tableau_df.card) - set(card_names)
+
+    if unknown:
+        raise ValueError(f"Unknown cards: {', '.join(sorted(unknown))}.")
+
+    turn_codes, turns = pd.MultiIndex.from_frame(
+        tableau_df[key_columns]
+    ).factorize()
+    card_codes = pd.Index(card_names).get_indexer(tableau_df.card)
+
+    tableau = np.zeros((len(turns), len(card_names)))
+    np.add.at(tableau, (turn_codes, card_codes), tableau_df["count"].values)
+
+    return pd.concat(
+        (
+            turns.set_names(key_columns).to_frame(index=False),
+            pd.DataFrame(tableau @ attribute_matrix, columns=attributes)
+        ),
+        axis=1
+    )
+
+
+def check_state(
+    state_df: pd.DataFrame,
+    tableau_df: pd.DataFrame,
+    baseline: Dict[str, int] = None,
+    tolerance: int = 0,
+    cards: Dict[str, Card] = None
+) -> pd.DataFrame:
+    """ Compares the logged income and strength of each turn with the values
+    expected from the tableau. Returns a row per turn with the logged and
+    expected values, their differences and a mismatch flag.
+
+    Args:
+        state_df: Logged state with the key columns of the tableau.
+        tableau_df: Tableaux; see expected_state_df.
+        baseline: Income and strength not provided by cards, added to the
+            expected values.
+        tolerance: Largest absolute difference not flagged as a mismatch.
+        cards: Mapping of cards to the names used in the logs; defaults to
+            every card, keyed by its CamelCase name.
+    """
+    expected_df = expected_state_df(tableau_df, cards)
+    key_columns = [
+        column
+        for column in expected_df.columns
+        if column not in attributes
+    ]
+
+    baseline = baseline or {}
+
+    merged_df = state_df[key_columns + list(checked_attributes)].merge(
+        expected_df[key_columns + list(checked_attributes)],
+        on=key_columns,
+        how="inner",
+        suffixes=("", "_expected")
+    )
+
+    differences = {
+        f"{attribute}_difference": (
+            merged_df[attribute]
+            - merged_df[f"{attribute}_expected"]
+            - baseline.get(attribute, 0)
+        )
+        for attribute in checked_attributes
+    }
+
+    return merged_df.assign(**differences).assign(
+        mismatch=lambda df: (
+            df[list(differences)].abs() > tolerance
+        ).any(axis=1)
+    )
@@ -0,0 +1,194 @@
+""" Precomputed cube of card selections for answering groupings and slices
+without the raw actions.
+
+The cube holds the number of selections and the sum of CA spent at the
+finest grain, (card, age, round_number, player), with the card's dimensions
+(card_age, color and line) attached to each cell. Any coarser grouping is a
+roll-up of the cells, and a slice filters the cells, so neither touches the
+actions again. Cubes of separate shards of games can be merged.
+
+age is the age the card was selected in; card_age is the age of the card.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import attr
+
+from .aggregates import assign_card_dimensions, frame_from_dict, frame_to_dict
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+grain = ("card", "age", "round_number", "player")
+card_dimensions = ("card_age", "color", "line")
+dimensions = grain + card_dimensions
+measures = ("count", "ca_sum")
+
+
+def cell_mask(cells: pd.DataFrame, column: str, value: Any) -> pd.Series:
+    """ Returns the cells matching a filter on a dimension.
+
+    Args:
+        cells: Cells of a cube.
+        column: Dimension to filter.
+        value: A scalar to match, a collection of values to match any of, or
+            a slice whose start is inclusive and stop is exclusive.
+    """
+    values = cells[column]
+
+    if isinstance(value, slice):
+        mask = pd.Series(True, index=cells.index)
+
+        if value.start is not None:
+            mask &= values >= value.start
+
+        if value.stop is not None:
+            mask &= values < value.stop
+
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        mask = values.isin(tuple(value))
+
+    else:
+        mask = values == value
+
+    return mask
+
+
+@attr.s(auto_attribs=True)
+class SelectionCube(object):
+    """ Selection counts and CA sums by card, age, round and player, with
+    the card dimensions attached.
+
+    Input parameters:
+        cells: One row per (card, age, round_number, player) with the card's
+            card_age, color and line and the count and ca_sum measures.
+
+    Methods:
+        from_actions: Builds the cube of a set of actions.
+        merge: Combines the cubes of two sets of games.
+        slice: Returns the cube of the cells matching filters.
+        roll_up: Aggregates the cells to a coarser grouping.
+        card_selection_df: Selections by card, as in Series.card_selection_df.
+        to_dict: JSON serializable dictionary of the cube.
+        from_dict: Returns the cube serialized by to_dict.
+    """
+    cells: pd.DataFrame
+
+    @classmethod
+    def from_actions(cls, actions_df: pd.DataFrame) -> SelectionCube:
+        """ Returns the cube of the selections in the actions.
+
+        Args:
+            actions_df: Actions, as in Series.actions_df.
+        """
+        selects = (
+            actions_df[actions_df.action == "select"] if len(actions_df) else
+            pd.DataFrame({column: () for column in grain + ("ca",)})
+        )
+
+        cells = (
+            selects
+            .assign(ca=lambda df: df.ca.apply(int))
+            .groupby(list(grain), as_index=False)
+            .agg(count=("ca", "size"), ca_sum=("ca", "sum"))
+        )
+
+        return cls(cells=cls.attach_dimensions(cells))
+
+    @staticmethod
+    def attach_dimensions(cells: pd.DataFrame) -> pd.DataFrame:
+        """ Adds the card dimensions to cells, looking each card up once.
+        """
+        cards = assign_card_dimensions(
+            pd.DataFrame(dict(card=cells.card.unique()))
+        ).rename(columns=dict(age="card_age"))
+
+        return cells.merge(cards, on="card", how="left")[
+            list(dimensions + measures)
+        ]
+
+    def merge(self, other: SelectionCube) -> SelectionCube:
+        """ Returns the cube of the games in both cubes.
+        """
+        return SelectionCube(
+            cells=(
+                pd.concat((self.cells, other.cells))
+                .groupby(list(dimensions), as_index=False)
+                [list(measures)]
+                .sum()
+            )
+        )
+
+    def slice(self, **filters: Any) -> SelectionCube:
+        """ Returns the cube of the cells matching every filter.
+
+        Arguments:
+            filters: Values of dimensions, e.g. age=1, color=("brown",) or
+                round_number=slice(1, 5); see cell_mask.
+
+        Raises:
+            ValueError: If a filter is not a dimension of the cube.
+        """
+        invalid = tuple(name for name in filters if name not in dimensions)
+
+        if invalid:
+            raise ValueError(
+                f"Not dimensions of the cube: {', '.join(invalid)}."
+            )
+
+        mask = pd.Series(True, index=self.cells.index)
+
+        for column, value in filters.items():
+            mask &= cell_mask(self.cells, column, value)
+
+        return SelectionCube(cells=self.cells[mask].reset_index(drop=True))
+
+    def roll_up(self, *by: str) -> pd.DataFrame:
+        """ Returns the selection count, CA sum and mean CA by the
+        dimensions; the totals over every cell if none are given.
+
+        Arguments:
+            by: Dimensions to group by, e.g. "color", "round_number".
+
+        Raises:
+            ValueError: If a grouping is not a dimension of the cube.
+        """
+        invalid = tuple(name for name in by if name not in dimensions)
+
+        if invalid:
+            raise ValueError(
+                f"Not dimensions of the cube: {', '.join(invalid)}."
+            )
+
+        totals = (
+            self.cells.groupby(list(by), as_index=False)[list(measures)].sum()
+            if by else
+            self.cells[list(measures)].sum().to_frame().T
+        )
+
+        return totals.assign(ca=lambda df: df.ca_sum / df["count"])
+
+    def card_selection_df(self) -> pd.DataFrame:
+        """ Selection count and mean CA of each defined card, with its
+        color, line and age; as in Series.card_selection_df.
+        """
+        return (
+            self.roll_up("card", "card_age", "color", "line")
+            .rename(columns=dict(card_age="age"))
+            .loc[lambda df: (df["count"] > 0) & (df["color"] != 0)]
+            .sort_values(["color", "line", "age", "count"])
+            [["color", "line", "card", "age", "count", "ca"]]
+        )
+
+    def to_dict(self) -> Dict:
+        """ Returns a JSON serializable dictionary of the cube.
+        """
+        return dict(cells=frame_to_dict(self.cells))
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> SelectionCube:
+        """ Returns the cube serialized by to_dict.
+        """
+        return cls(cells=frame_from_dict(d["cells"]).reset_index(drop=True))
@@ -0,0 +1,88 @@
+""" Derives per-round trajectory features from the state of each game.
+
+Every feature is computed for all games at once with grouped, vectorized
+operations over the long-format state table, so the cost grows linearly
+with the number of turns.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Sequence
+
+from .aggregates import state_columns
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+
+def trajectory_features(
+    state_df: pd.DataFrame,
+    keys: Sequence[str] = ("game_id", "player"),
+    columns: Sequence[str] = state_columns,
+    window: int = 3,
+    thresholds: Dict[str, Sequence[int]] = None
+) -> pd.DataFrame:
+    """ Returns the state table with per-round features of each column added:
+    the change from the previous round ({column}_delta), the relative change
+    ({column}_growth; NaN when the previous value is 0), the mean over the
+    last window rounds ({column}_rolling_mean) and, for each threshold N, the
+    first round in which the column reached N ({column}_first_reached_{N};
+    NaN if never reached).
+
+    Args:
+        state_df: State of each game by round, as in Series.series_state_df.
+        keys: Columns identifying a game's trajectory.
+        columns: State columns to derive features from.
+        window: Number of rounds in the rolling mean.
+        thresholds: Values to find the first round reaching, by column.
+    """
+    keys = [key for key in keys if key in state_df.columns]
+    columns = list(columns)
+
+    df = state_df.sort_values(keys + ["round_number"]).reset_index(drop=True)
+    grouped = df.groupby(keys, sort=False)
+
+    values = df[columns].astype(float)
+    previous = grouped[columns].shift(1)
+
+    # Rolling sums as differences of cumulative sums, so that the window is
+    # applied to every game in one vectorized pass.
+    cumulative = values.groupby([df[key] for key in keys]).cumsum()
+    lagged = cumulative.groupby([df[key] for key in keys]).shift(window)
+    position = grouped.cumcount().values[:, None]
+
+    rolling_mean = (
+        (cumulative - lagged.fillna(0))
+        / np.minimum(position + 1, window)
+    )
+
+    features = dict(
+        **{
+            f"{column}_delta": values[column] - previous[column]
+            for column in columns
+        },
+        **{
+            f"{column}_growth": (
+                (values[column] - previous[column])
+                / previous[column].where(previous[column] != 0)
+            )
+            for column in columns
+        },
+        **{
+            f"{column}_rolling_mean": rolling_mean[column]
+            for column in columns
+        },
+        **{
+            f"{column}_first_reached_{threshold}": (
+                df.round_number
+                .where(df[column] >= threshold)
+                .groupby([df[key] for key in keys])
+                .transform("min")
+            )
+            for column, column_thresholds in (thresholds or {}).items()
+            for threshold in column_thresholds
+        }
+    )
+
+    return pd.concat((df, pd.DataFrame(features)), axis=1)
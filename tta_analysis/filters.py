@@ -0,0 +1,238 @@
+""" Filters the games of a series before they are parsed.
+
+Each predicate of a GameFilter is evaluated at the cheapest stage that can
+decide it, and a game is dropped at the first stage it fails:
+
+    metadata: the file name and size, from a stat of the file.
+    header: the number of rounds, the age reached and the cards selected by
+        any player, from a scan of the log's text for round, age and select
+        lines without decoding the YAML.
+    record: cards selected by the analyzed player, from the round records
+        streamed one round at a time (see Game.iter_rounds) until every card
+        is found. With a record cache, the record is loaded through the cache
+        instead.
+
+Only games passing every stage are parsed in full and turned into turns. The
+games read by the record stage are returned with the matching files, so a
+record loaded to filter a game is not loaded again to analyze it.
+"""
+
+from __future__ import annotations
+
+import collections
+import fnmatch
+import os
+import re
+from typing import Any, Dict, Iterable, Sequence, Set
+
+import attr
+
+from .game import Game
+
+HeaderScan = collections.namedtuple(
+    "HeaderScan",
+    ("game_length", "age", "selected")
+)
+
+FilterResult = collections.namedtuple(
+    "FilterResult",
+    ("matched", "rejected", "games"),
+    defaults=({},)
+)
+
+round_pattern = re.compile(r"^round_(\d+):", re.MULTILINE)
+# Age changes are keys of a round, at the indentation of the player keys.
+age_pattern = re.compile(r"^ {4}age:", re.MULTILINE)
+select_pattern = re.compile(
+    r"^\s+select:\s*\[\s*\d+\s*,\s*(\w+)\s*\]",
+    re.MULTILINE
+)
+
+
+def scan_header(path: str) -> HeaderScan:
+    """ Returns the number of rounds, the age reached and the cards selected
+    by any player in a game log, from its text.
+
+    Args:
+        path: Path to the game log.
+    """
+    with open(path) as f:
+        text = f.read()
+
+    return HeaderScan(
+        game_length=max(map(int, round_pattern.findall(text)), default=0),
+        age=len(age_pattern.findall(text)),
+        selected=set(select_pattern.findall(text))
+    )
+
+
+def player_selections(game: Game, cards: Iterable[str]) -> Set[str]:
+    """ Returns the cards among cards selected by the game's player, reading
+    the game's rounds only until every card is found.
+    """
+    missing = set(cards)
+
+    for game_round in game.iter_rounds():
+        missing -= {
+            action.card
+            for turn in game_round.turns
+            if turn.player_turn
+            for action in turn.actions
+            if action.action == "select"
+        }
+
+        if not missing:
+            break
+
+    return set(cards) - missing
+
+
+@attr.s(auto_attribs=True)
+class GameFilter(object):
+    """ Predicates selecting the games of a series, each evaluated at the
+    cheapest stage that can decide it.
+
+    Input parameters:
+        pattern: Shell-style pattern the game file name must match.
+        min_size: Smallest size of the game log, in bytes.
+        max_size: Largest size of the game log, in bytes.
+        min_rounds: Fewest rounds the game lasted.
+        max_rounds: Most rounds the game lasted.
+        min_age: Earliest age the game reached, e.g. 3 for age III.
+        max_age: Latest age the game reached.
+        selected: Cards the analyzed player (any player when analyzing
+            every player) must have selected.
+
+    Methods:
+        match_metadata: Evaluates the file predicates.
+        match_header: Evaluates the predicates decided by a header scan.
+        match_record: Evaluates the predicates needing the round records.
+        filter_files: Splits game files into matching and rejected files.
+    """
+    pattern: str = None
+    min_size: int = None
+    max_size: int = None
+    min_rounds: int = None
+    max_rounds: int = None
+    min_age: int = None
+    max_age: int = None
+    selected: Sequence[str] = attr.ib(default=(), converter=tuple)
+
+    def match_metadata(self, game_file: str, base_dir: str) -> bool:
+        """ Returns whether the game file's name and size match.
+        """
+        if self.pattern is not None and not fnmatch.fnmatch(
+            os.path.basename(game_file),
+            self.pattern
+        ):
+            return False
+
+        if self.min_size is None and self.max_size is None:
+            return True
+
+        size = os.path.getsize(os.path.join(base_dir, game_file))
+
+        return (
+            (self.min_size is None or size >= self.min_size)
+            and (self.max_size is None or size <= self.max_size)
+        )
+
+    @property
+    def scans_header(self) -> bool:
+        """ Whether any predicate needs a header scan.
+        """
+        return any(
+            bound is not None
+            for bound in (
+                self.min_rounds,
+                self.max_rounds,
+                self.min_age,
+                self.max_age
+            )
+        ) or bool(self.selected)
+
+    def match_header(self, scan: HeaderScan) -> bool:
+        """ Returns whether a header scan matches the game length, age and
+        card predicates; cards may be selected by any player.
+        """
+        length = scan.game_length
+
+        return (
+            (self.min_rounds is None or length >= self.min_rounds)
+            and (self.max_rounds is None or length <= self.max_rounds)
+            and (self.min_age is None or scan.age >= self.min_age)
+            and (self.max_age is None or scan.age <= self.max_age)
+            and set(self.selected) <= scan.selected
+        )
+
+    def match_record(self, game: Game) -> bool:
+        """ Returns whether the game's player selected every card in
+        selected.
+        """
+        return player_selections(game, self.selected) == set(self.selected)
+
+    def filter_files(
+        self,
+        game_files: Sequence[str],
+        base_dir: str = "./",
+        player: str = "yellow",
+        all_players: bool = False,
+        record_cache_dir: str = None,
+        memory_budget: Any = None
+    ) -> FilterResult:
+        """ Returns the matching game files, in order, the stage each
+        rejected file failed at (metadata, header or record) and the game of
+        each matching file read by the record stage.
+
+        Args:
+            game_files: Game log files.
+            base_dir: Directory containing the game logs.
+            player: Player color analyzed.
+            all_players: Whether every player is analyzed, in which case the
+                header scan decides the card predicates.
+            record_cache_dir: Directory of the record cache.
+            memory_budget: Memory budget of the games read by the record
+                stage; see tta_analysis.cache.MemoryBudget.
+        """
+        matched = []
+        rejected: Dict[str, str] = {}
+        games: Dict[str, Game] = {}
+
+        for game_file in game_files:
+            if not self.match_metadata(game_file, base_dir):
+                rejected[game_file] = "metadata"
+                continue
+
+            if self.scans_header and not self.match_header(
+                scan_header(os.path.join(base_dir, game_file))
+            ):
+                rejected[game_file] = "header"
+                continue
+
+            if self.selected and not all_players:
+                game = Game(
+                    game_file=game_file,
+                    base_dir=base_dir,
+                    player=player,
+                    record_cache_dir=record_cache_dir,
+                    memory_budget=memory_budget
+                )
+
+                # A cached record is cheaper to load than streaming the log,
+                # and is kept by the game for the analysis.
+                if record_cache_dir is not None:
+                    game.evaluate("record_json")
+
+                if not self.match_record(game):
+                    rejected[game_file] = "record"
+                    continue
+
+                games[game_file] = game
+
+            matched.append(game_file)
+
+        return FilterResult(
+            matched=tuple(matched),
+            rejected=rejected,
+            games=games
+        )
@@ -2,25 +2,61 @@
 game state.
 """
 
+from __future__ import annotations
+
 import collections
-import functools
 import os
-from typing import Callable, Tuple, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Sequence,
+    Tuple,
+    TypeVar
+)
 
 import arcbound as ab
 import attr
-import pandas as pd
-import plotnine
-import yaml
 
-from .actions import actions
+from .cache import cached, invalidate, MemoryBudget, node_cache, set_cached
+from .lazy import lazy_import
+from .plan import evaluate
+from .records import iter_record, load_record
+from .render_cache import RenderCache
+from .simulate import SimulationResult, simulate_build_orders, start_state
 from .turn import PlayerTurn, OpponentTurn, TurnType
 
+pd = lazy_import("pandas")
+plotnine = lazy_import("plotnine")
+
 RecordType = TypeVar("RecordType")
 RoundRecordsType = TypeVar("RoundRecordsType")
 
 AgeChange = collections.namedtuple("AgeChange", ("round", "turn"))
 
+GameRound = collections.namedtuple("GameRound", ("round_number", "turns"))
+
+# Columns of state_df each plot is built from; used to key the render cache.
+plot_columns = dict(
+    income_plot=("round_number", "food", "rock", "science", "culture"),
+    strength_plot=("round_number", "strength"),
+    population_plot=("round_number", "employed", "idle", "bank")
+)
+
+
+def state_row(turn: PlayerTurn) -> Dict[str, int]:
+    """ Returns the player's state at the end of a turn, as a row of
+    Game.state_df.
+    """
+    return dict(
+        round_number=turn.round_number,
+        **attr.asdict(turn.income),
+        strength=turn.strength,
+        **attr.asdict(turn.population)
+    )
+
 
 @ab.graph
 @attr.s(auto_attribs=True, hash=False)
@@ -31,61 +67,138 @@ class Game(object):
         game_file: YAML file containing the game logs.
         base_dir: Directory containing finished game logs.
         player: Player color in the game.
+        render_cache_dir: Directory to cache rendered plots in. Plots are
+            re-rendered on every call to render_plot if not set.
+        record_cache_dir: Directory to cache parsed game logs in. The log is
+            parsed on every read if not set.
+        record: Parsed game log. If set, the game file is not read.
+        memory_budget: Memory budget shared with other games. If set, the
+            cached nodes of the least recently used games are spilled to
+            disk; see tta_analysis.cache.MemoryBudget.
 
     Properties:
         record_json: JSON of the game logs.
+        players: Player colors in the game.
 
     Methods:
+        evaluate: Evaluates several properties in one planned pass.
+        iter_rounds: Yields the turns of each round while the game log is
+            parsed, reading the log only as far as the rounds consumed.
+        state_at: Returns the player's state at the end of a round, reading
+            the game log only up to the round.
+        for_player: Returns a view of the game from another player.
+        for_players: Returns views of the game from several players, sharing
+            a single parse of the game log.
+        render_plot: Renders one of the state plots to a file.
+        simulate_build_orders: Simulates candidate build orders starting from
+            the player's state in the game.
     """
     game_file: str
     base_dir: str = "./"
     player: str = "yellow"
+    render_cache_dir: str = None
+    record_cache_dir: str = None
+    record: RecordType = attr.ib(default=None, repr=False, eq=False)
+    memory_budget: MemoryBudget = attr.ib(default=None, repr=False, eq=False)
+
+    def __setattr__(self, name: str, value) -> None:
+        """ Sets an attribute and drops the cached nodes depending on it;
+        e.g. changing player keeps the parsed record but drops the turns.
+        """
+        object.__setattr__(self, name, value)
+        invalidate(self, name)
+
+        return None
 
     ###########################################################################
     # Parse the data and generate turn objects.
     ###########################################################################
 
     @property
+    @cached
     @ab.auto_arcs()
-    def record_json(self, game_file: str, base_dir: str) -> RecordType:
+    def record_json(
+        self,
+        game_file: str,
+        base_dir: str,
+        record_cache_dir: str,
+        record: RecordType
+    ) -> RecordType:
         """ JSON summarizing the game logs. The actions are cast to a list of
         dictionaries.
         """
-        colors = ("yellow", "green", "blue", "red")
+        return (
+            record if record is not None else
+            load_record(os.path.join(base_dir, game_file), record_cache_dir)
+        )
 
-        tab = "    "
+    @property
+    @cached
+    @ab.auto_arcs()
+    def round_records(self, record_json: RecordType) -> RoundRecordsType:
+        """
+        """
+        return {k: v for k, v in record_json.items() if "round" in k}
 
-        with open(os.path.join(base_dir, game_file)) as f:
-            initial_data = functools.reduce(
-                lambda data, color: (
-                    data
-                    .replace(f"{color}:", f"{color}:\n{tab}{tab}actions:")
-                ),
-                colors,
-                f.read()
+    @property
+    @cached
+    @ab.auto_arcs()
+    def players(self, round_records: RoundRecordsType) -> Tuple[str, ...]:
+        """ Player colors in the game, in the order they first take a turn.
+        """
+        return tuple(
+            collections.OrderedDict.fromkeys(
+                key
+                for round_log in round_records.values()
+                for key in round_log
+                if key != "age"
             )
+        )
 
-            data = functools.reduce(
-                lambda data, action: (
-                    data.replace(f" {action}", f" {tab}- {action}")
-                ),
-                actions,
-                initial_data
-            )
+    @ab.arcs(record_json="record_json")
+    def for_players(
+        self,
+        record_json: RecordType,
+        players: Iterable[str] = None
+    ) -> Dict[str, Game]:
+        """ Returns views of the game from each player. The game log is parsed
+        at most once and the parsed record is shared between the views.
 
-            record = yaml.safe_load(data)
+        Arguments:
+            record_json: JSON of the game logs.
+            players: Player colors; defaults to every player in the game.
+        """
+        views = {
+            color: attr.evolve(self, player=color)
+            for color in (self.players if players is None else players)
+        }
 
-        return record
+        for view in views.values():
+            set_cached(view, "record_json", record_json)
 
-    @property
-    @functools.lru_cache()
-    @ab.auto_arcs()
-    def round_records(self, record_json: RecordType) -> RoundRecordsType:
+        return views
+
+    def evaluate(self, *outputs: str) -> Dict[str, Any]:
+        """ Evaluates properties in a single pass planned from the graph,
+        computing each node they depend on once; see
+        tta_analysis.plan.evaluate. Returns the value of each output by name.
+
+        Arguments:
+            *outputs: Property names, e.g. "state_df", "players".
         """
+        return evaluate(self, *outputs)
+
+    def for_player(self, player: str) -> Game:
+        """ Returns a view of the game from another player, sharing the
+        parsed game log.
+
+        Arguments:
+            player: Player color.
         """
-        return {k: v for k, v in record_json.items() if "round" in k}
+        return self.for_players(players=(player,))[player]
 
     @property
+    @cached
     @ab.auto_arcs()
     def age_changes(
         self,
@@ -108,6 +221,7 @@ class Game(object):
         return tuple(enumerate(age_changes))[::-1]
 
     @property
+    @cached
     @ab.auto_arcs()
     def game_length(self, round_records: RoundRecordsType) -> int:
         """ Number of rounds the game lasted.
@@ -141,7 +255,7 @@ class Game(object):
         )
 
     @property
-    @functools.lru_cache()
+    @cached
     @ab.arcs(
         player="player",
         round_records="round_records",
@@ -173,11 +287,165 @@ class Game(object):
             if key != "age"
         )
 
+    @ab.arcs(
+        game_file="game_file",
+        base_dir="base_dir",
+        player="player",
+        record="record"
+    )
+    def iter_rounds(
+        self,
+        game_file: str,
+        base_dir: str,
+        player: str,
+        record: RecordType
+    ) -> Iterator[GameRound]:
+        """ Yields the round number and turns of each round as the game log
+        is parsed; see tta_analysis.records.iter_record. The log is only read
+        and parsed as far as the rounds consumed, so questions about the
+        first rounds or age cost a fraction of a full parse. The parsed
+        record is iterated instead if it is already loaded. Turns are the
+        same as in turns.
+
+        Arguments:
+            game_file: YAML file containing the game logs.
+            base_dir: Directory containing finished game logs.
+            player: Player color in the game.
+            record: Parsed game log.
+        """
+        if record is None:
+            record = node_cache(self).get("record_json")
+
+        entries = (
+            iter_record(os.path.join(base_dir, game_file))
+            if record is None else
+            iter(record.items())
+        )
+
+        age = 0
+
+        for key, round_log in entries:
+            if "round" not in key:
+                continue
+
+            round_number = int(key.split("_")[-1])
+            turns = []
+
+            for color, actions in round_log.items():
+                # Turns after an age change within the round are in the
+                # new age.
+                if color == "age":
+                    age += 1
+                    continue
+
+                turns.append(
+                    PlayerTurn(
+                        round_number=round_number,
+                        age=age,
+                        log=actions,
+                        player=color
+                    )
+                    if color == player else
+                    OpponentTurn(
+                        round_number=round_number,
+                        age=age,
+                        player=color
+                    )
+                )
+
+            yield GameRound(round_number, tuple(turns))
+
+        return None
+
+    def state_at(self, round_number: int) -> pd.Series:
+        """ Returns the player's state at the end of a round, as a row of
+        state_df: the state last logged in or before the round. The game log
+        is read only up to the round.
+
+        Arguments:
+            round_number: Round of the state.
+
+        Raises:
+            ValueError: If the player's state is not logged by the round.
+        """
+        state = None
+
+        for game_round in self.iter_rounds():
+            if game_round.round_number > round_number:
+                break
+
+            state = next(
+                (
+                    state_row(turn)
+                    for turn in game_round.turns[::-1]
+                    if turn.player_turn
+                    if turn.income is not None
+                ),
+                state
+            )
+
+            if game_round.round_number == round_number:
+                break
+
+        if state is None:
+            raise ValueError(
+                f"No state of {self.player} is logged by round "
+                f"{round_number}."
+            )
+
+        return pd.Series(state)
+
+    @ab.arcs(turns="turns")
+    def simulate_build_orders(
+        self,
+        orders: Sequence[Sequence[str]],
+        n_rounds: int,
+        turns: Tuple[TurnType, ...],
+        round_number: int = None
+    ) -> SimulationResult:
+        """ Simulates candidate build orders starting from the player's
+        resources and income at the end of a round.
+
+        Arguments:
+            orders: Build orders as sequences of CamelCase card names.
+            n_rounds: Number of rounds to simulate.
+            turns: Turns in the game.
+            round_number: Round to start from; defaults to the last round in
+                which the player's state was logged.
+
+        Raises:
+            ValueError: If the player's state is not logged by the round.
+        """
+        start_turn = next(
+            (
+                turn
+                for turn in turns[::-1]
+                if turn.player_turn
+                if turn.income is not None
+                if round_number is None or turn.round_number <= round_number
+            ),
+            None
+        )
+
+        if start_turn is None:
+            raise ValueError(
+                f"No state of {self.player} is logged"
+                + ("" if round_number is None else f" by round {round_number}")
+                + "."
+            )
+
+        return simulate_build_orders(
+            start=start_state(start_turn),
+            orders=orders,
+            n_rounds=n_rounds
+        )
+
     ###########################################################################
     # Transform the data into tables and plot.
     ###########################################################################
 
     @property
+    @cached
     @ab.auto_arcs()
     def state_df(self, turns: Tuple[TurnType, ...]) -> pd.DataFrame:
         """ Converts the turn data into a tabular format (pandas) for use in
@@ -185,12 +453,7 @@ class Game(object):
         """
         return pd.DataFrame(
             (
-                dict(
-                    round_number=turn.round_number,
-                    **attr.asdict(turn.income),
-                    strength=turn.strength,
-                    **attr.asdict(turn.population)
-                )
+                state_row(turn)
                 for turn in turns
                 if turn.player_turn
                 if turn.income is not None
@@ -208,7 +471,7 @@ class Game(object):
         """
         aes_kwargs = ({} if aes_kwargs is None else aes_kwargs)
 
-        x_breaks = data[x]
+        x_breaks = sorted(data[x].unique())
 
         max_y = max(data[y])
         y_interval = int(max_y/20) + 1
@@ -289,3 +552,63 @@ class Game(object):
             data=data,
             aes_kwargs=aes_kwargs
         )
+
+    @ab.arcs(state_df="state_df", render_cache_dir="render_cache_dir")
+    def render_plot(
+        self,
+        plot_name: str,
+        state_df: pd.DataFrame,
+        render_cache_dir: str,
+        filename: str = None,
+        file_format: str = "png",
+        **save_kwargs
+    ) -> str:
+        """ Renders a state plot to a file and returns its path. If the render
+        cache is set, the plot is only rebuilt when the state_df columns it is
+        drawn from or the save parameters change.
+
+        Arguments:
+            plot_name: One of income_plot, strength_plot or population_plot.
+            state_df: Game state used to key the render cache.
+            render_cache_dir: Directory to cache rendered plots in.
+            filename: File to write the plot to. Required if the render cache
+                is not set; otherwise the cached plot is copied to it.
+            file_format: Format of the rendered file (e.g. png or svg).
+            save_kwargs: Keyword arguments passed to plotnine.ggplot.save.
+        """
+        if plot_name not in plot_columns:
+            raise ValueError(
+                f"{plot_name} is not one of {', '.join(plot_columns)}."
+            )
+
+        if render_cache_dir is None:
+            if filename is None:
+                raise ValueError(
+                    "A filename is required when the render cache is not set."
+                )
+
+            getattr(self, plot_name).save(
+                filename,
+                format=file_format,
+                verbose=False,
+                **save_kwargs
+            )
+            path = filename
+
+        else:
+            render_cache = RenderCache(render_cache_dir)
+
+            cached_path = render_cache.render(
+                create_plot=lambda: getattr(self, plot_name),
+                data=state_df[list(plot_columns[plot_name])],
+                params=dict(plot_name=plot_name),
+                file_format=file_format,
+                **save_kwargs
+            )
+
+            path = (
+                cached_path if filename is None else
+                render_cache.copy(cached_path, filename)
+            )
+
+        return path
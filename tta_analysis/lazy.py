@@ -0,0 +1,40 @@
+""" Defers importing heavy dependencies (pandas, plotnine, yaml) until they
+are first used.
+"""
+
+import importlib
+from types import ModuleType
+
+
+class LazyModule(object):
+    """ Stands in for a module, importing it on the first attribute access.
+
+    Input parameters:
+        name: Absolute name of the module to import.
+    """
+    def __init__(self, name: str) -> None:
+        self._name = name
+        return None
+
+    def __getattr__(self, attribute: str):
+        """ Imports the module and returns the requested attribute.
+        """
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazily imported module '{self._name}'>"
+
+    def _load(self) -> ModuleType:
+        """ Returns the imported module. After the first import this is a
+        lookup in sys.modules.
+        """
+        return importlib.import_module(self._name)
+
+
+def lazy_import(name: str) -> LazyModule:
+    """ Returns a stand-in for the module that is imported on first use.
+
+    Args:
+        name: Absolute name of the module to import.
+    """
+    return LazyModule(name)
@@ -0,0 +1,317 @@
+""" Computes Series aggregates over shards of game logs and merges the
+partial aggregates.
+
+Shards can be run in a local process pool (run_local) or through a work
+queue kept in a directory (WorkQueue); with the directory on a shared file
+system, workers on several machines can process the same queue. Both
+produce the same aggregates as a single Series of all games.
+run_local_transitions merges the card-transition counts of the shards in
+the same way.
+
+Shard files are named by the shard's position and a hash of the shard and
+of the signature (size and modification time) of each of its game logs, so
+a resubmitted series with other or edited logs never picks up the results of
+an earlier submission, and shards whose results already exist are not
+processed again.
+
+Usage on each worker machine:
+    python -m tta_analysis.mapreduce QUEUE_DIR
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Tuple, TypeVar
+
+import attr
+
+from .aggregates import PartialAggregate
+from .series import Series
+from .store import file_signature
+from .transitions import TransitionCounts
+
+ShardType = Dict
+MergeableType = TypeVar("MergeableType", PartialAggregate, TransitionCounts)
+
+
+def create_shards(series: Series, shard_size: int) -> Tuple[ShardType, ...]:
+    """ Splits a series into JSON serializable shards of at most shard_size
+    game files. Duplicates collapsed by the series are left out.
+
+    Args:
+        series: Series of all games.
+        shard_size: Number of game files in each shard.
+    """
+    game_files = series.filtered_game_files
+
+    return tuple(
+        dict(
+            game_files=game_files[i:i + shard_size],
+            base_dir=series.base_dir,
+            player=series.player,
+            record_cache_dir=series.record_cache_dir
+        )
+        for i in range(0, len(game_files), shard_size)
+    )
+
+
+def map_shard(shard: ShardType) -> PartialAggregate:
+    """ Returns the partial aggregate of the games in a shard.
+    """
+    return Series(
+        game_files=tuple(shard["game_files"]),
+        base_dir=shard["base_dir"],
+        player=shard["player"],
+        record_cache_dir=shard["record_cache_dir"]
+    ).partial_aggregate
+
+
+def map_shard_transitions(shard: ShardType) -> TransitionCounts:
+    """ Returns the card-transition counts of the games in a shard.
+    """
+    return Series(
+        game_files=tuple(shard["game_files"]),
+        base_dir=shard["base_dir"],
+        player=shard["player"],
+        record_cache_dir=shard["record_cache_dir"]
+    ).transition_counts
+
+
+def shard_name(i: int, shard: ShardType) -> str:
+    """ Returns the file name of the i-th shard of a submission, which
+    changes with the shard and with the signature of each of its game logs.
+    """
+    signatures = tuple(
+        file_signature(os.path.join(shard["base_dir"], game_file))
+        for game_file in shard["game_files"]
+    )
+    digest = hashlib.sha1(
+        json.dumps((shard, signatures), sort_keys=True).encode()
+    ).hexdigest()
+
+    return f"{i:06d}-{digest[:12]}.json"
+
+
+def reduce_partials(
+    partials: Iterable[MergeableType],
+    cls: type = PartialAggregate
+) -> MergeableType:
+    """ Merges partial aggregates, or card-transition counts, into those of
+    all of their games.
+
+    Args:
+        partials: Partial aggregates or counts of shards.
+        cls: Type of the partials, whose empty value is returned if there
+            are none.
+    """
+    partials = iter(partials)
+    first = next(partials, None)
+
+    if first is None:
+        return cls.empty()
+
+    return functools.reduce(lambda p1, p2: p1.merge(p2), partials, first)
+
+
+def run_local(
+    series: Series,
+    shard_size: int = 100,
+    workers: int = None
+) -> PartialAggregate:
+    """ Computes the aggregate of a series by mapping its shards in a process
+    pool and merging the partial aggregates.
+
+    Args:
+        series: Series of all games.
+        shard_size: Number of game files in each shard.
+        workers: Number of processes; defaults to the number of CPUs.
+    """
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        partial = reduce_partials(
+            executor.map(map_shard, create_shards(series, shard_size))
+        )
+
+    return partial
+
+
+def run_local_transitions(
+    series: Series,
+    shard_size: int = 100,
+    workers: int = None
+) -> TransitionCounts:
+    """ Computes the card-transition counts of a series by mapping its
+    shards in a process pool and merging the counts.
+
+    Args:
+        series: Series of all games.
+        shard_size: Number of game files in each shard.
+        workers: Number of processes; defaults to the number of CPUs.
+    """
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        counts = reduce_partials(
+            executor.map(
+                map_shard_transitions,
+                create_shards(series, shard_size)
+            ),
+            cls=TransitionCounts
+        )
+
+    return counts
+
+
+@attr.s(auto_attribs=True)
+class WorkQueue(object):
+    """ Queue of shards kept as files in a directory. Shards move from
+    pending to claimed when a worker takes them, and their partial aggregates
+    are written to results. Moves use os.rename, which is atomic, so each
+    shard is processed by one worker. The names of the last submission's
+    shards are kept in shards.json; collect merges only their results.
+
+    Input parameters:
+        queue_dir: Directory holding the queue.
+
+    Methods:
+        submit: Adds the shards of a series to the queue.
+        work: Processes pending shards until none are left.
+        requeue_stale: Returns shards claimed by workers that died.
+        collect: Merges the results once every shard is processed.
+    """
+    queue_dir: str
+
+    def path(self, state: str, name: str = "") -> str:
+        """ Returns the path to a shard file in one of the queue's states.
+        """
+        return os.path.join(self.queue_dir, state, name)
+
+    def shards(self, state: str) -> Tuple[str, ...]:
+        """ Returns the names of the shards in one of the queue's states.
+        """
+        directory = self.path(state)
+
+        return tuple(
+            sorted(
+                name
+                for name in os.listdir(directory)
+                if name.endswith(".json")
+            )
+        ) if os.path.isdir(directory) else ()
+
+    def write(self, state: str, name: str, data: Dict) -> None:
+        """ Atomically writes a shard file.
+        """
+        os.makedirs(self.path(state), exist_ok=True)
+
+        temp_path = self.path(state, f".{name}.{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path(state, name))
+
+        return None
+
+    def submit(self, series: Series, shard_size: int = 100) -> int:
+        """ Adds the shards of a series to the queue, except those whose
+        results already exist. Returns the number of shards in the series.
+
+        Args:
+            series: Series of all games.
+            shard_size: Number of game files in each shard.
+        """
+        shards = create_shards(series, shard_size)
+        names = tuple(
+            shard_name(i, shard) for i, shard in enumerate(shards)
+        )
+        done = set(self.shards("results"))
+
+        for name, shard in zip(names, shards):
+            if name not in done:
+                self.write("pending", name, shard)
+
+        self.write("", "shards.json", names)
+
+        return len(shards)
+
+    def work(self) -> int:
+        """ Claims and processes pending shards until none are left. Returns
+        the number of shards processed by this worker.
+        """
+        processed = 0
+        os.makedirs(self.path("claimed"), exist_ok=True)
+
+        for name in self.shards("pending"):
+            try:
+                os.rename(
+                    self.path("pending", name),
+                    self.path("claimed", name)
+                )
+
+            except FileNotFoundError:
+                # Claimed by another worker.
+                continue
+
+            # Record the claim time for requeue_stale.
+            os.utime(self.path("claimed", name))
+
+            with open(self.path("claimed", name)) as f:
+                shard = json.load(f)
+
+            self.write("results", name, map_shard(shard).to_dict())
+            os.remove(self.path("claimed", name))
+            processed += 1
+
+        return processed
+
+    def requeue_stale(self, max_age: float) -> int:
+        """ Moves shards claimed more than max_age seconds ago back to
+        pending. Returns the number of shards requeued.
+
+        Args:
+            max_age: Seconds after which a claimed shard is assumed lost.
+        """
+        stale = tuple(
+            name
+            for name in self.shards("claimed")
+            if time.time() - os.path.getmtime(self.path("claimed", name))
+            > max_age
+        )
+
+        for name in stale:
+            os.rename(self.path("claimed", name), self.path("pending", name))
+
+        return len(stale)
+
+    def collect(self) -> PartialAggregate:
+        """ Returns the merged aggregate of every shard.
+
+        Raises:
+            RuntimeError: If shards of the last submission have not been
+                processed.
+        """
+        with open(self.path("", "shards.json")) as f:
+            names = json.load(f)
+
+        unfinished = set(names) - set(self.shards("results"))
+
+        if unfinished:
+            raise RuntimeError(
+                f"{len(unfinished)} shards have not been processed."
+            )
+
+        def load(name: str) -> PartialAggregate:
+            """ Reads the partial aggregate of a shard.
+            """
+            with open(self.path("results", name)) as f:
+                partial = PartialAggregate.from_dict(json.load(f))
+
+            return partial
+
+        return reduce_partials(load(name) for name in names)
+
+
+if __name__ == "__main__":
+    print(f"Processed {WorkQueue(sys.argv[1]).work()} shards.")
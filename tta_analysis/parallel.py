@@ -0,0 +1,316 @@
+""" Builds the state and action frames of many games in worker processes,
+returning the results through shared memory.
+
+Each worker parses a chunk of games and writes the numeric columns of its
+states and actions into one shared-memory block (strings are written as
+integer codes), returning only a small descriptor of the block. The parent
+copies every block once into the final arrays, which the frames are built
+on without further copies, and releases the blocks. Nothing but the
+descriptors is pickled.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import os
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Sequence, Tuple
+
+import attr
+
+from .actions import actions
+from .aggregates import state_columns
+from .game import Game
+from .lazy import lazy_import
+from .records import colors
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+BlockDescriptor = collections.namedtuple(
+    "BlockDescriptor",
+    ("name", "n_states", "n_actions", "cards")
+)
+
+state_fields = ("round_number",) + state_columns + ("game_id", "player")
+action_fields = (
+    "game_id",
+    "player",
+    "round_number",
+    "age",
+    "card",
+    "ca",
+    "action"
+)
+
+action_codes = {action: i for i, action in enumerate(actions)}
+
+
+def untrack_block(block: shared_memory.SharedMemory) -> None:
+    """ Stops this process's resource tracker from unlinking a block when
+    the process exits; the block is unlinked by the process it is handed to.
+    Blocks are only tracked on POSIX, under their name with a leading slash.
+    """
+    if os.name == "posix":
+        resource_tracker.unregister(f"/{block.name}", "shared_memory")
+
+    return None
+
+
+def load_chunk(task: Dict) -> BlockDescriptor:
+    """ Parses a chunk of games and writes their states and actions to a new
+    shared-memory block. Returns the block's descriptor; the parent process
+    is responsible for unlinking the block.
+
+    Args:
+        task: Chunk of games, as created by load_frames.
+    """
+    states = []
+    action_rows = []
+    cards: Dict[str, int] = {}
+
+    for game_id, game_file in task["games"]:
+        game = Game(
+            game_file=game_file,
+            base_dir=task["base_dir"],
+            player=task["player"],
+            record_cache_dir=task["record_cache_dir"]
+        )
+        views = (
+            game.for_players() if task["all_players"] else
+            {task["player"]: game}
+        )
+
+        for color, view in views.items():
+            player_code = colors.index(color)
+
+            for turn in view.turns:
+                if not turn.player_turn:
+                    continue
+
+                if turn.income is not None:
+                    states.append(
+                        (turn.round_number,)
+                        + attr.astuple(turn.income)
+                        + (turn.strength,)
+                        + attr.astuple(turn.population)
+                        + (game_id, player_code)
+                    )
+
+                action_rows.extend(
+                    (
+                        game_id,
+                        player_code,
+                        turn.round_number,
+                        turn.age,
+                        cards.setdefault(action.card, len(cards)),
+                        int(action.ca),
+                        action_codes[action.action]
+                    )
+                    for action in turn.actions
+                )
+
+    shape_states = (len(states), len(state_fields))
+    shape_actions = (len(action_rows), len(action_fields))
+    n_values = shape_states[0] * shape_states[1]
+    n_values += shape_actions[0] * shape_actions[1]
+
+    block = shared_memory.SharedMemory(create=True, size=max(n_values, 1) * 8)
+    untrack_block(block)
+
+    try:
+        values = np.ndarray((n_values,), dtype=np.int64, buffer=block.buf)
+        split = shape_states[0] * shape_states[1]
+
+        values[:split] = np.array(states, dtype=np.int64).ravel()
+        values[split:] = np.array(action_rows, dtype=np.int64).ravel()
+        del values
+
+    except BaseException:
+        # The parent never learns the name of a block it is not returned.
+        block.close()
+        block.unlink()
+        raise
+
+    block.close()
+
+    return BlockDescriptor(
+        name=block.name,
+        n_states=len(states),
+        n_actions=len(action_rows),
+        cards=tuple(cards)
+    )
+
+
+def release_block(name: str) -> None:
+    """ Unlinks a shared-memory block created by load_chunk.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    block.close()
+    block.unlink()
+
+    return None
+
+
+def copy_blocks(
+    descriptors: Sequence[BlockDescriptor]
+) -> Tuple[np.ndarray, np.ndarray, Tuple[str, ...]]:
+    """ Copies the blocks of the chunks, in order, into the state and action
+    arrays of all chunks, mapping each chunk's card codes to codes over the
+    cards of all chunks. Returns the arrays and the card names. The blocks
+    are not unlinked.
+    """
+    card_names = tuple(
+        collections.OrderedDict.fromkeys(
+            card
+            for descriptor in descriptors
+            for card in descriptor.cards
+        )
+    )
+    card_index = {card: i for i, card in enumerate(card_names)}
+
+    states = np.empty(
+        (sum(d.n_states for d in descriptors), len(state_fields)),
+        dtype=np.int64
+    )
+    action_values = np.empty(
+        (sum(d.n_actions for d in descriptors), len(action_fields)),
+        dtype=np.int64
+    )
+
+    state_start = action_start = 0
+    card_column = action_fields.index("card")
+
+    for descriptor in descriptors:
+        block = shared_memory.SharedMemory(name=descriptor.name)
+        split = descriptor.n_states * len(state_fields)
+        values = np.ndarray(
+            (split + descriptor.n_actions * len(action_fields),),
+            dtype=np.int64,
+            buffer=block.buf
+        )
+
+        state_end = state_start + descriptor.n_states
+        action_end = action_start + descriptor.n_actions
+
+        states[state_start:state_end] = values[:split].reshape(
+            -1,
+            len(state_fields)
+        )
+        action_values[action_start:action_end] = values[split:].reshape(
+            -1,
+            len(action_fields)
+        )
+        del values
+        block.close()
+
+        # Map the chunk's card codes to the codes of all chunks.
+        chunk_cards = np.array(
+            tuple(card_index[card] for card in descriptor.cards),
+            dtype=np.int64
+        )
+        cards_slice = action_values[action_start:action_end, card_column]
+        cards_slice[:] = chunk_cards[cards_slice]
+
+        state_start, action_start = state_end, action_end
+
+    return states, action_values, card_names
+
+
+def load_frames(
+    game_files: Sequence[str],
+    base_dir: str = "./",
+    player: str = "yellow",
+    all_players: bool = False,
+    record_cache_dir: str = None,
+    workers: int = None,
+    chunk_size: int = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """ Returns the state and actions frames of the games, as in
+    Series.series_state_df and Series.actions_df (with a RangeIndex), built
+    in a process pool.
+
+    Args:
+        game_files: Game log files; game ids follow their order.
+        base_dir: Directory containing the game logs.
+        player: Player color analyzed.
+        all_players: Analyzes every player in each game if set.
+        record_cache_dir: Directory of the record cache.
+        workers: Number of processes; defaults to the number of CPUs.
+        chunk_size: Number of games parsed by a worker at once; defaults to
+            an even split into four chunks per worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, len(game_files) // (workers * 4))
+
+    tasks = tuple(
+        dict(
+            games=tuple(enumerate(game_files))[i:i + chunk_size],
+            base_dir=base_dir,
+            player=player,
+            all_players=all_players,
+            record_cache_dir=record_cache_dir
+        )
+        for i in range(0, len(game_files), chunk_size)
+    )
+
+    futures = []
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(load_chunk, task) for task in tasks]
+
+            try:
+                descriptors = tuple(future.result() for future in futures)
+
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        states, action_values, card_names = copy_blocks(descriptors)
+
+    finally:
+        # Every chunk has finished once the pool is shut down; unlink the
+        # block of each chunk that returned one, even if another failed.
+        for future in futures:
+            if (
+                future.done()
+                and not future.cancelled()
+                and future.exception() is None
+            ):
+                release_block(future.result().name)
+
+    game_names = np.array(
+        tuple(os.path.splitext(game_file)[0] for game_file in game_files),
+        dtype=object
+    )
+    player_names = np.array(colors, dtype=object)
+
+    n_columns = len(state_columns) + 1
+    state_df = pd.DataFrame(
+        states[:, :n_columns],
+        columns=state_fields[:n_columns],
+        copy=False
+    ).assign(
+        game_name=game_names[states[:, n_columns]],
+        game_id=states[:, n_columns],
+        player=player_names[states[:, n_columns + 1]]
+    )
+
+    columns = dict(zip(action_fields, action_values.T))
+    actions_df = pd.DataFrame(
+        dict(
+            game=game_names[columns["game_id"]],
+            player=player_names[columns["player"]],
+            round_number=columns["round_number"],
+            age=columns["age"],
+            card=np.array(card_names, dtype=object)[columns["card"]],
+            ca=columns["ca"],
+            action=np.array(actions, dtype=object)[columns["action"]]
+        ),
+        copy=False
+    )
+
+    return state_df, actions_df
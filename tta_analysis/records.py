@@ -0,0 +1,295 @@
+""" Parses game logs into records and caches the parsed records on disk so
+that each log is only parsed once.
+
+Records are keyed by a hash of the log's normalized contents, so copies of a
+game that differ only in file name, folder or whitespace share one parsed
+record and can be collapsed into one game.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import os
+import pickle
+import re
+from typing import Any, Dict, Iterable, Iterator, Tuple, TypeVar
+
+import attr
+
+from .actions import actions
+from .lazy import lazy_import
+
+yaml = lazy_import("yaml")
+
+RecordType = TypeVar("RecordType")
+
+IngestResult = collections.namedtuple(
+    "IngestResult",
+    ("path", "size", "error")
+)
+
+DeduplicationResult = collections.namedtuple(
+    "DeduplicationResult",
+    ("unique", "duplicates")
+)
+
+colors = ("yellow", "green", "blue", "red")
+
+
+def normalize_record(data: bytes) -> bytes:
+    """ Returns the contents of a game log with whitespace differences that
+    do not change its meaning removed: line endings are unified, tabs in a
+    line's indentation are expanded and trailing whitespace, including
+    trailing blank lines, is dropped. Whitespace within values and blank
+    lines between entries are kept.
+
+    Args:
+        data: Contents of the game log.
+    """
+    lines = (
+        indentation.expandtabs(4) + rest.rstrip()
+        for indentation, rest in (
+            re.match(r"([ \t]*)(.*)", line, re.DOTALL).groups()
+            for line in data.decode().splitlines()
+        )
+    )
+
+    return "\n".join(lines).rstrip("\n").encode()
+
+
+def record_hash(data: bytes) -> str:
+    """ Returns the hash of a game log's normalized contents.
+
+    Args:
+        data: Contents of the game log.
+    """
+    return hashlib.sha1(normalize_record(data)).hexdigest()
+
+
+def hash_record(path: str) -> str:
+    """ Reads a game log and returns the hash of its normalized contents.
+
+    Args:
+        path: Path to the game log.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    return record_hash(data)
+
+
+def deduplicate_records(paths: Iterable[str]) -> DeduplicationResult:
+    """ Collapses game logs with the same normalized contents. Returns the
+    paths of the first copy of each game, in their original order, and a
+    mapping of each collapsed duplicate to the path of the copy kept.
+
+    Args:
+        paths: Paths to the game logs.
+    """
+    kept: Dict[str, str] = {}
+    duplicates: Dict[str, str] = {}
+
+    for path in paths:
+        key = hash_record(path)
+
+        if key in kept:
+            duplicates[path] = kept[key]
+
+        else:
+            kept[key] = path
+
+    return DeduplicationResult(
+        unique=tuple(kept.values()),
+        duplicates=duplicates
+    )
+
+
+def parse_record(text: str) -> RecordType:
+    """ Returns the JSON summarizing a game log. The actions are cast to a
+    list of dictionaries.
+
+    Args:
+        text: Contents of the game log.
+    """
+    tab = "    "
+
+    initial_data = functools.reduce(
+        lambda data, color: (
+            data
+            .replace(f"{color}:", f"{color}:\n{tab}{tab}actions:")
+        ),
+        colors,
+        text
+    )
+
+    data = functools.reduce(
+        lambda data, action: (
+            data.replace(f" {action}", f" {tab}- {action}")
+        ),
+        actions,
+        initial_data
+    )
+
+    return yaml.safe_load(data)
+
+
+def read_record(path: str) -> RecordType:
+    """ Reads and parses a game log.
+
+    Args:
+        path: Path to the game log.
+    """
+    with open(path) as f:
+        record = parse_record(f.read())
+
+    return record
+
+
+def iter_record(path: str) -> Iterator[Tuple[str, Any]]:
+    """ Parses a game log one top-level entry (e.g. round_3) at a time,
+    yielding each key and value as soon as the entry has been read. The log
+    is only read as far as the entries consumed, so stopping early skips
+    reading and parsing the rest of the game.
+
+    Args:
+        path: Path to the game log.
+    """
+    def parse_entry(lines: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """ Parses the lines of one top-level entry.
+        """
+        entry = parse_record("".join(lines))
+
+        return iter((entry or {}).items())
+
+    with open(path) as f:
+        lines = []
+
+        for line in f:
+            # Unindented lines start the next top-level entry.
+            if line.strip() and not line[0].isspace() and lines:
+                yield from parse_entry(lines)
+                lines = []
+
+            lines.append(line)
+
+        yield from parse_entry(lines)
+
+    return None
+
+
+@attr.s(auto_attribs=True)
+class RecordCache(object):
+    """ Stores parsed game records on disk, keyed by a hash of the log's
+    normalized contents so that renamed, moved or reformatted logs are not
+    parsed again.
+
+    Input parameters:
+        cache_dir: Directory the parsed records are written to.
+
+    Methods:
+        key: Hash identifying a game log's contents.
+        load: Returns the parsed record, parsing only on a cache miss.
+    """
+    cache_dir: str
+
+    def key(self, data: bytes) -> str:
+        """ Returns a hash of the game log's normalized contents.
+        """
+        return record_hash(data)
+
+    def load(self, path: str) -> RecordType:
+        """ Returns the parsed record of the game log, reading it from the
+        cache if the log has been parsed before.
+
+        Args:
+            path: Path to the game log.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+
+        cache_path = os.path.join(self.cache_dir, f"{self.key(data)}.pickle")
+
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                record = pickle.load(f)
+
+        else:
+            # The key only ignores whitespace that does not change the
+            # parse, so the log itself is parsed.
+            record = parse_record(data.decode())
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # Write to a temporary file so that concurrent writers and
+            # interrupted writes never leave a truncated record behind.
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+
+        return record
+
+
+def load_record(path: str, cache_dir: str = None) -> RecordType:
+    """ Returns the parsed record of a game log, using the record cache if a
+    cache directory is provided.
+
+    Args:
+        path: Path to the game log.
+        cache_dir: Directory of the record cache.
+    """
+    return (
+        read_record(path) if cache_dir is None else
+        RecordCache(cache_dir).load(path)
+    )
+
+
+def ingest_record(path: str, cache_dir: str = None) -> IngestResult:
+    """ Parses a game log into the record cache. Returns the size of the log
+    and the error raised while parsing, if any.
+
+    Args:
+        path: Path to the game log.
+        cache_dir: Directory of the record cache.
+    """
+    try:
+        load_record(path, cache_dir)
+        error = None
+
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    return IngestResult(path, os.path.getsize(path), error)
+
+
+def ingest_records(
+    paths: Iterable[str],
+    cache_dir: str = None,
+    workers: int = None
+) -> Iterator[IngestResult]:
+    """ Parses game logs into the record cache in a process pool. Yields the
+    results in the order of the paths provided.
+
+    Args:
+        paths: Paths to the game logs.
+        cache_dir: Directory of the record cache.
+        workers: Number of processes; defaults to the number of CPUs.
+    """
+    paths = tuple(paths)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        yield from (ingest_record(path, cache_dir) for path in paths)
+
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            yield from executor.map(
+                functools.partial(ingest_record, cache_dir=cache_dir),
+                paths,
+                chunksize=max(1, len(paths) // (workers * 4))
+            )
+
+    return None
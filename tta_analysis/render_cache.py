@@ -0,0 +1,115 @@
+""" Caches rendered plots on disk, keyed by a hash of the data and parameters
+used to build them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable
+
+import attr
+
+from .lazy import lazy_import
+from .release import __version__
+
+pd = lazy_import("pandas")
+plotnine = lazy_import("plotnine")
+
+
+@attr.s(auto_attribs=True)
+class RenderCache(object):
+    """ Stores rendered plots in a directory and returns the stored file when
+    neither the plotted data nor the plot parameters have changed.
+
+    Input parameters:
+        cache_dir: Directory the rendered plots are written to.
+
+    Methods:
+        key: Hash identifying a plot rendered from the data and parameters.
+        render: Returns the path to the rendered plot, rendering only on a
+            cache miss.
+        copy: Copies a cached plot to a requested file name.
+    """
+    cache_dir: str
+
+    def key(self, data: pd.DataFrame, **params) -> str:
+        """ Returns a hash of the data's columns and values and the plot
+        parameters.
+
+        Arguments:
+            data: Data the plot is created from.
+            params: Parameters affecting the plot or the rendered file.
+        """
+        hasher = hashlib.sha1()
+
+        hasher.update(json.dumps(list(map(str, data.columns))).encode())
+        hasher.update(
+            pd.util.hash_pandas_object(data, index=False).values.tobytes()
+        )
+        hasher.update(
+            json.dumps(
+                dict(params, version=__version__),
+                sort_keys=True,
+                default=str
+            ).encode()
+        )
+
+        return hasher.hexdigest()
+
+    def render(
+        self,
+        create_plot: Callable[[], plotnine.ggplot],
+        data: pd.DataFrame,
+        params: dict = None,
+        file_format: str = "png",
+        **save_kwargs
+    ) -> str:
+        """ Returns the path to the rendered plot. The plot is only created
+        and rendered if it is not already in the cache.
+
+        Arguments:
+            create_plot: Function returning the plot to render.
+            data: Data the plot is created from; used to key the cache.
+            params: Parameters used to create the plot; used to key the cache.
+            file_format: Format of the rendered file (e.g. png or svg).
+            save_kwargs: Keyword arguments passed to plotnine.ggplot.save.
+        """
+        key = self.key(
+            data,
+            **(params or {}),
+            file_format=file_format,
+            save_kwargs=save_kwargs
+        )
+        path = os.path.join(self.cache_dir, f"{key}.{file_format}")
+
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # Render to a temporary file so that an interrupted render is
+            # never mistaken for a cached plot.
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            create_plot().save(
+                temp_path,
+                format=file_format,
+                verbose=False,
+                **save_kwargs
+            )
+            os.replace(temp_path, path)
+
+        return path
+
+    def copy(self, path: str, filename: str) -> str:
+        """ Copies a cached plot to the requested file name. Returns the file
+        name.
+        """
+        directory = os.path.dirname(filename)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        shutil.copyfile(path, filename)
+
+        return filename
@@ -0,0 +1,310 @@
+""" Renders the state plots of every game in a series to a folder of reports,
+in a process pool.
+
+Each game gets a folder with one plot per player and state plot and a
+manifest (report.json) recording the log's file signature, the render
+parameters, the plots and the player's final state. A game whose manifest
+matches its log and parameters, and whose plots all exist, is up to date and
+is not rendered again. The manifest is written last, so an interrupted
+render is redone on the next run.
+
+An index.html summary links every game's plots with its final state.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import html
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+from .game import Game, plot_columns
+from .release import __version__
+from .store import file_signature
+
+ReportResult = collections.namedtuple(
+    "ReportResult",
+    ("index", "rendered", "skipped", "errors", "seconds")
+)
+
+manifest_name = "report.json"
+
+summary_columns = ("round_number", "culture", "science", "strength")
+
+
+def report_params(task: Dict[str, Any]) -> Dict[str, Any]:
+    """ Returns the parameters of a render that its outputs depend on.
+    """
+    return dict(
+        player=task["player"],
+        all_players=task["all_players"],
+        file_format=task["file_format"],
+        version=__version__
+    )
+
+
+def read_manifest(task: Dict[str, Any]) -> Dict[str, Any]:
+    """ Returns the manifest of a game's report if the report is up to date
+    with the game log and render parameters; None otherwise.
+
+    Args:
+        task: Game to render, as created by render_reports.
+    """
+    path = os.path.join(task["out_dir"], task["name"], manifest_name)
+
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+
+    except (OSError, ValueError):
+        return None
+
+    up_to_date = (
+        manifest.get("signature") == task["signature"]
+        and manifest.get("params") == report_params(task)
+        and all(
+            os.path.exists(os.path.join(task["out_dir"], plot))
+            for plots in manifest["plots"].values()
+            for plot in plots
+        )
+    )
+
+    return manifest if up_to_date else None
+
+
+def render_game(task: Dict[str, Any]) -> Dict[str, Any]:
+    """ Renders the state plots of a game and writes its manifest. Returns
+    the manifest, with the error raised while rendering, if any.
+
+    Args:
+        task: Game to render, as created by render_reports.
+    """
+    game_dir = os.path.join(task["out_dir"], task["name"])
+    manifest = dict(
+        name=task["name"],
+        signature=task["signature"],
+        params=report_params(task),
+        plots={},
+        states={},
+        error=None
+    )
+
+    try:
+        game = Game(
+            game_file=task["game_file"],
+            base_dir=task["base_dir"],
+            player=task["player"],
+            record_cache_dir=task["record_cache_dir"],
+            render_cache_dir=task["render_cache_dir"]
+        )
+        views = (
+            game.for_players() if task["all_players"] else
+            {task["player"]: game}
+        )
+
+        os.makedirs(game_dir, exist_ok=True)
+
+        for color, view in views.items():
+            plots = []
+
+            for plot_name in plot_columns:
+                filename = os.path.join(
+                    game_dir,
+                    f"{color}_{plot_name}.{task['file_format']}"
+                )
+                view.render_plot(
+                    plot_name,
+                    filename=filename,
+                    file_format=task["file_format"]
+                )
+                plots.append(os.path.relpath(filename, task["out_dir"]))
+
+            final_state = view.state_df.iloc[-1]
+
+            manifest["plots"][color] = plots
+            manifest["states"][color] = {
+                column: int(final_state[column])
+                for column in summary_columns
+            }
+
+    except Exception as e:
+        manifest["error"] = f"{type(e).__name__}: {e}"
+
+        return manifest
+
+    # Write to a temporary file so that an interrupted write never leaves a
+    # manifest marking the report as up to date.
+    path = os.path.join(game_dir, manifest_name)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, path)
+
+    return manifest
+
+
+def render_games(
+    tasks: Sequence[Dict[str, Any]],
+    workers: int = None
+) -> Iterator[Dict[str, Any]]:
+    """ Renders games in a process pool. Yields the manifests in the order
+    of the tasks.
+
+    Args:
+        tasks: Games to render, as created by render_reports.
+        workers: Number of processes; defaults to the number of CPUs.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        yield from (render_game(task) for task in tasks)
+
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            yield from executor.map(render_game, tasks)
+
+    return None
+
+
+def write_index(
+    manifests: Iterable[Dict[str, Any]],
+    out_dir: str
+) -> str:
+    """ Writes the index.html summary of the reports. Returns its path.
+
+    Args:
+        manifests: Manifest of each game, in display order.
+        out_dir: Folder of the reports.
+    """
+    rows = []
+
+    for manifest in manifests:
+        name = html.escape(manifest["name"])
+
+        if manifest["error"] is not None:
+            rows.append(
+                f"<tr><td>{name}</td><td></td>"
+                f"<td colspan=\"{len(summary_columns) + 1}\">"
+                f"{html.escape(manifest['error'])}</td></tr>"
+            )
+
+            continue
+
+        for color, plots in manifest["plots"].items():
+            state = manifest["states"][color]
+            links = " ".join(
+                f"<a href=\"{html.escape(plot)}\">"
+                f"<img src=\"{html.escape(plot)}\" height=\"120\"></a>"
+                for plot in plots
+            )
+            rows.append(
+                f"<tr><td>{name}</td><td>{html.escape(color)}</td>"
+                + "".join(
+                    f"<td>{state[column]}</td>"
+                    for column in summary_columns
+                )
+                + f"<td>{links}</td></tr>"
+            )
+
+    header = "".join(
+        f"<th>{column}</th>"
+        for column in ("game", "player") + summary_columns + ("plots",)
+    )
+
+    path = os.path.join(out_dir, "index.html")
+
+    with open(path, "w") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            "<title>Game reports</title></head><body>\n"
+            f"<h1>Game reports</h1>\n<table>\n<tr>{header}</tr>\n"
+            + "\n".join(rows)
+            + "\n</table>\n</body></html>\n"
+        )
+
+    return path
+
+
+def render_reports(
+    game_files: Sequence[str],
+    out_dir: str,
+    base_dir: str = "./",
+    player: str = "yellow",
+    all_players: bool = False,
+    record_cache_dir: str = None,
+    render_cache_dir: str = None,
+    workers: int = None,
+    file_format: str = "png"
+) -> ReportResult:
+    """ Renders the state plots of every game that is not up to date in a
+    process pool, writes the index.html summary and prints the render
+    throughput to stderr.
+
+    Args:
+        game_files: Game log files.
+        out_dir: Folder the reports are written to.
+        base_dir: Directory containing the game logs.
+        player: Player color analyzed.
+        all_players: Renders every player in each game if set.
+        record_cache_dir: Directory of the record cache.
+        render_cache_dir: Directory of the render cache.
+        workers: Number of processes; defaults to the number of CPUs.
+        file_format: Format of the rendered plots (e.g. png or svg).
+    """
+    start = time.perf_counter()
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    tasks = tuple(
+        dict(
+            name=os.path.splitext(game_file)[0],
+            game_file=game_file,
+            base_dir=base_dir,
+            signature=file_signature(os.path.join(base_dir, game_file)),
+            out_dir=out_dir,
+            player=player,
+            all_players=all_players,
+            record_cache_dir=record_cache_dir,
+            render_cache_dir=render_cache_dir,
+            file_format=file_format
+        )
+        for game_file in game_files
+    )
+
+    manifests = {task["name"]: read_manifest(task) for task in tasks}
+    pending = tuple(task for task in tasks if manifests[task["name"]] is None)
+
+    for manifest in render_games(pending, workers):
+        manifests[manifest["name"]] = manifest
+
+    index = write_index(
+        (manifests[task["name"]] for task in tasks),
+        out_dir
+    )
+
+    errors = {
+        manifest["name"]: manifest["error"]
+        for manifest in manifests.values()
+        if manifest["error"] is not None
+    }
+    rendered = len(pending) - len(errors)
+    seconds = time.perf_counter() - start
+
+    print(
+        f"render: {rendered} games in {seconds:.2f} s "
+        f"({rendered / max(seconds, 1e-9):.1f} games/s), "
+        f"{len(tasks) - len(pending)} up to date, {len(errors)} failed",
+        file=sys.stderr
+    )
+
+    return ReportResult(
+        index=index,
+        rendered=rendered,
+        skipped=len(tasks) - len(pending),
+        errors=errors,
+        seconds=seconds
+    )
@@ -0,0 +1,212 @@
+""" Draws reproducible samples of game files and estimates Series summaries
+from a sample with error bounds.
+
+Files are sampled with a bottom-k reservoir: each file name gets a priority
+from a seeded hash and the size files with the smallest priorities are kept
+while the directory is scanned. The sample only depends on the seed and the
+file names, not on the order the directory is listed in.
+
+Intervals are normal approximations with a finite population correction for
+sampling without replacement from population_size files; the interval of
+the median is distribution-free (from order statistics) and not corrected.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import statistics
+from typing import Iterable, Sequence, Tuple
+
+from .aggregates import state_columns
+from .bootstrap import selection_matrices
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+def reservoir_sample(
+    names: Iterable[str],
+    size: int,
+    seed: int = 0
+) -> Tuple[Tuple[str, ...], int]:
+    """ Returns a sample of at most size names, in sorted order, and the
+    number of names scanned. Holds at most size names in memory.
+
+    Args:
+        names: Names to sample from, e.g. from a directory scan.
+        size: Number of names in the sample.
+        seed: Seed of the sample.
+    """
+    def priority(name: str) -> str:
+        """ Seeded pseudo-random priority of a name.
+        """
+        return hashlib.sha1(f"{seed}:{name}".encode()).hexdigest()
+
+    # Max-heap of the smallest priorities, by negating them as integers.
+    reservoir = []
+    population_size = 0
+
+    for name in names:
+        population_size += 1
+        item = (-int(priority(name), 16), name)
+
+        if len(reservoir) < size:
+            heapq.heappush(reservoir, item)
+
+        elif item > reservoir[0]:
+            heapq.heapreplace(reservoir, item)
+
+    return tuple(sorted(name for _, name in reservoir)), population_size
+
+
+def finite_population_correction(
+    n: int,
+    population_size: int = None
+) -> float:
+    """ Returns the factor scaling standard errors of a sample of n out of
+    population_size units drawn without replacement; 1 if the population
+    size is not known.
+    """
+    if population_size is None or population_size <= 1:
+        return 1.0
+
+    return np.sqrt(
+        np.clip(population_size - n, 0, None) / (population_size - 1)
+    )
+
+
+def z_score(confidence: float) -> float:
+    """ Returns the standard normal quantile of a two-sided interval.
+    """
+    return statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def median_interval(values: Sequence[float], z: float) -> Tuple[float, float]:
+    """ Returns the distribution-free interval of the median from the order
+    statistics at ranks n / 2 -+ z * sqrt(n) / 2.
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    n = len(values)
+    half_width = z * np.sqrt(n) / 2
+
+    low = int(np.clip(np.floor(n / 2 - half_width), 0, n - 1))
+    high = int(np.clip(np.ceil(n / 2 + half_width), 0, n - 1))
+
+    return values[low], values[high]
+
+
+def sample_round_summary_df(
+    state_df: pd.DataFrame,
+    n_games: int,
+    population_size: int = None,
+    confidence: float = 0.95,
+    columns: Sequence[str] = state_columns
+) -> pd.DataFrame:
+    """ Returns, by round, the number of turns and the mean and median of
+    each state column with {column}_mean_low/high and {column}_median_low/
+    high intervals.
+
+    Args:
+        state_df: State of each sampled game, as in Series.series_state_df.
+        n_games: Number of games sampled.
+        population_size: Number of games sampled from.
+        confidence: Confidence level of the intervals.
+        columns: State columns to summarize.
+    """
+    z = z_score(confidence)
+    correction = finite_population_correction(n_games, population_size)
+    grouped = state_df.groupby("round_number")
+
+    count = grouped.size()
+    means = grouped[list(columns)].mean()
+    errors = (
+        z
+        * grouped[list(columns)].std().fillna(0)
+        .div(np.sqrt(count), axis=0)
+        * correction
+    )
+    medians = grouped[list(columns)].median()
+
+    intervals = {
+        column: grouped[column].agg(
+            lambda values: median_interval(values, z)
+        )
+        for column in columns
+    }
+
+    return (
+        pd.DataFrame(
+            dict(
+                count=count,
+                **{
+                    f"{column}_{statistic}": values
+                    for column in columns
+                    for statistic, values in (
+                        ("mean", means[column]),
+                        ("mean_low", means[column] - errors[column]),
+                        ("mean_high", means[column] + errors[column]),
+                        ("median", medians[column]),
+                        ("median_low", intervals[column].str[0]),
+                        ("median_high", intervals[column].str[1])
+                    )
+                }
+            )
+        )
+        .rename_axis("round_number")
+        .reset_index()
+    )
+
+
+def sample_selection_rate_df(
+    actions_df: pd.DataFrame,
+    n_games: int = None,
+    population_size: int = None,
+    confidence: float = 0.95,
+    units_df: pd.DataFrame = None
+) -> pd.DataFrame:
+    """ Returns each selected card's selection rate (share of games in which
+    the card is selected) in the sample with a Wilson score interval, using
+    the effective sample size after the finite population correction.
+
+    Args:
+        actions_df: Actions of the sampled games, as in Series.actions_df.
+        n_games: Number of games sampled; defaults to the number of games
+            (viewed from each player) in the units.
+        population_size: Number of games sampled from.
+        confidence: Confidence level of the intervals.
+        units_df: Game and player of every game viewed from each player,
+            including games without actions; see
+            tta_analysis.bootstrap.selection_matrices.
+    """
+    cards, _, _, first_rounds = selection_matrices(actions_df, units_df)
+    n = first_rounds.shape[0]
+
+    z = z_score(confidence)
+    correction = finite_population_correction(
+        n if n_games is None else n_games,
+        population_size
+    )
+    n_effective = n / max(correction, 1e-12) ** 2
+
+    rate = (~np.isnan(first_rounds)).mean(axis=0)
+
+    center = (rate + z ** 2 / (2 * n_effective)) / (1 + z ** 2 / n_effective)
+    half_width = (
+        z
+        * np.sqrt(
+            rate * (1 - rate) / n_effective
+            + z ** 2 / (4 * n_effective ** 2)
+        )
+        / (1 + z ** 2 / n_effective)
+    )
+
+    return pd.DataFrame(
+        dict(
+            card=cards,
+            selection_rate=rate,
+            selection_rate_low=np.clip(center - half_width, 0, 1),
+            selection_rate_high=np.clip(center + half_width, 0, 1)
+        )
+    )
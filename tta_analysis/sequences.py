@@ -0,0 +1,248 @@
+""" Mines frequent card-selection sequences from the actions of each game.
+
+Cards are integer encoded and each n-gram of consecutive selections within a
+game is encoded as a single integer (its cards as base n_cards digits).
+Sequences are mined level by level with Apriori pruning: an n-gram is only
+counted if both its (n - 1)-gram prefix and suffix are frequent. Games are
+counted chunk_size at a time, so memory is bounded by the chunk and the
+number of distinct candidate sequences rather than by the corpus.
+
+Support is the number of games (viewed from each player) in which the
+sequence occurs at least once.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+def encode_actions(
+    actions_df: pd.DataFrame,
+    action: str = "select"
+) -> Tuple[np.ndarray, pd.Index, np.ndarray, np.ndarray]:
+    """ Returns the card names, the games (viewed from each player), and the
+    game index and card code of each action in game order.
+
+    Args:
+        actions_df: Actions, as in Series.actions_df.
+        action: Action to mine sequences of.
+    """
+    unit_columns = [
+        column
+        for column in ("game", "player")
+        if column in actions_df.columns
+    ]
+    df = actions_df[actions_df.action == action]
+
+    units, unit_keys = pd.MultiIndex.from_frame(df[unit_columns]).factorize()
+    unit_keys = unit_keys.set_names(unit_columns)
+
+    card_codes, cards = pd.factorize(df.card, sort=True)
+
+    # Stable, so that each game's actions stay in the order they were taken.
+    order = np.argsort(units, kind="stable")
+
+    return (
+        np.asarray(cards),
+        unit_keys,
+        units[order].astype(np.int64),
+        card_codes[order].astype(np.int64)
+    )
+
+
+def ngram_codes(
+    units: np.ndarray,
+    card_codes: np.ndarray,
+    n: int,
+    n_cards: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Returns the start position and code of every n-gram of consecutive
+    actions within a game.
+    """
+    if len(card_codes) < n:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    starts = np.flatnonzero(units[:len(units) - n + 1] == units[n - 1:])
+    codes = np.zeros(len(starts), dtype=np.int64)
+
+    for k in range(n):
+        codes = codes * n_cards + card_codes[starts + k]
+
+    return starts, codes
+
+
+def decode(code: int, n: int, n_cards: int) -> Tuple[int, ...]:
+    """ Returns the card codes of an encoded n-gram.
+    """
+    digits = []
+
+    for _ in range(n):
+        code, digit = divmod(code, n_cards)
+        digits.append(digit)
+
+    return tuple(digits[::-1])
+
+
+def mine_sequences(
+    actions_df: pd.DataFrame,
+    min_support: float = 0.05,
+    max_length: int = 4,
+    outcome: pd.Series = None,
+    action: str = "select",
+    chunk_size: int = 10000
+) -> pd.DataFrame:
+    """ Returns the frequent sequences of consecutive actions on cards, with
+    their length, support and share of games (support_rate). If an outcome
+    is provided, adds its mean over games with and without each sequence and
+    the difference.
+
+    Args:
+        actions_df: Actions, as in Series.actions_df.
+        min_support: Smallest share of games a frequent sequence occurs in.
+        max_length: Longest sequence mined.
+        outcome: Outcome of each game, indexed as the games in actions_df
+            (by game and player if actions_df has a player column).
+        action: Action to mine sequences of.
+        chunk_size: Number of games counted at once.
+
+    Raises:
+        ValueError: If max_length sequences cannot be encoded in 64 bits.
+    """
+    cards, unit_keys, units, card_codes = encode_actions(actions_df, action)
+    n_units, n_cards = len(unit_keys), max(len(cards), 1)
+
+    if n_cards ** max_length >= 2 ** 63:
+        raise ValueError(
+            f"Sequences of {max_length} of {n_cards} cards exceed 64 bits."
+        )
+
+    min_count = max(1, math.ceil(min_support * n_units))
+
+    values = (
+        np.zeros(n_units) if outcome is None else
+        outcome.reindex(unit_keys).values.astype(float)
+    )
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0)
+
+    unit_starts = np.flatnonzero(np.diff(units, prepend=-1))
+    chunk_bounds = np.append(unit_starts[::chunk_size], len(units))
+
+    levels = []
+    frequent = None
+
+    for n in range(1, max_length + 1):
+        # Distinct codes with their support, outcome sum and outcome count.
+        level_codes = np.zeros(0, dtype=np.int64)
+        level_stats = np.zeros((0, 3))
+
+        for start, end in zip(chunk_bounds[:-1], chunk_bounds[1:]):
+            chunk_units = units[start:end]
+            starts, codes = ngram_codes(
+                chunk_units,
+                card_codes[start:end],
+                n,
+                n_cards
+            )
+
+            if n > 1:
+                candidate = (
+                    np.isin(codes // n_cards, frequent)
+                    & np.isin(codes % n_cards ** (n - 1), frequent)
+                )
+                starts, codes = starts[candidate], codes[candidate]
+
+            # Count each sequence once per game.
+            pairs = np.unique(
+                np.column_stack((chunk_units[starts], codes)),
+                axis=0
+            )
+            pair_units = pairs[:, 0]
+
+            level_codes, inverse = np.unique(
+                np.concatenate((level_codes, pairs[:, 1])),
+                return_inverse=True
+            )
+            stats = np.vstack((
+                level_stats,
+                np.column_stack((
+                    np.ones(len(pairs)),
+                    values[pair_units],
+                    valid[pair_units]
+                ))
+            ))
+            level_stats = np.column_stack(tuple(
+                np.bincount(
+                    inverse.ravel(),
+                    weights=stats[:, i],
+                    minlength=len(level_codes)
+                )
+                for i in range(3)
+            ))
+
+        keep = level_stats[:, 0] >= min_count
+
+        if not keep.any():
+            break
+
+        frequent = level_codes[keep]
+        levels.extend(
+            (n, code, *stats)
+            for code, stats in zip(frequent, level_stats[keep])
+        )
+
+    total_value = values.sum()
+    total_valid = valid.sum()
+
+    df = pd.DataFrame(
+        (
+            dict(
+                sequence=tuple(
+                    cards[card]
+                    for card in decode(int(code), n, n_cards)
+                ),
+                length=n,
+                support=int(support),
+                support_rate=support / n_units,
+                **(
+                    {} if outcome is None else
+                    dict(
+                        outcome_with=(
+                            value_sum / value_count if value_count else
+                            np.nan
+                        ),
+                        outcome_without=(
+                            (total_value - value_sum)
+                            / (total_valid - value_count)
+                            if total_valid > value_count else
+                            np.nan
+                        )
+                    )
+                )
+            )
+            for n, code, support, value_sum, value_count in levels
+        ),
+        columns=(
+            ("sequence", "length", "support", "support_rate")
+            + (() if outcome is None else ("outcome_with", "outcome_without"))
+        )
+    )
+
+    if outcome is not None:
+        df = df.assign(
+            outcome_difference=lambda df: (
+                df.outcome_with - df.outcome_without
+            )
+        )
+
+    return (
+        df
+        .sort_values(["length", "support"], ascending=[True, False])
+        .reset_index(drop=True)
+    )
@@ -1,17 +1,50 @@
 """ Defines the Series class used to analyze batches of games.
 """
 
-import functools
+from __future__ import annotations
+
+import hashlib
+import json
 import os
-from typing import Dict, Tuple
+from typing import Any, Dict, Sequence, Tuple
 
 import arcbound as ab
 import attr
-import pandas as pd
-import plotnine
 
-from tta_analysis.cards import camelcase_card_dict
+from tta_analysis.aggregates import (
+    assign_card_dimensions,
+    PartialAggregate,
+    state_columns
+)
+from tta_analysis.bootstrap import bootstrap_selection_df
+from tta_analysis.cache import cached, evolve, invalidate, MemoryBudget
+from tta_analysis.consistency import check_state
+from tta_analysis.cube import SelectionCube
+from tta_analysis.features import trajectory_features
+from tta_analysis.filters import FilterResult, GameFilter
 from tta_analysis.game import Game
+from tta_analysis.lazy import lazy_import
+from tta_analysis.parallel import load_frames
+from tta_analysis.plan import evaluate
+from tta_analysis.records import deduplicate_records, DeduplicationResult
+from tta_analysis.release import __version__
+from tta_analysis.reports import render_reports, ReportResult
+from tta_analysis.sampling import (
+    reservoir_sample,
+    sample_round_summary_df,
+    sample_selection_rate_df
+)
+from tta_analysis.sequences import mine_sequences
+from tta_analysis.similarity import SimilarityIndex
+from tta_analysis.store import file_signature, GameStore
+from tta_analysis.tensor import export_tensor, TensorExport
+from tta_analysis.transitions import TransitionCounts
+
+pd = lazy_import("pandas")
+plotnine = lazy_import("plotnine")
+
+# Player value analyzing every player in each game.
+ALL_PLAYERS = "all"
 
 
 @ab.graph
@@ -22,22 +55,135 @@ class Series(object):
     Can either be instantiated with a tuple of explicitly defined paths to the
     game logs to be read or with a folder path, in which each .yaml file will
     be used to create a game.
+
+    Parsed game logs are cached in record_cache_dir if it is set. Setting
+    player to ALL_PLAYERS analyzes every player in each game from a single
+    parse of each game log; the frames identify the player in a player column.
+
+    If store_path is set, update_store writes the games to an indexed SQLite
+    database and query filters the stored turns and actions in SQL.
+
+    Trajectory feature tables are cached in feature_cache_dir if it is set,
+    keyed by the game files' sizes and modification times.
+
+    If deduplicate is set, game files with the same contents (ignoring line
+    endings, tabs in indentation and trailing whitespace) are collapsed into
+    the first copy; duplicate_files maps each collapsed file to the file
+    kept. The hash is the record cache's key, so a duplicate costs one hash
+    and no parse.
+
+    If max_memory is set, the parsed records, turns and frames cached by the
+    games are limited to max_memory bytes (as estimated in memory); the least
+    recently used games are spilled to spill_dir and reloaded when accessed
+    again. Otherwise the caches of the 128 most recently used games are kept.
+
+    evaluate computes several properties in one pass planned from the
+    arcbound graph, evaluating each node they depend on once.
+
+    from_folder(base_dir, sample_size=N) analyzes a reproducible sample of N
+    of the folder's files for quick exploration; population_size is then the
+    number of files sampled from, and sample_round_summary_df and
+    sample_selection_rate_df report estimates with error bounds.
+
+    If workers is set, series_state_df and actions_df are built in that
+    many worker processes, which return their results through shared memory;
+    see tta_analysis.parallel.
+
+    If game_filter is set (see filter), games not matching it are dropped
+    before they are parsed, each predicate at the cheapest stage that can
+    decide it; rejected_files maps each dropped file to that stage. See
+    tta_analysis.filters.
+
+    render_reports renders every game's state plots and an index.html
+    summary in a process pool, skipping games whose plots are up to date.
+
+    Setting an attribute drops only the cached nodes depending on it. Games
+    whose file is still in the series are reused when games is recomputed,
+    as new views sharing the nodes that do not depend on the change, so
+    changing player or game_files does not parse the logs again.
     """
     game_files: Tuple[str, ...]
     base_dir: str = "./"
     player: str = "yellow"
+    record_cache_dir: str = None
+    store_path: str = None
+    feature_cache_dir: str = None
+    deduplicate: bool = False
+    max_memory: int = None
+    spill_dir: str = None
+    population_size: int = None
+    workers: int = None
+    game_filter: GameFilter = None
+
+    def __setattr__(self, name: str, value) -> None:
+        """ Sets an attribute and drops the cached nodes depending on it.
+        Dropped games are kept until games is recomputed, to be reused.
+        """
+        object.__setattr__(self, name, value)
+        dropped = invalidate(self, name)
+
+        if "games" in dropped:
+            self.__dict__["_stale_games"] = dropped["games"]
+
+        return None
 
     @classmethod
-    def from_folder(cls, base_dir: str, **kwargs):
-        """ Sets game files to all files in the base directory provided.
+    def from_folder(
+        cls,
+        base_dir: str,
+        sample_size: int = None,
+        seed: int = 0,
+        **kwargs
+    ):
+        """ Sets game files to all files in the base directory provided, or
+        to a reservoir sample of sample_size files drawn during the scan; see
+        tta_analysis.sampling.reservoir_sample.
         """
-        game_files = tuple(
+        game_files = (
             f
             for f in os.listdir(base_dir)
             if os.path.isfile(os.path.join(base_dir, f))
             if os.path.splitext(f)[1] == ".yaml"
         )
 
+        if sample_size is None:
+            return cls(
+                game_files=tuple(game_files),
+                base_dir=base_dir,
+                **kwargs
+            )
+
+        sample, population_size = reservoir_sample(
+            game_files,
+            sample_size,
+            seed=seed
+        )
+
+        return cls(
+            game_files=sample,
+            base_dir=base_dir,
+            population_size=population_size,
+            **kwargs
+        )
+
+    @classmethod
+    def from_folders(cls, *base_dirs: str, **kwargs):
+        """ Sets game files to all files in the base directories provided,
+        relative to their common parent directory. Games are named by their
+        path relative to the parent, e.g. export_1/game_001.
+        """
+        base_dir = os.path.commonpath(
+            tuple(os.path.abspath(base_dir) for base_dir in base_dirs)
+        )
+
+        game_files = tuple(
+            os.path.relpath(os.path.join(folder, f), base_dir)
+            for folder in base_dirs
+            for f in sorted(os.listdir(folder))
+            if os.path.isfile(os.path.join(folder, f))
+            if os.path.splitext(f)[1] == ".yaml"
+        )
+
         return cls(game_files=game_files, base_dir=base_dir, **kwargs)
 
     ###########################################################################
@@ -45,25 +191,219 @@ class Series(object):
     ###########################################################################
 
     @property
-    @functools.lru_cache()
+    @cached
     @ab.auto_arcs()
-    def games(
+    def deduplication(
         self,
         game_files: Tuple[str, ...],
         base_dir: str,
-        player: str
+        deduplicate: bool
+    ) -> DeduplicationResult:
+        """ Game files kept and collapsed duplicates; see
+        tta_analysis.records.deduplicate_records.
+        """
+        if not deduplicate:
+            return DeduplicationResult(unique=game_files, duplicates={})
+
+        result = deduplicate_records(
+            os.path.join(base_dir, game_file) for game_file in game_files
+        )
+        paths = {
+            os.path.join(base_dir, game_file): game_file
+            for game_file in game_files
+        }
+
+        return DeduplicationResult(
+            unique=tuple(paths[path] for path in result.unique),
+            duplicates={
+                paths[duplicate]: paths[path]
+                for duplicate, path in result.duplicates.items()
+            }
+        )
+
+    @property
+    @ab.auto_arcs()
+    def unique_game_files(
+        self,
+        deduplication: DeduplicationResult
+    ) -> Tuple[str, ...]:
+        """ Game files analyzed, without collapsed duplicates.
+        """
+        return deduplication.unique
+
+    @property
+    @ab.auto_arcs()
+    def duplicate_files(
+        self,
+        deduplication: DeduplicationResult
+    ) -> Dict[str, str]:
+        """ Mapping of each collapsed duplicate to the game file kept.
+        """
+        return deduplication.duplicates
+
+    def filter(self, **predicates) -> Series:
+        """ Returns a copy of the series keeping only the games matching the
+        predicates, e.g. filter(min_age=3, selected=("Iron",)); see
+        tta_analysis.filters.GameFilter.
+        """
+        return attr.evolve(self, game_filter=GameFilter(**predicates))
+
+    @property
+    @cached
+    @ab.auto_arcs()
+    def filtering(
+        self,
+        unique_game_files: Tuple[str, ...],
+        base_dir: str,
+        player: str,
+        record_cache_dir: str,
+        memory_budget: MemoryBudget,
+        game_filter: GameFilter
+    ) -> FilterResult:
+        """ Game files matching the filter, the stage each rejected file
+        failed at and the games read to filter them; see
+        tta_analysis.filters.GameFilter.filter_files.
+        """
+        if game_filter is None:
+            return FilterResult(matched=unique_game_files, rejected={})
+
+        return game_filter.filter_files(
+            unique_game_files,
+            base_dir=base_dir,
+            player=player,
+            all_players=player == ALL_PLAYERS,
+            record_cache_dir=record_cache_dir,
+            memory_budget=memory_budget
+        )
+
+    @property
+    @ab.auto_arcs()
+    def filtered_game_files(self, filtering: FilterResult) -> Tuple[str, ...]:
+        """ Game files analyzed, without collapsed duplicates and games not
+        matching the filter.
+        """
+        return filtering.matched
+
+    @property
+    @ab.auto_arcs()
+    def rejected_files(self, filtering: FilterResult) -> Dict[str, str]:
+        """ Mapping of each game file dropped by the filter to the stage it
+        failed at.
+        """
+        return filtering.rejected
+
+    @property
+    @cached
+    @ab.auto_arcs()
+    def memory_budget(self, max_memory: int, spill_dir: str) -> MemoryBudget:
+        """ Memory budget shared by the games; None if max_memory is not set.
+        """
+        return (
+            None if max_memory is None else
+            MemoryBudget(max_memory=max_memory, spill_dir=spill_dir)
+        )
+
+    @property
+    @cached
+    @ab.auto_arcs()
+    def games(
+        self,
+        filtering: FilterResult,
+        filtered_game_files: Tuple[str, ...],
+        base_dir: str,
+        player: str,
+        record_cache_dir: str,
+        memory_budget: MemoryBudget
     ) -> Dict[str, Game]:
-        """ Mapping of games to file name.
+        """ Mapping of games to file name. Games dropped by a change to the
+        series are reused if their file is still in the series; a reused
+        game with other settings is replaced by a new view of it, so games
+        held by callers are never changed. Games read by the filter are
+        used as they are.
         """
+        settings = dict(
+            player=player,
+            record_cache_dir=record_cache_dir,
+            memory_budget=memory_budget
+        )
+
+        reused = {}
+
+        for game in self.__dict__.pop("_stale_games", {}).values():
+            if game.base_dir != base_dir:
+                continue
+
+            changes = {
+                name: value
+                for name, value in settings.items()
+                if getattr(game, name) != value
+            }
+
+            # The view keeps only the nodes not depending on the changes,
+            # e.g. the record but not the turns for another player.
+            reused[game.game_file] = (
+                evolve(game, **changes) if changes else game
+            )
+
         return {
-            os.path.splitext(game_file)[0]: Game(
-                game_file=game_file,
-                base_dir=base_dir,
-                player=player
+            os.path.splitext(game_file)[0]: (
+                reused[game_file] if game_file in reused else
+                filtering.games[game_file] if game_file in filtering.games else
+                Game(game_file=game_file, base_dir=base_dir, **settings)
             )
-            for game_file in game_files
+            for game_file in filtered_game_files
         }
 
+    @property
+    @cached
+    @ab.auto_arcs()
+    def player_games(
+        self,
+        games: Dict[str, Game],
+        player: str
+    ) -> Dict[Tuple[str, str], Game]:
+        """ Mapping of each game viewed from each analyzed player to the game
+        name and player color. Views of the same game share one parse.
+        """
+        return {
+            key: view
+            for name, game in games.items()
+            for key, view in self.game_views(name, game, player).items()
+        }
+
+    @ab.arcs(player="player")
+    def game_views(
+        self,
+        name: str,
+        game: Game,
+        player: str
+    ) -> Dict[Tuple[str, str], Game]:
+        """ Returns the views of a game from each analyzed player by game
+        name and player color, as in player_games. The game log is parsed
+        only when analyzing every player.
+
+        Arguments:
+            name: Name of the game.
+            game: Game, as in games.
+        """
+        return {
+            (name, color): view
+            for color, view in (
+                game.for_players().items() if player == ALL_PLAYERS else
+                ((player, game),)
+            )
+        }
+
+    def evaluate(self, *outputs: str) -> Dict[str, Any]:
+        """ Evaluates properties in a single pass planned from the graph,
+        computing each node they depend on once; see
+        tta_analysis.plan.evaluate. Returns the value of each output by name.
+
+        Arguments:
+            *outputs: Property names, e.g. "series_state_df", "actions_df".
+        """
+        return evaluate(self, *outputs)
+
     @ab.auto_arcs()
     def check_games(self, games: Dict[str, Game]) -> None:
         """ Checks that each game can be loaded properly. This functionality
@@ -77,32 +417,179 @@ class Series(object):
 
         return None
 
+    ###########################################################################
+    # Store games in SQLite and query them.
+    ###########################################################################
+
+    @property
+    @ab.auto_arcs()
+    def store(self, store_path: str) -> GameStore:
+        """ SQLite store of the games' turns and actions.
+        """
+        if store_path is None:
+            raise ValueError("store_path is required to use the game store.")
+
+        return GameStore(store_path)
+
+    @ab.auto_arcs()
+    def update_store(
+        self,
+        store: GameStore,
+        games: Dict[str, Game],
+        player: str
+    ) -> int:
+        """ Writes games that are new, changed or missing the analyzed player
+        to the store. Returns the number of games written.
+        """
+        return store.update(
+            games=games,
+            views={
+                name: None if player == ALL_PLAYERS else {player: game}
+                for name, game in games.items()
+            }
+        )
+
+    @ab.arcs(store="store", games="games", player="player")
+    def query(
+        self,
+        store: GameStore,
+        games: Dict[str, Game],
+        player: str,
+        table: str = "actions",
+        columns: Tuple[str, ...] = None,
+        distinct: bool = False,
+        **filters
+    ) -> pd.DataFrame:
+        """ Returns the stored rows of the series' games matching the filters.
+        The filters are evaluated in SQL, so only matching rows are loaded.
+
+        Arguments:
+            table: One of games, views, turns or actions.
+            columns: Columns to return; defaults to all columns.
+            distinct: Determines if duplicate rows are dropped.
+            filters: Column to value filters; see GameStore.query.
+
+        Example:
+            # Games where Monarchy was selected before round 6.
+            series.query(
+                columns=("game",),
+                distinct=True,
+                card="Monarchy",
+                action="select",
+                round_number=slice(None, 6)
+            )
+        """
+        table_columns = store.columns(table)
+        series_filters = {}
+
+        if "game" in table_columns:
+            series_filters["game"] = tuple(games)
+
+        else:
+            # views only reference their game by id.
+            series_filters["game_id"] = tuple(map(
+                int,
+                store.query(
+                    "games",
+                    columns=("game_id",),
+                    game=tuple(games)
+                ).game_id
+            ))
+
+        if player != ALL_PLAYERS and "player" in table_columns:
+            series_filters["player"] = player
+
+        return store.query(
+            table,
+            columns=columns,
+            distinct=distinct,
+            **{**series_filters, **filters}
+        )
+
     ###########################################################################
     # Aggregate data from games.
     ###########################################################################
 
+    @property
+    @cached
+    @ab.auto_arcs()
+    def parallel_frames(
+        self,
+        filtered_game_files: Tuple[str, ...],
+        base_dir: str,
+        player: str,
+        record_cache_dir: str,
+        workers: int
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """ State and actions frames built in worker processes; None if
+        workers is not set. See tta_analysis.parallel.load_frames.
+        """
+        if workers is None:
+            return None
+
+        return load_frames(
+            filtered_game_files,
+            base_dir=base_dir,
+            player=player,
+            all_players=player == ALL_PLAYERS,
+            record_cache_dir=record_cache_dir,
+            workers=workers
+        )
+
+    @property
+    @ab.auto_arcs()
+    def actions_df(
+        self,
+        parallel_frames: Tuple[pd.DataFrame, pd.DataFrame]
+    ) -> pd.DataFrame:
+        """ Dataframe of all actions taken across the series of games. Built
+        in worker processes if workers is set; the games are only parsed in
+        this process otherwise (see serial_actions_df).
+        """
+        if parallel_frames is not None:
+            return parallel_frames[1]
+
+        return self.serial_actions_df
+
     @property
     @ab.auto_arcs()
-    def actions_df(self, games: Dict[str, Game]) -> pd.DataFrame:
-        """ Dataframe of all actions taken across the series of games. 
+    def serial_actions_df(
+        self,
+        player_games: Dict[Tuple[str, str], Game]
+    ) -> pd.DataFrame:
+        """ Actions of every game, built from the games in this process.
         """
         return pd.DataFrame(
             (
                 dict(
                     game=name,
+                    player=color,
                     round_number=turn.round_number,
                     age=turn.age,
                     card=action.card,
                     ca=action.ca,
                     action=action.action
                 )
-                for name, game in games.items()
+                for (name, color), game in player_games.items()
                 for turn in game.turns
                 if turn.player_turn
                 for action in turn.actions
             )
         )
 
+    @property
+    @ab.auto_arcs()
+    def units_df(self, series_state_df: pd.DataFrame) -> pd.DataFrame:
+        """ Game and player of every game viewed from each analyzed player,
+        including games in which the player took no actions.
+        """
+        return (
+            series_state_df[["game_name", "player"]]
+            .drop_duplicates()
+            .rename(columns={"game_name": "game"})
+            .reset_index(drop=True)
+        )
+
     @property
     @ab.auto_arcs()
     def actions_grouped_df(self, actions_df: pd.DataFrame) -> pd.DataFrame:
@@ -117,29 +604,29 @@ class Series(object):
             .agg({"round_number": "size", "ca": "mean"})
             .reset_index()
             .rename({"round_number": "count"}, axis=1)
-            .assign(
-                age=lambda df: tuple(
-                    card_obj.age if card_obj is not None else 0
-                    for card in df.card
-                    for card_obj in (camelcase_card_dict.get(card),)
-                )
-            )
-            .assign(
-                color=lambda df: tuple(
-                    card_obj.color if card_obj is not None else 0
-                    for card in df.card
-                    for card_obj in (camelcase_card_dict.get(card),)
-                )
-            )
-            .assign(
-                line=lambda df: tuple(
-                    card_obj.line if card_obj is not None else 0
-                    for card in df.card
-                    for card_obj in (camelcase_card_dict.get(card),)
-                )
-            )
+            .pipe(assign_card_dimensions)
         )
 
+    @property
+    @cached
+    @ab.auto_arcs()
+    def selection_cube(self, actions_df: pd.DataFrame) -> SelectionCube:
+        """ Selection counts and CA sums by card, age, round and player with
+        the card's age, color and line attached. Groupings and slices are
+        answered from the cube with roll_up and slice instead of grouping
+        actions_df again; see tta_analysis.cube.
+        """
+        return SelectionCube.from_actions(actions_df)
+
+    @property
+    @ab.auto_arcs()
+    def transition_counts(self, actions_df: pd.DataFrame) -> TransitionCounts:
+        """ Sparse counts of transitions between consecutive card selections
+        by age and player, with transition_matrix and transition_df filtered
+        by age and player; see tta_analysis.transitions. Requires scipy.
+        """
+        return TransitionCounts.from_actions(actions_df)
+
     @property
     @ab.auto_arcs()
     def card_selection_df(
@@ -158,16 +645,317 @@ class Series(object):
             [["color", "line", "card", "age", "count", "ca"]]
         )
 
+    @ab.arcs(
+        actions_df="actions_df",
+        units_df="units_df",
+        card_selection_df="card_selection_df"
+    )
+    def card_selection_ci_df(
+        self,
+        actions_df: pd.DataFrame,
+        units_df: pd.DataFrame,
+        card_selection_df: pd.DataFrame,
+        n_boot: int = 1000,
+        confidence: float = 0.95,
+        seed: int = None
+    ) -> pd.DataFrame:
+        """ Adds bootstrap confidence intervals of the selection rate (share
+        of games in which the card is selected), mean CA and mean round of
+        first selection to card_selection_df. Games are the resampled unit.
+
+        Arguments:
+            n_boot: Number of bootstrap replicates.
+            confidence: Confidence level of the intervals.
+            seed: Seed of the random number generator.
+        """
+        intervals_df = bootstrap_selection_df(
+            actions_df,
+            n_boot=n_boot,
+            confidence=confidence,
+            seed=seed,
+            units_df=units_df
+        )
+
+        return card_selection_df.merge(
+            intervals_df.drop(columns="ca"),
+            on="card",
+            how="left"
+        )
+
+    @ab.arcs(
+        series_state_df="series_state_df",
+        games="games",
+        population_size="population_size"
+    )
+    def sample_round_summary_df(
+        self,
+        series_state_df: pd.DataFrame,
+        games: Dict[str, Game],
+        population_size: int,
+        confidence: float = 0.95
+    ) -> pd.DataFrame:
+        """ Number of turns and the mean and median of each state column by
+        round with confidence intervals, treating the series as a sample of
+        population_size games; see
+        tta_analysis.sampling.sample_round_summary_df.
+
+        Arguments:
+            confidence: Confidence level of the intervals.
+        """
+        return sample_round_summary_df(
+            series_state_df,
+            n_games=len(games),
+            population_size=population_size,
+            confidence=confidence
+        )
+
+    @ab.arcs(
+        actions_df="actions_df",
+        units_df="units_df",
+        games="games",
+        population_size="population_size"
+    )
+    def sample_selection_rate_df(
+        self,
+        actions_df: pd.DataFrame,
+        units_df: pd.DataFrame,
+        games: Dict[str, Game],
+        population_size: int,
+        confidence: float = 0.95
+    ) -> pd.DataFrame:
+        """ Selection rate of each card with a confidence interval, treating
+        the series as a sample of population_size games; see
+        tta_analysis.sampling.sample_selection_rate_df.
+
+        Arguments:
+            confidence: Confidence level of the intervals.
+        """
+        return sample_selection_rate_df(
+            actions_df,
+            n_games=len(games),
+            population_size=population_size,
+            confidence=confidence,
+            units_df=units_df
+        )
+
+    @ab.arcs(actions_df="actions_df", series_state_df="series_state_df")
+    def frequent_sequences_df(
+        self,
+        actions_df: pd.DataFrame,
+        series_state_df: pd.DataFrame,
+        min_support: float = 0.05,
+        max_length: int = 4,
+        outcome: str = "culture"
+    ) -> pd.DataFrame:
+        """ Frequent sequences of consecutive card selections, with the mean
+        of the outcome column in the player's last logged round over games
+        with and without each sequence; see
+        tta_analysis.sequences.mine_sequences.
+
+        Arguments:
+            min_support: Smallest share of games a sequence occurs in.
+            max_length: Longest sequence mined.
+            outcome: State column correlated with the sequences; None to
+                skip the outcome columns.
+        """
+        final_states = (
+            None if outcome is None else
+            series_state_df
+            .sort_values("round_number")
+            .groupby(["game_name", "player"])
+            [outcome]
+            .last()
+            .rename_axis(["game", "player"])
+        )
+
+        return mine_sequences(
+            actions_df,
+            min_support=min_support,
+            max_length=max_length,
+            outcome=final_states
+        )
+
+    def similarity_index(self, **kwargs) -> SimilarityIndex:
+        """ Returns a similar-game search index of every game in the series,
+        viewed from each analyzed player; see
+        tta_analysis.similarity.SimilarityIndex.
+
+        Arguments:
+            **kwargs: Parameters of the index, e.g. num_perm and bands.
+        """
+        index = SimilarityIndex(**kwargs)
+        index.update(self)
+
+        return index
+
     @property
     @ab.auto_arcs()
-    def series_state_df(self, games: Dict[str, Game]) -> pd.DataFrame:
+    def series_state_df(
+        self,
+        parallel_frames: Tuple[pd.DataFrame, pd.DataFrame]
+    ) -> pd.DataFrame:
+        """ State of every game by turn. Built in worker processes if workers
+        is set; the games are only parsed in this process otherwise (see
+        serial_state_df).
         """
+        if parallel_frames is not None:
+            return parallel_frames[0]
+
+        return self.serial_state_df
+
+    @property
+    @ab.auto_arcs()
+    def serial_state_df(
+        self,
+        games: Dict[str, Game],
+        player_games: Dict[Tuple[str, str], Game]
+    ) -> pd.DataFrame:
+        """ State of every game by turn, built from the games in this
+        process.
         """
+        game_ids = {name: i for i, name in enumerate(games)}
+
         return pd.concat(
             game.state_df
             .assign(game_name=name)
-            .assign(game_id=i)
-            for i, (name, game) in enumerate(games.items())
+            .assign(game_id=game_ids[name])
+            .assign(player=color)
+            for (name, color), game in player_games.items()
+        )
+
+    @property
+    @ab.auto_arcs()
+    def partial_aggregate(
+        self,
+        actions_df: pd.DataFrame,
+        series_state_df: pd.DataFrame
+    ) -> PartialAggregate:
+        """ Mergeable partial aggregate of the series; partials of separate
+        series can be merged into the aggregate of all of their games.
+        """
+        return PartialAggregate.from_frames(actions_df, series_state_df)
+
+    @property
+    @ab.auto_arcs()
+    def round_summary_df(
+        self,
+        partial_aggregate: PartialAggregate
+    ) -> pd.DataFrame:
+        """ Number of turns and the mean, minimum and maximum of each state
+        column by round across the series of games.
+        """
+        return partial_aggregate.round_summary_df()
+
+    @ab.arcs(
+        games="games",
+        player="player",
+        feature_cache_dir="feature_cache_dir"
+    )
+    def trajectory_features_df(
+        self,
+        games: Dict[str, Game],
+        player: str,
+        feature_cache_dir: str,
+        window: int = 3,
+        thresholds: Dict[str, Sequence[int]] = None
+    ) -> pd.DataFrame:
+        """ Adds per-round deltas, growth rates, rolling means and the first
+        round each threshold was reached to series_state_df; see
+        tta_analysis.features.trajectory_features.
+
+        If the feature cache is set, the table is read from the cache when
+        no game file changed, without parsing any game.
+
+        Arguments:
+            window: Number of rounds in the rolling mean.
+            thresholds: Values to find the first round reaching, by column,
+                e.g. dict(culture=(10, 50)).
+        """
+        def compute() -> pd.DataFrame:
+            """ Derives the features from the state of every game.
+            """
+            return trajectory_features(
+                self.series_state_df,
+                window=window,
+                thresholds=thresholds
+            )
+
+        if feature_cache_dir is None:
+            features_df = compute()
+
+        else:
+            key = hashlib.sha1(
+                json.dumps(
+                    dict(
+                        games=sorted(
+                            (
+                                name,
+                                file_signature(
+                                    os.path.join(game.base_dir, game.game_file)
+                                )
+                            )
+                            for name, game in games.items()
+                        ),
+                        player=player,
+                        window=window,
+                        thresholds=thresholds,
+                        version=__version__
+                    ),
+                    sort_keys=True
+                ).encode()
+            ).hexdigest()
+
+            path = os.path.join(feature_cache_dir, f"{key}.pickle")
+
+            if os.path.exists(path):
+                features_df = pd.read_pickle(path)
+
+            else:
+                features_df = compute()
+
+                os.makedirs(feature_cache_dir, exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                features_df.to_pickle(temp_path)
+                os.replace(temp_path, path)
+
+        return features_df
+
+    @property
+    @cached
+    @ab.auto_arcs()
+    def features_df(self, trajectory_features_df) -> pd.DataFrame:
+        """ Trajectory features with the default window and no thresholds.
+        """
+        return trajectory_features_df()
+
+    @ab.arcs(player_games="player_games")
+    def to_tensor(
+        self,
+        path: str,
+        player_games: Dict[Tuple[str, str], Game],
+        features: Sequence[str] = state_columns,
+        dtype: str = "float32",
+        fill_value: float = 0.0
+    ) -> TensorExport:
+        """ Writes the state of every game to a memory-mapped (games x rounds
+        x features) .npy file padded to the longest game, with a boolean mask
+        of played rounds (PATH_mask.npy) and a JSON index of the games,
+        rounds and features (PATH_index.json); see
+        tta_analysis.tensor.export_tensor. Games are written one at a time,
+        so series_state_df is never built.
+
+        Arguments:
+            path: Path of the tensor's .npy file.
+            features: State columns to export.
+            dtype: Data type of the tensor.
+            fill_value: Value of padded rounds.
+        """
+        return export_tensor(
+            path,
+            player_games,
+            features=features,
+            dtype=dtype,
+            fill_value=fill_value
         )
 
     @ab.arcs(series_state_df="series_state_df")
@@ -193,3 +981,73 @@ class Series(object):
             + plotnine.theme_light()
             + plotnine.scale_x_continuous(breaks=range(1, 20, 1))
         )
+
+    @ab.arcs(
+        filtered_game_files="filtered_game_files",
+        base_dir="base_dir",
+        player="player",
+        record_cache_dir="record_cache_dir"
+    )
+    def render_reports(
+        self,
+        out_dir: str,
+        filtered_game_files: Tuple[str, ...],
+        base_dir: str,
+        player: str,
+        record_cache_dir: str,
+        workers: int = None,
+        render_cache_dir: str = None,
+        file_format: str = "png"
+    ) -> ReportResult:
+        """ Renders the income, strength and population plots of every game
+        and an index.html summary to out_dir in a process pool, skipping
+        games whose plots are up to date with their logs, and prints the
+        render throughput; see tta_analysis.reports.render_reports.
+
+        Arguments:
+            out_dir: Folder the reports are written to.
+            filtered_game_files: Game log files analyzed.
+            base_dir: Directory containing the game logs.
+            player: Player color analyzed.
+            record_cache_dir: Directory of the record cache.
+            workers: Number of processes; defaults to the number of CPUs.
+            render_cache_dir: Directory of the render cache.
+            file_format: Format of the rendered plots (e.g. png or svg).
+        """
+        return render_reports(
+            filtered_game_files,
+            out_dir,
+            base_dir=base_dir,
+            player=player,
+            all_players=player == ALL_PLAYERS,
+            record_cache_dir=record_cache_dir,
+            render_cache_dir=render_cache_dir,
+            workers=workers,
+            file_format=file_format
+        )
+
+    @ab.arcs(series_state_df="series_state_df")
+    def income_consistency_df(
+        self,
+        tableau_df: pd.DataFrame,
+        series_state_df: pd.DataFrame,
+        baseline: Dict[str, int] = None,
+        tolerance: int = 0
+    ) -> pd.DataFrame:
+        """ Checks the logged income and strength of every turn in the series
+        against the values expected from the cards in each tableau. Returns a
+        row per turn with the differences and a mismatch flag.
+
+        Arguments:
+            tableau_df: Reconstructed tableaux with game, player, round_number,
+                card and count columns; count is the number of workers or
+                copies on the card at the end of the turn.
+            baseline: Income and strength not provided by cards.
+            tolerance: Largest absolute difference not flagged as a mismatch.
+        """
+        return check_state(
+            state_df=series_state_df.rename(columns=dict(game_name="game")),
+            tableau_df=tableau_df,
+            baseline=baseline,
+            tolerance=tolerance
+        )
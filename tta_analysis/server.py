@@ -0,0 +1,369 @@
+""" Local HTTP/JSON service over a folder of game logs.
+
+The server keeps a Series of the folder loaded and precomputes its aggregate
+tables when the folder is ingested, so requests only send stored JSON.
+Rebuilds run in a background thread and never block requests. The
+corpus is fingerprinted by the file signature (size and modification time)
+of every game log; the fingerprint is checked at most once per interval and
+the series is rebuilt only when it changes. Unchanged logs are read from the
+record cache on a rebuild.
+
+Logs that fail to parse are left out of the tables and listed, with their
+errors, in the index until they are fixed or removed.
+
+Responses carry an ETag derived from the fingerprint and the table, and
+requests with a matching If-None-Match header get 304 Not Modified.
+
+Endpoints:
+    /: Fingerprint, number of games, available tables, the logs left out
+        and the error of the last rebuild, if it failed.
+    /<table>: Records of an aggregate table, e.g. /card_selection_df.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+import attr
+
+from .records import ingest_records
+from .series import Series
+from .store import file_signature
+
+tables = ("card_selection_df", "actions_grouped_df", "round_summary_df")
+
+
+def corpus_fingerprint(base_dir: str) -> str:
+    """ Returns a fingerprint of the game logs in a folder that changes when
+    a log is added, removed or modified.
+
+    Args:
+        base_dir: Folder containing .yaml game logs.
+    """
+    digest = hashlib.sha1()
+
+    for f in sorted(os.listdir(base_dir)):
+        path = os.path.join(base_dir, f)
+
+        if os.path.isfile(path) and os.path.splitext(f)[1] == ".yaml":
+            digest.update(f"{f}\0{file_signature(path)}\n".encode())
+
+    return digest.hexdigest()
+
+
+@attr.s(auto_attribs=True)
+class AnalysisServer(object):
+    """ Series of a folder of game logs with precomputed aggregate tables,
+    served over HTTP.
+
+    Tables are rebuilt in a background thread and swapped in once complete,
+    so requests never wait for a rebuild and keep getting the last good
+    tables (and ETags) meanwhile. A rebuild that fails, e.g. on a log that
+    does not parse, is logged and not retried until the corpus changes
+    again; until a first rebuild succeeds, requests get 503. Logs that fail
+    to parse are left out of the rebuild rather than failing it.
+
+    Input parameters:
+        base_dir: Folder containing .yaml game logs.
+        player: Player color analyzed.
+        record_cache_dir: Directory of the record cache.
+        workers: Number of parsing processes on ingest.
+        deduplicate: Collapses game logs with the same contents if set.
+        interval: Smallest number of seconds between corpus checks.
+
+    Properties:
+        series: Series of the folder as of the last good rebuild.
+        fingerprint: Fingerprint of the corpus the tables were computed on.
+        payloads: JSON body of each table.
+        index: Fingerprint, games, tables and logs left out of the tables.
+        error: Error of the last failed rebuild, if it was not followed by a
+            good one.
+
+    Methods:
+        refresh: Starts a rebuild if the corpus changed.
+        failed_logs: Game logs of a series that fail to parse.
+        rebuild: Recomputes the series and tables of a corpus.
+        etag: ETag of a table.
+        create_handler: Request handler class bound to the server.
+        serve: Serves the tables until interrupted.
+    """
+    base_dir: str
+    player: str = "yellow"
+    record_cache_dir: str = None
+    workers: int = None
+    deduplicate: bool = False
+    interval: float = 2.0
+    series: Series = attr.ib(default=None, init=False, repr=False)
+    fingerprint: str = attr.ib(default=None, init=False)
+    payloads: Dict[str, bytes] = attr.ib(factory=dict, init=False, repr=False)
+    index: Dict[str, Any] = attr.ib(factory=dict, init=False, repr=False)
+    error: str = attr.ib(default=None, init=False)
+    checked: float = attr.ib(default=None, init=False, repr=False)
+    pending: str = attr.ib(default=None, init=False, repr=False)
+    lock: threading.Lock = attr.ib(
+        factory=threading.Lock,
+        init=False,
+        repr=False
+    )
+
+    def refresh(self, force: bool = False, wait: bool = False) -> bool:
+        """ Checks the corpus fingerprint, at most once per interval unless
+        forced, and starts rebuilding the tables in a background thread if
+        the corpus changed since the last rebuild, good or failed. Returns
+        whether a rebuild was started.
+
+        Arguments:
+            force: Checks the fingerprint even within the interval.
+            wait: Rebuilds in the calling thread instead.
+        """
+        with self.lock:
+            now = time.monotonic()
+
+            if (
+                not force
+                and self.checked is not None
+                and now - self.checked < self.interval
+            ):
+                return False
+
+            self.checked = now
+
+        fingerprint = corpus_fingerprint(self.base_dir)
+
+        with self.lock:
+            if fingerprint in (self.fingerprint, self.pending):
+                return False
+
+            self.pending = fingerprint
+
+        if wait:
+            self.rebuild(fingerprint)
+
+        else:
+            threading.Thread(
+                target=self.rebuild,
+                args=(fingerprint,),
+                daemon=True
+            ).start()
+
+        return True
+
+    def failed_logs(self, series: Series) -> Dict[str, str]:
+        """ Parses the series' game logs, into the record cache if there is
+        one, in a process pool. Returns the error of each game file that
+        failed to parse.
+
+        Arguments:
+            series: Series of the corpus.
+        """
+        game_files = series.unique_game_files
+        results = ingest_records(
+            (
+                os.path.join(series.base_dir, game_file)
+                for game_file in game_files
+            ),
+            cache_dir=series.record_cache_dir,
+            workers=self.workers
+        )
+
+        return {
+            game_file: result.error
+            for game_file, result in zip(game_files, results)
+            if result.error is not None
+        }
+
+    def rebuild(self, fingerprint: str) -> None:
+        """ Recomputes the series and tables of the corpus and swaps them in,
+        leaving out the logs that fail to parse. Errors are logged and the
+        previous tables are kept.
+
+        Arguments:
+            fingerprint: Fingerprint of the corpus being rebuilt.
+        """
+        start = time.perf_counter()
+
+        try:
+            series = Series.from_folder(
+                self.base_dir,
+                player=self.player,
+                record_cache_dir=self.record_cache_dir,
+                deduplicate=self.deduplicate
+            )
+            failed = self.failed_logs(series)
+
+            for game_file, error in failed.items():
+                print(f"{game_file}: left out, {error}", file=sys.stderr)
+
+            if failed:
+                series = attr.evolve(
+                    series,
+                    game_files=tuple(
+                        game_file
+                        for game_file in series.game_files
+                        if game_file not in failed
+                    )
+                )
+
+            payloads = {
+                name: table.to_json(orient="records").encode()
+                for name, table in series.evaluate(*tables).items()
+            }
+            index = dict(
+                fingerprint=fingerprint,
+                games=len(series.unique_game_files),
+                tables=tables,
+                failed=failed
+            )
+
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(
+                f"rebuild failed, keeping the last tables: {error}",
+                file=sys.stderr
+            )
+
+            with self.lock:
+                if fingerprint == self.pending:
+                    self.error = error
+
+            return None
+
+        with self.lock:
+            # A rebuild of a newer corpus was started meanwhile.
+            if fingerprint != self.pending:
+                return None
+
+            self.series = series
+            self.payloads = payloads
+            self.index = index
+            self.fingerprint = fingerprint
+            self.error = None
+
+        print(
+            f"computed {len(tables)} tables over "
+            f"{len(series.unique_game_files)} games in "
+            f"{time.perf_counter() - start:.2f} s",
+            file=sys.stderr
+        )
+
+        return None
+
+    def etag(self, fingerprint: str, name: str, error: str = None) -> str:
+        """ Returns the ETag of a table of a corpus; that of the index also
+        changes with the rebuild error.
+        """
+        tag = f"{fingerprint}-{name or 'index'}"
+
+        if not name and error is not None:
+            tag += f"-{hashlib.sha1(error.encode()).hexdigest()[:12]}"
+
+        return f'"{tag}"'
+
+    def response(self, name: str) -> Tuple[int, str, bytes]:
+        """ Returns the status, ETag and body of a table or, for "", of the
+        index: 404 if there is no such table and 503 if no tables have been
+        computed yet.
+        """
+        self.refresh()
+
+        with self.lock:
+            fingerprint, payloads, index, error = (
+                self.fingerprint,
+                self.payloads,
+                self.index,
+                self.error
+            )
+
+        if not payloads:
+            return 503, None, json.dumps(
+                dict(error=error or "The tables are being computed.")
+            ).encode()
+
+        if not name:
+            return 200, self.etag(fingerprint, name, error), json.dumps(
+                dict(index, error=error)
+            ).encode()
+
+        if name not in payloads:
+            return 404, None, json.dumps(
+                dict(error=f"Unknown table: {name}.")
+            ).encode()
+
+        return 200, self.etag(fingerprint, name), payloads[name]
+
+    def create_handler(self) -> type:
+        """ Returns a request handler class serving the tables.
+        """
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            """ Serves the tables as JSON with ETag revalidation.
+            """
+
+            def do_GET(self) -> None:
+                """ Sends a table, 304 if the client's copy is current, or
+                a JSON error.
+                """
+                name = self.path.split("?")[0].strip("/")
+                status, etag, body = server.response(name)
+                matches = self.headers.get("If-None-Match", "")
+
+                if etag is not None and etag in (
+                    tag.strip() for tag in matches.split(",")
+                ):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+
+                    return None
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", "no-cache")
+
+                self.end_headers()
+                self.wfile.write(body)
+
+                return None
+
+            def log_message(self, format: str, *args) -> None:
+                """ Logs requests to stderr without the client address.
+                """
+                print(format % args, file=sys.stderr)
+
+                return None
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        """ Computes the tables and serves them until interrupted.
+        """
+        self.refresh(force=True, wait=True)
+
+        httpd = http.server.ThreadingHTTPServer(
+            (host, port),
+            self.create_handler()
+        )
+        print(f"Serving on http://{host}:{port}/", file=sys.stderr)
+
+        try:
+            httpd.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            httpd.server_close()
+
+        return None
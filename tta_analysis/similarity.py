@@ -0,0 +1,438 @@
+""" Index of games for similar-game search.
+
+Each game (viewed from a player) is indexed by a MinHash signature of the
+shingles (consecutive n-grams) of its card selections and a compact vector
+of its state trajectory. Signatures are split into bands and hashed into
+buckets (locality-sensitive hashing), so a query only scores the games that
+share a bucket with it instead of every game in the archive. Candidates are
+ranked by a weighted sum of the estimated Jaccard similarity of their
+selections and the cosine similarity of their trajectories.
+
+The index is saved to a single .npz file and can be updated with the games
+of a Series. The file signature (size and modification time) of each indexed
+game log is kept, so an update only reads the logs that are new or changed
+since they were indexed, and drops the games no longer in the series.
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import os
+import zlib
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, TYPE_CHECKING
+
+import attr
+
+from .lazy import lazy_import
+from .store import file_signature
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+if TYPE_CHECKING:
+    from .game import Game
+    from .series import Series
+
+# Mersenne prime modulus of the MinHash permutations.
+prime = (1 << 31) - 1
+
+trajectory_columns = ("food", "rock", "science", "culture", "strength")
+
+KeyType = Tuple[str, str]
+
+
+def shingles(cards: Sequence[str], size: int = 2) -> Set[str]:
+    """ Returns the n-grams of consecutive cards; the cards themselves if
+    there are fewer than size cards.
+
+    Args:
+        cards: Selected cards, in order.
+        size: Number of cards in each shingle.
+    """
+    return {
+        " > ".join(cards[i:i + size])
+        for i in range(max(len(cards) - size + 1, 0))
+    } or set(cards)
+
+
+def trajectory_vector(
+    state_df: pd.DataFrame,
+    n_rounds: int = 12,
+    columns: Sequence[str] = trajectory_columns
+) -> np.ndarray:
+    """ Returns the unit-length vector of the log-scaled state columns in
+    the first n_rounds rounds. Rounds after the last logged round repeat its
+    values.
+
+    Args:
+        state_df: State of the game by round, as in Game.state_df.
+        n_rounds: Number of rounds in the vector.
+        columns: State columns in the vector.
+    """
+    if not len(state_df):
+        return np.zeros(n_rounds * len(columns), dtype=np.float32)
+
+    values = (
+        state_df
+        .drop_duplicates("round_number", keep="last")
+        .set_index("round_number")
+        [list(columns)]
+        .reindex(range(1, n_rounds + 1))
+        .ffill()
+        .bfill()
+        .values
+        .astype(float)
+    )
+
+    vector = np.log1p(np.clip(values, 0, None)).ravel()
+    norm = np.linalg.norm(vector)
+
+    return (vector / norm if norm else vector).astype(np.float32)
+
+
+@attr.s(auto_attribs=True)
+class SimilarityIndex(object):
+    """ MinHash/LSH index of card-selection sequences with trajectory
+    vectors.
+
+    Input parameters:
+        num_perm: Number of MinHash permutations.
+        bands: Number of LSH bands; must divide num_perm. More bands find
+            less similar candidates at the cost of more candidates.
+        shingle_size: Number of consecutive cards in each shingle.
+        n_rounds: Number of rounds in the trajectory vectors.
+        seed: Seed of the MinHash permutations.
+
+    Properties:
+        file_signatures: File signature of each indexed game's log when it
+            was indexed, by game name.
+
+    Methods:
+        signature: MinHash signature of a sequence of cards.
+        add: Adds games to the index.
+        replace: Re-indexes an indexed game.
+        remove: Drops games from the index.
+        update: Indexes the games of a series that are new or changed and
+            drops those no longer in it.
+        query: Returns the most similar games to a game.
+        save: Writes the index to a .npz file.
+        load: Reads an index written by save.
+    """
+    num_perm: int = 64
+    bands: int = 16
+    shingle_size: int = 2
+    n_rounds: int = 12
+    seed: int = 0
+    keys: List[KeyType] = attr.ib(factory=list, repr=False)
+    signatures: np.ndarray = attr.ib(default=None, repr=False)
+    vectors: np.ndarray = attr.ib(default=None, repr=False)
+    buckets: Dict[Tuple[int, int], List[int]] = attr.ib(
+        factory=lambda: collections.defaultdict(list),
+        repr=False
+    )
+    file_signatures: Dict[str, str] = attr.ib(factory=dict, repr=False)
+    rows: Dict[KeyType, int] = attr.ib(init=False, repr=False)
+    a: np.ndarray = attr.ib(init=False, repr=False)
+    b: np.ndarray = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self) -> None:
+        """ Checks the bands, creates the MinHash permutations and maps each
+        key to its row.
+        """
+        if self.num_perm % self.bands:
+            raise ValueError("bands must divide num_perm.")
+
+        self.rows = {tuple(key): i for i, key in enumerate(self.keys)}
+
+        rng = np.random.default_rng(self.seed)
+        self.a = rng.integers(1, prime, self.num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, prime, self.num_perm, dtype=np.uint64)
+
+        return None
+
+    def signature(self, cards: Sequence[str]) -> np.ndarray:
+        """ Returns the MinHash signature of a sequence of selected cards.
+        """
+        hashes = np.array(
+            tuple(
+                zlib.crc32(shingle.encode()) & prime
+                for shingle in shingles(cards, self.shingle_size)
+            ) or (prime,),
+            dtype=np.uint64
+        )
+
+        return (
+            (hashes[:, None] * self.a + self.b) % np.uint64(prime)
+        ).min(axis=0)
+
+    def band_keys(self, signature: np.ndarray) -> Tuple[Tuple[int, int], ...]:
+        """ Returns the bucket of each band of a signature.
+        """
+        return tuple(
+            (band, zlib.crc32(rows.tobytes()))
+            for band, rows in enumerate(
+                signature.reshape(self.bands, -1)
+            )
+        )
+
+    def add(
+        self,
+        keys: Sequence[KeyType],
+        signatures: np.ndarray,
+        vectors: np.ndarray
+    ) -> None:
+        """ Adds games to the index.
+
+        Args:
+            keys: Game name and player of each game.
+            signatures: Games by num_perm matrix of MinHash signatures.
+            vectors: Games by features matrix of trajectory vectors.
+        """
+        start = len(self.keys)
+
+        for i, signature in enumerate(signatures, start):
+            for band_key in self.band_keys(signature):
+                self.buckets[band_key].append(i)
+
+        self.keys.extend(tuple(key) for key in keys)
+        self.rows.update(
+            (tuple(key), i) for i, key in enumerate(keys, start)
+        )
+        self.signatures = (
+            signatures if self.signatures is None else
+            np.vstack((self.signatures, signatures))
+        )
+        self.vectors = (
+            vectors if self.vectors is None else
+            np.vstack((self.vectors, vectors))
+        )
+
+        return None
+
+    def replace(
+        self,
+        key: KeyType,
+        signature: np.ndarray,
+        vector: np.ndarray
+    ) -> None:
+        """ Replaces the signature and trajectory vector of an indexed game,
+        moving it to the buckets of its new signature.
+
+        Args:
+            key: Game name and player of the game.
+            signature: MinHash signature of the game.
+            vector: Trajectory vector of the game.
+        """
+        i = self.rows[tuple(key)]
+
+        for band_key in self.band_keys(self.signatures[i]):
+            self.buckets[band_key].remove(i)
+
+        for band_key in self.band_keys(signature):
+            self.buckets[band_key].append(i)
+
+        self.signatures[i] = signature
+        self.vectors[i] = vector
+
+        return None
+
+    def remove(self, keys: Iterable[KeyType]) -> None:
+        """ Drops games from the index; the remaining rows are renumbered.
+
+        Args:
+            keys: Game name and player of each game to drop.
+        """
+        dropped = {tuple(key) for key in keys}
+
+        if not dropped & set(self.rows):
+            return None
+
+        kept = [i for i, key in enumerate(self.keys) if key not in dropped]
+        keys, signatures, vectors = (
+            [self.keys[i] for i in kept],
+            self.signatures[kept],
+            self.vectors[kept]
+        )
+
+        self.keys = []
+        self.rows = {}
+        self.signatures = None
+        self.vectors = None
+        self.buckets = collections.defaultdict(list)
+        self.add(keys, signatures, vectors)
+
+        return None
+
+    def describe(self, game: Game) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the signature and trajectory vector of a game.
+        """
+        cards = tuple(
+            action.card
+            for turn in game.turns
+            if turn.player_turn
+            for action in turn.actions
+            if action.action == "select"
+        )
+
+        return (
+            self.signature(cards),
+            trajectory_vector(game.state_df, self.n_rounds)
+        )
+
+    def update(self, series: Series) -> int:
+        """ Adds the games of a series that are not indexed yet, re-indexes
+        those whose log changed since it was indexed and drops those no
+        longer in the series, one game at a time. Unchanged logs are not
+        read. Returns the number of games added or re-indexed.
+        """
+        indexed = collections.defaultdict(list)
+
+        for key in self.keys:
+            indexed[key[0]].append(key)
+
+        current: Set[KeyType] = set()
+        new = []
+        changed = 0
+
+        for name, game in series.games.items():
+            log_signature = file_signature(
+                os.path.join(game.base_dir, game.game_file)
+            )
+
+            if indexed[name] and (
+                self.file_signatures.get(name) == log_signature
+            ):
+                current.update(indexed[name])
+                continue
+
+            for key, view in series.game_views(name, game).items():
+                signature, vector = self.describe(view)
+                current.add(key)
+
+                if key in self.rows:
+                    self.replace(key, signature, vector)
+                    changed += 1
+
+                else:
+                    new.append((key, (signature, vector)))
+
+            self.file_signatures[name] = log_signature
+
+        self.remove(key for key in self.keys if key not in current)
+        self.file_signatures = {
+            name: log_signature
+            for name, log_signature in self.file_signatures.items()
+            if name in series.games
+        }
+
+        if new:
+            self.add(
+                tuple(key for key, _ in new),
+                np.vstack(tuple(signature for _, (signature, _) in new)),
+                np.vstack(tuple(vector for _, (_, vector) in new))
+            )
+
+        return len(new) + changed
+
+    def query(
+        self,
+        key: KeyType = None,
+        game: Game = None,
+        k: int = 10,
+        weight: float = 0.5
+    ) -> pd.DataFrame:
+        """ Returns up to k games most similar to an indexed game or to a
+        game object, among the games sharing an LSH bucket with it. The
+        query game itself is left out.
+
+        Arguments:
+            key: Game name and player of an indexed game.
+            game: Game to search for, if key is not set.
+            k: Number of games to return.
+            weight: Weight of the selection similarity; the trajectory
+                similarity has weight 1 - weight.
+        """
+        if key is not None:
+            i = self.rows[tuple(key)]
+            signature, vector = self.signatures[i], self.vectors[i]
+
+        else:
+            signature, vector = self.describe(game)
+
+        candidates = np.array(
+            sorted(
+                {
+                    j
+                    for band_key in self.band_keys(signature)
+                    for j in self.buckets.get(band_key, ())
+                    if key is None or self.keys[j] != tuple(key)
+                }
+            ),
+            dtype=int
+        )
+
+        jaccard = (self.signatures[candidates] == signature).mean(axis=1)
+        cosine = self.vectors[candidates] @ vector
+        score = weight * jaccard + (1 - weight) * cosine
+
+        top = np.argsort(-score, kind="stable")[:k]
+
+        return pd.DataFrame(
+            dict(
+                game=[self.keys[j][0] for j in candidates[top]],
+                player=[self.keys[j][1] for j in candidates[top]],
+                score=score[top],
+                selection_similarity=jaccard[top],
+                trajectory_similarity=cosine[top]
+            )
+        )
+
+    def save(self, path: str) -> None:
+        """ Writes the index to a .npz file.
+        """
+        np.savez(
+            path,
+            params=json.dumps(
+                dict(
+                    num_perm=self.num_perm,
+                    bands=self.bands,
+                    shingle_size=self.shingle_size,
+                    n_rounds=self.n_rounds,
+                    seed=self.seed
+                )
+            ),
+            keys=json.dumps(self.keys),
+            file_signatures=json.dumps(self.file_signatures),
+            signatures=(
+                np.zeros((0, self.num_perm), dtype=np.uint64)
+                if self.signatures is None else
+                self.signatures
+            ),
+            vectors=(
+                np.zeros((0, self.n_rounds * len(trajectory_columns)))
+                if self.vectors is None else
+                self.vectors
+            )
+        )
+
+        return None
+
+    @classmethod
+    def load(cls, path: str) -> SimilarityIndex:
+        """ Reads an index written by save; the buckets are rebuilt.
+        """
+        with np.load(path) as data:
+            index = cls(**json.loads(str(data["params"])))
+            index.add(
+                tuple(map(tuple, json.loads(str(data["keys"])))),
+                data["signatures"],
+                data["vectors"]
+            )
+
+            if "file_signatures" in data:
+                index.file_signatures = json.loads(
+                    str(data["file_signatures"])
+                )
+
+        return index
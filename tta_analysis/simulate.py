@@ -0,0 +1,198 @@
+""" Simulates candidate build orders from a real game state.
+
+Every candidate is simulated at once: resources, income and each candidate's
+position in its build order are NumPy arrays with a row per candidate, and
+each round is a handful of vectorized operations over all rows.
+
+Each round a candidate develops the next card of its order once it has the
+science to do so, builds it once it has the rock, gains the card's income,
+and then collects its income. Other costs (food consumption, corruption,
+population growth) are not modeled.
+"""
+
+from __future__ import annotations
+
+import collections
+from typing import Dict, Sequence, Tuple
+
+import attr
+
+from .cards import camelcase_card_dict, Card
+from .lazy import lazy_import
+from .turn import PlayerTurn
+
+np = lazy_import("numpy")
+
+resources = ("food", "rock", "science", "culture")
+
+StartState = collections.namedtuple("StartState", ("resources", "income"))
+
+SimulationResult = collections.namedtuple(
+    "SimulationResult",
+    ("resources", "income", "build_rounds")
+)
+
+
+def start_state(turn: PlayerTurn) -> StartState:
+    """ Returns the resources and income at the end of a player's turn.
+
+    Args:
+        turn: Player turn to start from.
+    """
+    return StartState(
+        resources=np.array(attr.astuple(turn.resources), dtype=float),
+        income=np.array(attr.astuple(turn.income), dtype=float)
+    )
+
+
+def card_arrays(
+    cards: Dict[str, Card]
+) -> Tuple[Tuple[str, ...], np.ndarray, np.ndarray, np.ndarray]:
+    """ Returns the card names and arrays of each card's science cost, rock
+    cost and income by resource.
+
+    Args:
+        cards: Mapping of cards to card name.
+    """
+    return (
+        tuple(cards),
+        np.array(tuple(card.science for card in cards.values()), dtype=float),
+        np.array(tuple(card.rock for card in cards.values()), dtype=float),
+        np.array(
+            tuple(
+                tuple(card.income.get(resource, 0) for resource in resources)
+                for card in cards.values()
+            ),
+            dtype=float
+        ).reshape(-1, len(resources))
+    )
+
+
+def encode_orders(
+    orders: Sequence[Sequence[str]],
+    card_names: Sequence[str]
+) -> np.ndarray:
+    """ Returns a candidates by order length array of card indices. Shorter
+    orders are padded with -1.
+
+    Args:
+        orders: Build orders as sequences of card names.
+        card_names: Names of the cards, in the order of the card arrays.
+    """
+    index = {name: i for i, name in enumerate(card_names)}
+    length = max((len(order) for order in orders), default=0)
+
+    encoded = np.full((len(orders), length), -1, dtype=int)
+
+    for i, order in enumerate(orders):
+        encoded[i, :len(order)] = tuple(index[card] for card in order)
+
+    return encoded
+
+
+def sample_build_orders(
+    card_pool: Sequence[str],
+    n_candidates: int,
+    length: int = None,
+    seed: int = None
+) -> Tuple[Tuple[str, ...], ...]:
+    """ Returns random build orders, each a random permutation of length
+    cards from the pool.
+
+    Args:
+        card_pool: Names of the cards to build.
+        n_candidates: Number of build orders.
+        length: Number of cards in each order; defaults to the pool size.
+        seed: Seed of the random number generator.
+    """
+    rng = np.random.default_rng(seed)
+    length = len(card_pool) if length is None else length
+
+    permutations = np.argsort(
+        rng.random((n_candidates, len(card_pool))),
+        axis=1
+    )[:, :length]
+
+    return tuple(
+        tuple(card_pool[i] for i in permutation)
+        for permutation in permutations
+    )
+
+
+def simulate_build_orders(
+    start: StartState,
+    orders: Sequence[Sequence[str]],
+    n_rounds: int,
+    cards: Dict[str, Card] = None
+) -> SimulationResult:
+    """ Simulates each build order from the start state for n_rounds rounds.
+    Returns the candidates by rounds (including the start) by resources arrays
+    of resources and income at the end of each round, and the candidates by
+    order length array of the round each card was built in (0 if not built).
+
+    Args:
+        start: Resources and income to start from.
+        orders: Build orders as sequences of card names.
+        n_rounds: Number of rounds to simulate.
+        cards: Mapping of cards to the names used in the orders; defaults to
+            every card, keyed by its CamelCase name.
+    """
+    card_names, science_cost, rock_cost, card_income = card_arrays(
+        camelcase_card_dict if cards is None else cards
+    )
+
+    encoded = encode_orders(orders, card_names)
+    n_candidates, length = encoded.shape
+    candidates = np.arange(n_candidates)
+
+    resources_now = np.tile(start.resources, (n_candidates, 1))
+    income_now = np.tile(start.income, (n_candidates, 1))
+
+    position = np.zeros(n_candidates, dtype=int)
+    developed = np.zeros(n_candidates, dtype=bool)
+
+    resource_trajectory = np.empty((n_candidates, n_rounds + 1, 4))
+    income_trajectory = np.empty((n_candidates, n_rounds + 1, 4))
+    build_rounds = np.zeros((n_candidates, length), dtype=int)
+
+    resource_trajectory[:, 0] = resources_now
+    income_trajectory[:, 0] = income_now
+
+    # Pad with a column of -1 so that finished orders index a sentinel.
+    padded = np.hstack((encoded, np.full((n_candidates, 1), -1)))
+
+    for round_number in range(1, n_rounds + 1):
+        card = padded[candidates, position]
+        active = card >= 0
+        card = np.where(active, card, 0)
+
+        develop = (
+            active
+            & ~developed
+            & (resources_now[:, 2] >= science_cost[card])
+        )
+        resources_now[:, 2] -= np.where(develop, science_cost[card], 0)
+        developed |= develop
+
+        build = (
+            active
+            & developed
+            & (resources_now[:, 1] >= rock_cost[card])
+        )
+        resources_now[:, 1] -= np.where(build, rock_cost[card], 0)
+        income_now += np.where(build[:, None], card_income[card], 0)
+
+        build_rounds[candidates[build], position[build]] = round_number
+        position += build
+        developed &= ~build
+
+        resources_now += income_now
+
+        resource_trajectory[:, round_number] = resources_now
+        income_trajectory[:, round_number] = income_now
+
+    return SimulationResult(
+        resources=resource_trajectory,
+        income=income_trajectory,
+        build_rounds=build_rounds
+    )
@@ -0,0 +1,438 @@
+""" Stores parsed games, turns and actions in an indexed SQLite database so
+that filters can be evaluated in SQL instead of in pandas.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import os
+import sqlite3
+from typing import Any, Dict, Iterator, Tuple
+
+import attr
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+tables = ("games", "views", "turns", "actions")
+
+# Collection filters with more values are matched against a temporary table
+# instead of bound as parameters, which SQLite limits in number.
+max_parameters = 500
+
+schema = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY,
+    game TEXT UNIQUE NOT NULL,
+    game_file TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    game_length INTEGER,
+    all_players INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS views (
+    game_id INTEGER NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    player TEXT NOT NULL,
+    PRIMARY KEY (game_id, player)
+);
+
+CREATE TABLE IF NOT EXISTS turns (
+    game_id INTEGER NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    game TEXT NOT NULL,
+    player TEXT NOT NULL,
+    round_number INTEGER NOT NULL,
+    age INTEGER NOT NULL,
+    food INTEGER,
+    rock INTEGER,
+    science INTEGER,
+    culture INTEGER,
+    strength INTEGER,
+    employed INTEGER,
+    idle INTEGER,
+    bank INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS actions (
+    game_id INTEGER NOT NULL REFERENCES games(game_id) ON DELETE CASCADE,
+    game TEXT NOT NULL,
+    player TEXT NOT NULL,
+    round_number INTEGER NOT NULL,
+    age INTEGER NOT NULL,
+    card TEXT,
+    ca INTEGER,
+    action TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS turns_game ON turns (game_id);
+CREATE INDEX IF NOT EXISTS turns_round ON turns (round_number);
+CREATE INDEX IF NOT EXISTS turns_age ON turns (age);
+CREATE INDEX IF NOT EXISTS turns_player ON turns (player);
+
+CREATE INDEX IF NOT EXISTS actions_game ON actions (game_id);
+CREATE INDEX IF NOT EXISTS actions_card ON actions (card);
+CREATE INDEX IF NOT EXISTS actions_round ON actions (round_number);
+CREATE INDEX IF NOT EXISTS actions_age ON actions (age);
+CREATE INDEX IF NOT EXISTS actions_player ON actions (player);
+"""
+
+
+def file_signature(path: str) -> str:
+    """ Returns a signature of the file that changes when the file does.
+
+    Args:
+        path: Path to the file.
+    """
+    stat = os.stat(path)
+
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def create_condition(column: str, value: Any) -> Tuple[str, Tuple]:
+    """ Returns the SQL condition and its parameters for a filter.
+
+    Args:
+        column: Column to filter.
+        value: A scalar to match, a collection of values to match any of, or
+            a slice whose start is inclusive and stop is exclusive.
+    """
+    if isinstance(value, slice):
+        bounds = tuple(
+            (f"{column} {operator} ?", bound)
+            for operator, bound in ((">=", value.start), ("<", value.stop))
+            if bound is not None
+        )
+        condition = (
+            " AND ".join(clause for clause, _ in bounds) or "1",
+            tuple(bound for _, bound in bounds)
+        )
+
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        values = tuple(value)
+        condition = (
+            f"{column} IN ({', '.join('?' for _ in values)})" if values else
+            "0",
+            values
+        )
+
+    elif value is None:
+        condition = (f"{column} IS NULL", ())
+
+    else:
+        condition = (f"{column} = ?", (value,))
+
+    return condition
+
+
+def bind_condition(
+    connection: sqlite3.Connection,
+    column: str,
+    value: Any,
+    index: int
+) -> Tuple[str, Tuple]:
+    """ Returns the SQL condition and its parameters for a filter, loading
+    collections of more than max_parameters values into a temporary table.
+
+    Args:
+        connection: Connection the query runs on.
+        column: Column to filter.
+        value: Filter value; see create_condition.
+        index: Position of the filter, naming its temporary table.
+    """
+    if (
+        not isinstance(value, (tuple, list, set, frozenset))
+        or len(value) <= max_parameters
+    ):
+        return create_condition(column, value)
+
+    name = f"filter_{index}"
+    connection.execute(f"DROP TABLE IF EXISTS temp.{name}")
+    connection.execute(f"CREATE TEMP TABLE {name} (value)")
+    connection.executemany(
+        f"INSERT INTO temp.{name} VALUES (?)",
+        ((v,) for v in value)
+    )
+
+    return f"{column} IN (SELECT value FROM temp.{name})", ()
+
+
+@attr.s(auto_attribs=True)
+class GameStore(object):
+    """ SQLite database of games, turns and actions, indexed on card, round,
+    age and player.
+
+    Input parameters:
+        path: Path to the SQLite database file; created if it does not exist.
+
+    Methods:
+        connect: Context manager returning a connection to the database.
+        update: Writes games that are missing or changed since last stored.
+        query: Returns the rows of a table matching the filters.
+    """
+    path: str
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """ Yields a connection to the database, creating the tables if
+        needed. Commits on success and rolls back on error.
+        """
+        connection = sqlite3.connect(self.path)
+
+        try:
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.executescript(schema)
+
+            with connection:
+                yield connection
+
+        finally:
+            connection.close()
+
+    def update(self, games: Dict[str, Any], views: Dict[str, Dict]) -> int:
+        """ Writes the games whose logs changed or whose player views are not
+        yet stored. Returns the number of games written.
+
+        Args:
+            games: Mapping of games to game name.
+            views: Mapping of game name to a mapping of player color to the
+                game viewed from that player. A name mapped to None is stored
+                for every player in the game.
+        """
+        written = 0
+
+        with self.connect() as connection:
+            stored_players = collections.defaultdict(set)
+
+            for game_id, player in connection.execute(
+                "SELECT game_id, player FROM views"
+            ):
+                stored_players[game_id].add(player)
+
+            stored = {
+                row[1]: (row[0], row[2], bool(row[3]))
+                for row in connection.execute(
+                    "SELECT game_id, game, signature, all_players FROM games"
+                )
+            }
+
+            for name, game in games.items():
+                signature = file_signature(
+                    os.path.join(game.base_dir, game.game_file)
+                )
+                requested = views.get(name)
+
+                game_id, stored_signature, all_players = stored.get(
+                    name,
+                    (None, None, False)
+                )
+
+                if signature != stored_signature:
+                    game_id = self.delete_game(connection, game_id)
+                    all_players = False
+
+                players = stored_players[game_id]
+
+                up_to_date = (game_id is not None) & (
+                    all_players if requested is None else
+                    all_players | set(requested).issubset(players)
+                )
+
+                if up_to_date:
+                    continue
+
+                # Views are only created for games being written so that up to
+                # date games are never parsed.
+                new_views = {
+                    color: view
+                    for color, view in (
+                        game.for_players() if requested is None else
+                        requested
+                    ).items()
+                    if color not in players
+                }
+
+                self.write_game(
+                    connection,
+                    game_id=game_id,
+                    name=name,
+                    game=game,
+                    signature=signature,
+                    all_players=all_players | (requested is None),
+                    views=new_views
+                )
+                written += 1
+
+        return written
+
+    def delete_game(self, connection: sqlite3.Connection, game_id: int):
+        """ Deletes a game and its views, turns and actions. Returns None, the
+        id of a game that is not stored.
+        """
+        if game_id is not None:
+            connection.execute(
+                "DELETE FROM games WHERE game_id = ?",
+                (game_id,)
+            )
+
+        return None
+
+    def write_game(
+        self,
+        connection: sqlite3.Connection,
+        game_id: int,
+        name: str,
+        game: Any,
+        signature: str,
+        all_players: bool,
+        views: Dict[str, Any]
+    ) -> int:
+        """ Inserts or updates a game and inserts the turns and actions of the
+        player views provided. Returns the game id.
+        """
+        if game_id is None:
+            game_id = connection.execute(
+                "INSERT INTO games (game, game_file, signature, game_length, "
+                "all_players) VALUES (?, ?, ?, ?, ?)",
+                (
+                    name,
+                    game.game_file,
+                    signature,
+                    game.game_length,
+                    int(all_players)
+                )
+            ).lastrowid
+
+        else:
+            connection.execute(
+                "UPDATE games SET all_players = ? WHERE game_id = ?",
+                (int(all_players), game_id)
+            )
+
+        connection.executemany(
+            "INSERT INTO views (game_id, player) VALUES (?, ?)",
+            ((game_id, color) for color in views)
+        )
+
+        connection.executemany(
+            "INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    game_id,
+                    name,
+                    color,
+                    turn.round_number,
+                    turn.age,
+                    *attr.astuple(turn.income),
+                    turn.strength,
+                    *attr.astuple(turn.population)
+                )
+                for color, view in views.items()
+                for turn in view.turns
+                if turn.player_turn
+                if turn.income is not None
+            )
+        )
+
+        connection.executemany(
+            "INSERT INTO actions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    game_id,
+                    name,
+                    color,
+                    turn.round_number,
+                    turn.age,
+                    action.card,
+                    int(action.ca),
+                    action.action
+                )
+                for color, view in views.items()
+                for turn in view.turns
+                if turn.player_turn
+                for action in turn.actions
+            )
+        )
+
+        return game_id
+
+    def columns(self, table: str) -> Tuple[str, ...]:
+        """ Returns the column names of a table.
+        """
+        if table not in tables:
+            raise ValueError(f"{table} is not one of {', '.join(tables)}.")
+
+        with self.connect() as connection:
+            columns = tuple(
+                row[1]
+                for row in connection.execute(f"PRAGMA table_info({table})")
+            )
+
+        return columns
+
+    def query(
+        self,
+        table: str,
+        columns: Tuple[str, ...] = None,
+        distinct: bool = False,
+        **filters
+    ) -> pd.DataFrame:
+        """ Returns the rows of a table matching all filters. The filters are
+        evaluated by SQLite using the table's indexes, so only matching rows
+        are loaded.
+
+        Args:
+            table: One of games, views, turns or actions.
+            columns: Columns to return; defaults to all columns.
+            distinct: Determines if duplicate rows are dropped.
+            filters: Column to value filters. A scalar matches the value, a
+                collection matches any of its values and a slice matches
+                values from its start (inclusive) to its stop (exclusive).
+                Collections of any size are accepted.
+
+        Example:
+            # Games where Monarchy was selected before round 6.
+            store.query(
+                "actions",
+                columns=("game", "player"),
+                distinct=True,
+                card="Monarchy",
+                action="select",
+                round_number=slice(None, 6)
+            )
+        """
+        table_columns = self.columns(table)
+        selected = tuple(columns or table_columns)
+
+        unknown = (set(selected) | set(filters)) - set(table_columns)
+
+        if unknown:
+            raise ValueError(
+                f"{', '.join(sorted(unknown))} not in the {table} table."
+            )
+
+        with self.connect() as connection:
+            conditions = tuple(
+                bind_condition(connection, column, value, i)
+                for i, (column, value) in enumerate(filters.items())
+            )
+
+            sql = (
+                f"SELECT {'DISTINCT ' if distinct else ''}"
+                f"{', '.join(selected)} "
+                f"FROM {table} "
+                f"WHERE "
+                f"{' AND '.join(clause for clause, _ in conditions) or '1'}"
+            )
+
+            df = pd.read_sql_query(
+                sql,
+                connection,
+                params=tuple(
+                    parameter
+                    for _, parameters in conditions
+                    for parameter in parameters
+                )
+            )
+
+        return df
@@ -0,0 +1,167 @@
+""" Exports game states as a fixed-shape (games x rounds x features) array.
+
+Games of different lengths are padded to the longest game and a mask marks
+the rounds that were played. The arrays are memory-mapped .npy files filled
+one game at a time, so the long-format state table of the whole series is
+never held in memory. The padded length is read from a header scan of each
+log, and games whose states are not cached are evaluated on a copy of the
+game sharing its parsed record (see tta_analysis.cache.evolve); the copy and
+its turns are released once its rows are written, so turns do not pile up
+over the export and each log is parsed at most once.
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import os
+from typing import Dict, Sequence, Tuple, TYPE_CHECKING
+
+from .aggregates import state_columns
+from .cache import evolve, node_cache
+from .filters import scan_header
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .game import Game
+
+TensorExport = collections.namedtuple(
+    "TensorExport",
+    ("tensor", "mask", "index")
+)
+
+
+def export_paths(path: str) -> Tuple[str, str, str]:
+    """ Returns the paths of the tensor, the mask and the index metadata.
+
+    Args:
+        path: Path of the tensor's .npy file.
+    """
+    stem = os.path.splitext(path)[0]
+
+    return f"{stem}.npy", f"{stem}_mask.npy", f"{stem}_index.json"
+
+
+def game_length(game: Game, lengths: Dict[str, int]) -> int:
+    """ Returns the number of rounds of a game, from its cached value or a
+    header scan of its log.
+
+    Args:
+        game: Game to measure.
+        lengths: Lengths of the logs scanned so far by path; updated.
+    """
+    cache = node_cache(game)
+
+    if "game_length" in cache:
+        return cache["game_length"]
+
+    path = os.path.join(game.base_dir, game.game_file)
+
+    if path not in lengths:
+        lengths[path] = scan_header(path).game_length
+
+    return lengths[path]
+
+
+def game_states(game: Game) -> pd.DataFrame:
+    """ Returns the state table of a game, evaluated on a copy of the game
+    sharing its parsed record unless the game already holds it.
+    """
+    cache = node_cache(game)
+
+    if "state_df" in cache:
+        return cache["state_df"]
+
+    return evolve(game, memory_budget=None).state_df
+
+
+def export_tensor(
+    path: str,
+    games: Dict[Tuple[str, str], Game],
+    features: Sequence[str] = state_columns,
+    dtype: str = "float32",
+    fill_value: float = 0.0
+) -> TensorExport:
+    """ Writes the state of each game to a memory-mapped (games x rounds x
+    features) .npy file, a (games x rounds) boolean mask of played rounds
+    and a JSON index of the games, rounds and features. Returns the
+    memory-mapped tensor and mask and the index.
+
+    Args:
+        path: Path of the tensor's .npy file.
+        games: Mapping of games to (game name, player).
+        features: State columns to export.
+        dtype: Data type of the tensor.
+        fill_value: Value of padded rounds.
+    """
+    tensor_path, mask_path, index_path = export_paths(path)
+    features = list(features)
+
+    lengths: Dict[str, int] = {}
+    n_rounds = max(
+        (game_length(game, lengths) for game in games.values()),
+        default=0
+    )
+    shape = (len(games), n_rounds, len(features))
+
+    tensor = np.lib.format.open_memmap(
+        tensor_path,
+        mode="w+",
+        dtype=dtype,
+        shape=shape
+    )
+    mask = np.lib.format.open_memmap(
+        mask_path,
+        mode="w+",
+        dtype=bool,
+        shape=shape[:2]
+    )
+
+    tensor[:] = fill_value
+    mask[:] = False
+
+    for i, game in enumerate(games.values()):
+        state_df = game_states(game)
+
+        if len(state_df):
+            rounds = state_df.round_number.values - 1
+
+            tensor[i, rounds] = state_df[features].values
+            mask[i, rounds] = True
+
+    tensor.flush()
+    mask.flush()
+
+    index = dict(
+        games=[list(key) for key in games],
+        rounds=list(range(1, n_rounds + 1)),
+        features=features
+    )
+
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+
+    return TensorExport(tensor=tensor, mask=mask, index=index)
+
+
+def load_tensor(path: str, mmap_mode: str = "r") -> TensorExport:
+    """ Returns the tensor, mask and index written by export_tensor.
+
+    Args:
+        path: Path of the tensor's .npy file.
+        mmap_mode: Memory-map mode passed to numpy.load.
+    """
+    tensor_path, mask_path, index_path = export_paths(path)
+
+    with open(index_path) as f:
+        index = json.load(f)
+
+    return TensorExport(
+        tensor=np.load(tensor_path, mmap_mode=mmap_mode),
+        mask=np.load(mask_path, mmap_mode=mmap_mode),
+        index=index
+    )
@@ -0,0 +1,336 @@
+""" Markov model of transitions between consecutive card selections, counted
+in sparse matrices.
+
+Cards are integer encoded and the transitions of a set of games are counted
+in one vectorized pass: consecutive selections of the same game and player
+form (card, next card) pairs, which are summed into a sparse count matrix
+for each age and player. Counts of shards with different cards are merged by
+reindexing them to the union of their cards.
+
+Transition probabilities are the counts normalized by row, so row i holds
+the distribution of the card selected after card i. The age of a transition
+is the age of the later selection.
+
+Requires scipy: pip install tta_analysis[sparse].
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Sequence, Tuple
+
+import attr
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sparse = lazy_import("scipy.sparse")
+
+GroupType = Tuple[int, str]
+
+
+def selection_codes(
+    actions_df: pd.DataFrame,
+    action: str = "select"
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Returns the card names and, for each action in game order, the code
+    of its game (viewed from its player), card, age and player.
+
+    Args:
+        actions_df: Actions, as in Series.actions_df.
+        action: Action whose cards are modelled.
+    """
+    df = actions_df[actions_df.action == action]
+
+    units, _ = pd.MultiIndex.from_frame(df[["game", "player"]]).factorize()
+    card_codes, cards = pd.factorize(df.card, sort=True)
+
+    # Stable, so that each game's actions stay in the order they were taken.
+    order = np.argsort(units, kind="stable")
+
+    return (
+        np.asarray(cards),
+        units[order],
+        card_codes[order],
+        df.age.values.astype(np.int64)[order],
+        df.player.values[order]
+    )
+
+
+def count_matrix(
+    rows: np.ndarray,
+    columns: np.ndarray,
+    shape: Tuple[int, int]
+) -> sparse.csr_matrix:
+    """ Returns the sparse matrix counting each (row, column) pair.
+    """
+    return sparse.coo_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, columns)),
+        shape=shape
+    ).tocsr()
+
+
+@attr.s(auto_attribs=True)
+class TransitionCounts(object):
+    """ Mergeable sparse counts of card selections and of transitions between
+    consecutive selections, by age and player.
+
+    Input parameters:
+        cards: Card of each row and column.
+        transitions: Card by next card count matrix of each age and player.
+        selections: 1 by card count matrix of the selections in each age and
+            player.
+
+    Methods:
+        from_actions: Counts the transitions of a set of games.
+        empty: Counts of no games.
+        reindex: Returns the counts over a superset of the cards.
+        merge: Combines the counts of two sets of games.
+        counts: Transition counts summed over ages and players.
+        transition_matrix: Transition probabilities between cards.
+        transition_df: Transitions and their probabilities as a table.
+        age_selection_df: Share of each age's selections going to each card.
+    """
+    cards: Tuple[str, ...]
+    transitions: Dict[GroupType, sparse.csr_matrix]
+    selections: Dict[GroupType, sparse.csr_matrix]
+
+    @classmethod
+    def from_actions(
+        cls,
+        actions_df: pd.DataFrame,
+        action: str = "select"
+    ) -> TransitionCounts:
+        """ Returns the counts of the selections and transitions in the
+        actions, as in Series.actions_df.
+
+        Args:
+            actions_df: Actions, as in Series.actions_df.
+            action: Action whose cards are modelled.
+        """
+        cards, units, card_codes, ages, players = selection_codes(
+            actions_df,
+            action
+        )
+        n_cards = len(cards)
+
+        # Transitions within the same game, keyed by the later selection.
+        follows = np.flatnonzero(units[1:] == units[:-1]) + 1
+
+        group_keys = pd.MultiIndex.from_arrays((ages, players))
+        group_codes, groups = group_keys.factorize()
+
+        transitions = {}
+        selections = {}
+
+        for code, (age, player) in enumerate(groups):
+            group = (int(age), player)
+            in_group = group_codes == code
+            group_follows = follows[in_group[follows]]
+
+            transitions[group] = count_matrix(
+                card_codes[group_follows - 1],
+                card_codes[group_follows],
+                (n_cards, n_cards)
+            )
+            selections[group] = count_matrix(
+                np.zeros(in_group.sum(), dtype=np.int64),
+                card_codes[in_group],
+                (1, n_cards)
+            )
+
+        return cls(
+            cards=tuple(cards),
+            transitions=transitions,
+            selections=selections
+        )
+
+    @classmethod
+    def empty(cls) -> TransitionCounts:
+        """ Returns the counts of no games.
+        """
+        return cls(cards=(), transitions={}, selections={})
+
+    def reindex(self, cards: Sequence[str]) -> TransitionCounts:
+        """ Returns the counts over cards, which must include every card
+        counted.
+        """
+        position = {card: i for i, card in enumerate(cards)}
+        codes = np.array(
+            tuple(position[card] for card in self.cards),
+            dtype=np.int64
+        )
+        n_cards = len(cards)
+
+        def remap(matrix: sparse.csr_matrix, square: bool):
+            """ Moves the rows (if square) and columns to the new codes.
+            """
+            coo = matrix.tocoo()
+
+            return sparse.coo_matrix(
+                (
+                    coo.data,
+                    (codes[coo.row] if square else coo.row, codes[coo.col])
+                ),
+                shape=(n_cards if square else 1, n_cards)
+            ).tocsr()
+
+        return TransitionCounts(
+            cards=tuple(cards),
+            transitions={
+                group: remap(matrix, True)
+                for group, matrix in self.transitions.items()
+            },
+            selections={
+                group: remap(matrix, False)
+                for group, matrix in self.selections.items()
+            }
+        )
+
+    def merge(self, other: TransitionCounts) -> TransitionCounts:
+        """ Returns the counts of the games in both counts.
+        """
+        cards = tuple(sorted(set(self.cards) | set(other.cards)))
+        left, right = self.reindex(cards), other.reindex(cards)
+
+        def add(
+            first: Dict[GroupType, sparse.csr_matrix],
+            second: Dict[GroupType, sparse.csr_matrix]
+        ) -> Dict[GroupType, sparse.csr_matrix]:
+            """ Sums the matrices of each group.
+            """
+            return {
+                group: (
+                    first[group] + second[group]
+                    if group in first and group in second else
+                    first.get(group, second.get(group))
+                )
+                for group in {**first, **second}
+            }
+
+        return TransitionCounts(
+            cards=cards,
+            transitions=add(left.transitions, right.transitions),
+            selections=add(left.selections, right.selections)
+        )
+
+    def groups(
+        self,
+        ages: Iterable[int] = None,
+        players: Iterable[str] = None
+    ) -> Tuple[GroupType, ...]:
+        """ Returns the counted (age, player) groups within the ages and
+        players; all if not set.
+        """
+        ages = None if ages is None else set(ages)
+        players = None if players is None else set(players)
+
+        return tuple(
+            (age, player)
+            for age, player in self.transitions
+            if ages is None or age in ages
+            if players is None or player in players
+        )
+
+    def counts(
+        self,
+        ages: Iterable[int] = None,
+        players: Iterable[str] = None
+    ) -> sparse.csr_matrix:
+        """ Returns the card by next card transition counts summed over the
+        ages and players; all if not set.
+        """
+        n_cards = len(self.cards)
+
+        return sum(
+            (self.transitions[group] for group in self.groups(ages, players)),
+            sparse.csr_matrix((n_cards, n_cards), dtype=np.int64)
+        )
+
+    def transition_matrix(
+        self,
+        ages: Iterable[int] = None,
+        players: Iterable[str] = None
+    ) -> sparse.csr_matrix:
+        """ Returns the probability of each next card given a card, over the
+        ages and players; all if not set. Rows of cards never followed by a
+        selection are zero.
+        """
+        counts = self.counts(ages, players).astype(float)
+        totals = np.asarray(counts.sum(axis=1)).ravel()
+
+        scale = np.divide(
+            1.0,
+            totals,
+            out=np.zeros_like(totals),
+            where=totals > 0
+        )
+
+        return (sparse.diags(scale) @ counts).tocsr()
+
+    def transition_df(
+        self,
+        ages: Iterable[int] = None,
+        players: Iterable[str] = None,
+        min_count: int = 1
+    ) -> pd.DataFrame:
+        """ Returns each transition counted at least min_count times over
+        the ages and players, with its count and probability.
+
+        Arguments:
+            ages: Ages of the later selection; all if not set.
+            players: Player colors; all if not set.
+            min_count: Smallest count of a transition returned.
+        """
+        counts = self.counts(ages, players).tocoo()
+        totals = np.asarray(counts.tocsr().sum(axis=1)).ravel()
+        keep = counts.data >= min_count
+        cards = np.array(self.cards, dtype=object)
+
+        return (
+            pd.DataFrame(
+                dict(
+                    card=cards[counts.row[keep]],
+                    next_card=cards[counts.col[keep]],
+                    count=counts.data[keep],
+                    probability=(
+                        counts.data[keep] / totals[counts.row[keep]]
+                    )
+                )
+            )
+            .sort_values(["card", "count"], ascending=[True, False])
+            .reset_index(drop=True)
+        )
+
+    def age_selection_df(
+        self,
+        players: Iterable[str] = None
+    ) -> pd.DataFrame:
+        """ Returns the selections of each card in each age by the players
+        (all if not set), with the share of the age's selections.
+        """
+        ages = sorted({age for age, _ in self.groups(players=players)})
+        n_cards = len(self.cards)
+
+        counts = sparse.vstack(
+            tuple(
+                sum(
+                    (
+                        self.selections[group]
+                        for group in self.groups((age,), players)
+                    ),
+                    sparse.csr_matrix((1, n_cards), dtype=np.int64)
+                )
+                for age in ages
+            ) or (sparse.csr_matrix((0, n_cards), dtype=np.int64),)
+        ).tocoo()
+        totals = np.asarray(counts.tocsr().sum(axis=1)).ravel()
+
+        return pd.DataFrame(
+            dict(
+                age=np.array(ages, dtype=np.int64)[counts.row],
+                card=np.array(self.cards, dtype=object)[counts.col],
+                count=counts.data,
+                probability=counts.data / totals[counts.row]
+            )
+        ).sort_values(["age", "card"]).reset_index(drop=True)